@@ -5,425 +5,217 @@
 # 2. ปรับปรุง Game Loop: ใช้ "Master Game Loop" เพียงตัวเดียวในการอัปเดตทุกห้องเกมที่ Active อยู่
 #    ซึ่งช่วยลดการใช้ CPU ลงอย่างมากเมื่อเทียบกับการสร้าง Loop แยกสำหรับแต่ละห้อง
 # 3. โค้ดที่สะอาดขึ้น: การแยกส่วนการทำงานทำให้โค้ดอ่านง่าย, แก้ไข, และต่อยอดได้สะดวกขึ้น
+# 4. ตรรกะของเกม (Player, GameState, GameRoom) อยู่ใน game.py ไฟล์นี้เหลือเพียงการเชื่อม Flask/Socket.IO เข้ากับห้องเกม
+# 5. รันหลาย worker ได้ (sharding.py): แต่ละ worker เป็นเจ้าของห้องตามรหัสห้อง และเชื่อมกันด้วย message queue ของ Socket.IO
+# 6. ผู้ชม (spectate_room): ดูเกมของห้องแบบอ่านอย่างเดียว ได้ข้อความของห้องผ่าน socket.io room ของผู้ชม (ดู outbox.py)
+# 7. event log (ตั้ง env EVENT_LOG_DIR): บันทึก input ของทุกห้องเป็นไฟล์ละห้อง เล่นซ้ำ/ตรวจผลด้วย tools/replay.py
+# 8. deploy โดยไม่ปิดเกม (ตั้ง env ROOM_SNAPSHOT): SIGTERM = หยุดรับห้องใหม่ เขียน snapshot ของทุกห้องแล้วจบ process
+#    process ใหม่ restore ห้องจากไฟล์ตอนเริ่ม ผู้เล่นกลับเข้าห้องเดิมด้วย reconnect token (rejoin_room) ไม่ใช่ sid
+# 9. เล่นด่วน (quick_play): จับผู้เล่นเข้าห้องที่ใกล้เต็มที่สุดด้วยดัชนีห้องตามที่นั่งว่าง ห้องเต็ม/รอครบเวลาเริ่มเกมเอง (matchmaking.py)
+# 10. ไฟล์หน้าเว็บ (assets.py): build ด้วย tools/build_assets.py ชื่อไฟล์มี hash บีบอัด gzip/brotli ไว้ล่วงหน้า
+#     ส่งจากหน่วยความจำพร้อม cache แบบ immutable (หรือให้ CDN/reverse proxy ส่งเองด้วย env ASSET_URL)
 
 import eventlet
 eventlet.monkey_patch()
 
-from flask import Flask, render_template, request
+from flask import Flask, Response, render_template, request, jsonify, url_for
 from flask_socketio import SocketIO, join_room, leave_room, emit
+import os
 import random
-import string
+import signal
+import sys
 import time
-import os
-from threading import Lock
+
+from assets import IMMUTABLE_CACHE, AssetManifest
+import compact_codec
+import json_cache
+from scheduler import DeadlineScheduler
+from room_registry import RoomRegistry
+from room_ids import RoomIdsExhausted
+from event_log import EventLogWriter
+from room_snapshot import SnapshotError, read_snapshot, write_snapshot
+from outbox import spectator_room
+from sharding import WorkerTopology
+from matchmaking import QUICK_PLAY_MAX_WAIT, Matchmaker
+from game import MAX_PLAYERS, GameRoom, Player, RoomPhase, server_metrics, tick_metrics
 
 # --- การตั้งค่าพื้นฐาน ---
 app = Flask(__name__, template_folder='templates', static_folder='static')
 app.config['SECRET_KEY'] = 'a-very-secret-key-for-the-game!'
-socketio = SocketIO(app, async_mode='eventlet')
-
-# --- ข้อมูลหลักของเกม (Constants) ---
-# การเก็บข้อมูลเหล่านี้ไว้ในระดับ Global ทำให้เข้าถึงได้ง่ายและไม่เปลี่ยนแปลง
-RECIPES = {
-    'สลัดผัก': {'ingredients': sorted(['🥬', '🍅', '🥕']), 'points': 50, 'time_bonus': 10},
-    'สปาเก็ตตี้': {'ingredients': sorted(['🍝', '🥫', '🥩']), 'points': 110, 'time_bonus': 16},
-    'ไอศกรีม': {'ingredients': sorted(['🍨', '🍒']), 'points': 35, 'time_bonus': 7},
-    'ผลไม้รวม': {'ingredients': sorted(['🍓', '🍌', '🍎']), 'points': 30, 'time_bonus': 5},
-    'ซีฟู้ดต้ม': {'ingredients': sorted(['🦞', '🍄', '🌶️']), 'points': 200, 'time_bonus': 22},
-    'ไก่ทอด': {'ingredients': sorted(['🍗', '🍟']), 'points': 60, 'time_bonus': 10},
-    'อาหารเช้าชุดใหญ่': {'ingredients': sorted(['🍳', '🍞', '🍄']), 'points': 170, 'time_bonus': 20},
-    'สเต็กแอนด์ฟรายส์': {'ingredients': sorted(['🥓', '🥕', '🍄']), 'points': 210, 'time_bonus': 24},
-    'ซูชิ': {'ingredients': sorted(['🍣', '🥬']), 'points': 130, 'time_bonus': 18},
-    'สลัดสุขภาพ': {'ingredients': sorted(['🥗', '🥕', '🍅']), 'points': 160, 'time_bonus': 18},
-    'ส้มตำ': {'ingredients': sorted(['🥗', '🌶️', '🍅', '🥜']), 'points': 140, 'time_bonus': 19},
-}
-
-ABILITIES_CONFIG = {
-    'กระทะ': {'verb': 'ทอด', 'transformations': {'🥚': '🍳', '🥩': '🥓'}},
-    'หม้อ': {'verb': 'ต้ม', 'transformations': {'🦐': '🦞', '🥔': '🍟'}},
-    'เขียง': {'verb': 'หั่น', 'transformations': {'🥬': '🥗', '🥕': '🥒','🐟': '🍣'}}
-}
-
-LEVEL_DEFINITIONS = {
-    1: {'target_score': 300, 'time': 130, 'spawn_interval': 3},
-    2: {'target_score': 475, 'time': 120, 'spawn_interval': 3},
-    3: {'target_score': 750, 'time': 110, 'spawn_interval': 3},
-}
-
-# --- สร้างข้อมูลอ้างอิงเพื่อการค้นหาที่รวดเร็ว ---
-TRANSFORMED_TO_BASE_INGREDIENT = {transformed: base for ability_config in ABILITIES_CONFIG.values() for base, transformed in ability_config['transformations'].items()}
-TRANSFORMED_ING_INFO = {transformed: ability for ability, config in ABILITIES_CONFIG.items() for transformed in config['transformations'].values()}
-ALL_INGREDIENTS = list(set(ing for recipe in RECIPES.values() for ing in recipe['ingredients']))
-NORMAL_RECIPES_KEYS = [k for k, v in RECIPES.items() if not any(ing in TRANSFORMED_TO_BASE_INGREDIENT for ing in v['ingredients'])]
-ABILITY_TO_RECIPES = {
-    ability: [
-        recipe_name for recipe_name, recipe_data in RECIPES.items()
-        if any(ing in recipe_data['ingredients'] for ing in config['transformations'].values())
-    ]
-    for ability, config in ABILITIES_CONFIG.items()
-}
-
-# --- โครงสร้างหลักแบบ OOP ---
-
-class Player:
-    """เก็บข้อมูลและสถานะของผู้เล่นแต่ละคน"""
-    def __init__(self, sid, name):
-        self.sid = sid
-        self.name = name
-        self.plate = []
-        self.objective = None
-        self.ability = None
-        self.ability_processing = None # {'input': str, 'output': str, 'end_time': float}
-
-    def assign_new_objective(self, possible_recipes):
-        """สุ่มเป้าหมายใหม่ให้ผู้เล่น"""
-        if not possible_recipes:
-            possible_recipes = list(RECIPES.keys())
-        objective_name = random.choice(possible_recipes)
-        self.objective = {'name': objective_name}
-
-class GameState:
-    """จัดการสถานะโดยรวมของเกมในห้องนั้นๆ เช่น ด่าน, คะแนน, เวลา"""
-    def __init__(self, player_sids, players_map, level=1, total_score=0):
-        self.is_active = True
-        self.level = level
-        self.score = 0
-        self.total_score = total_score
-        self.target_score = LEVEL_DEFINITIONS[level]['target_score']
-        self.time_left = LEVEL_DEFINITIONS[level]['time']
-        self.player_order_sids = player_sids
-        self.players_map = players_map # {sid: Player object}
-        self.last_spawn_time = time.time()
-
-    def tick(self):
-        """อัปเดตสถานะเกมในแต่ละวินาที (ถูกเรียกโดย Master Game Loop)"""
-        if not self.is_active:
-            return
-        self.time_left -= 1
-
-    def check_ability_processing(self):
-        """ตรวจสอบการแปรรูปวัตถุดิบที่เสร็จสิ้น"""
-        finished_players = []
-        current_time = time.time()
-        for player in self.players_map.values():
-            if player.ability_processing and current_time >= player.ability_processing['end_time']:
-                finished_players.append(player)
-        return finished_players
-
-    def get_spawnable_ingredients(self):
-        """รวบรวมวัตถุดิบที่จำเป็นสำหรับผู้เล่นทุกคนเพื่อนำไปสุ่ม"""
-        required_pool = set()
-        for player in self.players_map.values():
-            if player.objective and player.objective.get('name') in RECIPES:
-                for ing in RECIPES[player.objective['name']]['ingredients']:
-                    base_ingredient = TRANSFORMED_TO_BASE_INGREDIENT.get(ing, ing)
-                    required_pool.add(base_ingredient)
-        
-        if not required_pool: # กรณีไม่มีเป้าหมาย ให้สุ่มจากวัตถุดิบพื้นฐานทั้งหมด
-            return [ing for ing in ALL_INGREDIENTS if ing not in TRANSFORMED_TO_BASE_INGREDIENT]
-            
-        return list(required_pool)
-
-class GameRoom:
-    """Class หลักในการจัดการห้องเกม 1 ห้อง"""
-    def __init__(self, room_id, host_sid, host_name):
-        self.id = room_id
-        self.host_sid = host_sid
-        self.players = {host_sid: Player(host_sid, host_name)}
-        self.game_state = None
-        self.lock = Lock() # ป้องกัน Race Condition เมื่อมีการเข้าถึงข้อมูลพร้อมกัน
-
-    def add_player(self, sid, name):
-        with self.lock:
-            if len(self.players) < 8:
-                self.players[sid] = Player(sid, name)
-                return True
-            return False
-
-    def remove_player(self, sid):
-        with self.lock:
-            if sid in self.players:
-                del self.players[sid]
-            if not self.players:
-                return 'delete_room' # สัญญาณให้ลบห้องนี้ทิ้ง
-            if sid == self.host_sid:
-                self.host_sid = list(self.players.keys())[0]
-            if self.game_state and self.game_state.is_active:
-                if sid in self.game_state.player_order_sids:
-                    self.game_state.player_order_sids.remove(sid)
-                if sid in self.game_state.players_map:
-                    del self.game_state.players_map[sid]
-                if len(self.game_state.player_order_sids) < 1:
-                    self.game_state.is_active = False
-                    return 'game_over_disconnect'
-        return 'ok'
-
-    def start_game(self):
-        with self.lock:
-            player_sids = list(self.players.keys())
-            random.shuffle(player_sids)
-            self.game_state = GameState(player_sids, self.players)
-            self._assign_abilities()
-            self._assign_all_objectives()
-            
-            # ส่งข้อมูลเริ่มต้นเกมให้ผู้เล่นทุกคน
-            ui_state = self.get_augmented_state_for_ui()
-            for i, sid in enumerate(player_sids):
-                left_sid = player_sids[i - 1]
-                right_sid = player_sids[(i + 1) % len(player_sids)]
-                emit('game_started', {
-                    'initial_state': ui_state,
-                    'your_sid': sid,
-                    'your_name': self.players[sid].name,
-                    'left_neighbor': self.players[left_sid].name,
-                    'right_neighbor': self.players[right_sid].name
-                }, room=sid)
-            print(f"เกมในห้อง {self.id} เริ่มขึ้นแล้ว!")
-
-    def _assign_abilities(self):
-        """สุ่มความสามารถให้ผู้เล่นในห้อง"""
-        abilities_pool = list(ABILITIES_CONFIG.keys())
-        random.shuffle(abilities_pool)
-        for i, player in enumerate(self.players.values()):
-            player.ability = abilities_pool[i] if i < len(abilities_pool) else None
-            player.ability_processing = None
-
-    def _assign_all_objectives(self):
-        """สุ่มเป้าหมายให้ผู้เล่นทุกคน"""
-        active_abilities = {p.ability for p in self.players.values() if p.ability}
-        possible_recipes = list(NORMAL_RECIPES_KEYS)
-        for ability in active_abilities:
-            possible_recipes.extend(ABILITY_TO_RECIPES.get(ability, []))
-        
-        for player in self.players.values():
-            player.assign_new_objective(possible_recipes)
-
-    def update(self):
-        """ฟังก์ชันที่ถูกเรียกโดย Master Game Loop ทุกๆ 1 วินาที"""
-        with self.lock:
-            if not self.game_state or not self.game_state.is_active:
-                return
-
-            self.game_state.tick()
-
-            # 1. ตรวจสอบการแปรรูปวัตถุดิบ
-            finished_players = self.game_state.check_ability_processing()
-            for player in finished_players:
-                output_item = player.ability_processing['output']
-                socketio.emit('receive_item', {'item': {'type': 'ingredient', 'name': output_item}}, room=player.sid)
-                player.ability_processing = None
-
-            # 2. สุ่มวัตถุดิบ
-            spawn_interval = LEVEL_DEFINITIONS[self.game_state.level]['spawn_interval']
-            if time.time() - self.game_state.last_spawn_time > spawn_interval:
-                spawnable_ings = self.game_state.get_spawnable_ingredients()
-                if spawnable_ings:
-                    for sid in self.game_state.player_order_sids:
-                        ingredient = random.choice(spawnable_ings)
-                        socketio.emit('receive_item', {'item': {'type': 'ingredient', 'name': ingredient}}, room=sid)
-                self.game_state.last_spawn_time = time.time()
-
-            # 3. ตรวจสอบเงื่อนไขจบเกม (หมดเวลา)
-            if self.game_state.time_left <= 0:
-                self.game_state.is_active = False
-                total_final_score = self.game_state.total_score + self.game_state.score
-                socketio.emit('game_over', {'total_score': total_final_score, 'message': 'หมดเวลา!'}, room=self.id)
-                self.game_state = None # รีเซ็ตสถานะเกม
-    
-    def get_lobby_info(self):
-        """สร้างข้อมูลสำหรับหน้า Lobby"""
-        return {
-            'players': [{'sid': p.sid, 'name': p.name} for p in self.players.values()],
-            'host_sid': self.host_sid,
-            'room_id': self.id
-        }
-
-    def get_augmented_state_for_ui(self):
-        """สร้างข้อมูลเกมทั้งหมดเพื่อส่งไปอัปเดตหน้า UI"""
-        if not self.game_state: return None
-        
-        # สร้างสำเนาข้อมูลพื้นฐาน
-        ui_state = {
-            'is_active': self.game_state.is_active,
-            'level': self.game_state.level,
-            'score': self.game_state.score,
-            'total_score': self.game_state.total_score,
-            'target_score': self.game_state.target_score,
-            'time_left': self.game_state.time_left,
-            'player_order_sids': self.game_state.player_order_sids,
-        }
-
-        # สร้างข้อมูลผู้เล่นและเป้าหมาย
-        ui_state['players_state'] = {
-            sid: {
-                'plate': p.plate,
-                'objective': p.objective,
-                'ability': p.ability,
-                'ability_processing': p.ability_processing
-            } for sid, p in self.players.items() if sid in self.game_state.players_map
-        }
-        
-        # สร้างข้อมูลเป้าหมายพร้อมคำใบ้
-        all_player_objectives = []
-        for player in self.game_state.players_map.values():
-            if player.objective and 'name' in player.objective:
-                recipe_details = RECIPES[player.objective['name']]
-                ingredients_with_hints = [
-                    {'name': ing, 'hint': TRANSFORMED_ING_INFO.get(ing), 'base': TRANSFORMED_TO_BASE_INGREDIENT.get(ing)}
-                    for ing in recipe_details['ingredients']
-                ]
-                all_player_objectives.append({
-                    'player_name': player.name,
-                    'objective_name': player.objective['name'],
-                    'ingredients': ingredients_with_hints,
-                    'points': recipe_details['points']
-                })
-        ui_state['all_player_objectives'] = all_player_objectives
-        return ui_state
-
-    def handle_player_action(self, sid, data):
-        """จัดการ Action ต่างๆ จากผู้เล่น"""
-        with self.lock:
-            player = self.players.get(sid)
-            if not player or not self.game_state or not self.game_state.is_active:
-                return
-
-            action_type = data.get('type')
-            
-            if action_type == 'pass_item':
-                item_data = data.get('item')
-                if item_data.get('type') == 'plate':
-                    emit('action_fail', {'message': 'ไม่สามารถส่งจานได้!', 'sound': 'error'}, room=sid)
-                    return
-                
-                player_sids = self.game_state.player_order_sids
-                if len(player_sids) <= 1: return
-
-                player_index = player_sids.index(sid)
-                direction = data.get('direction')
-                target_sid = player_sids[player_index - 1] if direction == 'left' else player_sids[(player_index + 1) % len(player_sids)]
-                socketio.emit('receive_item', {'item': item_data}, room=target_sid)
-
-            elif action_type == 'add_to_plate':
-                player.plate = data.get('new_plate_contents', [])
-
-            elif action_type == 'submit_order':
-                self._handle_submit_order(player)
-
-            # ส่ง state ล่าสุดให้ทุกคนหลัง action
-            ui_state = self.get_augmented_state_for_ui()
-            if ui_state:
-                socketio.emit('update_game_state', ui_state, room=self.id)
-
-    def _handle_submit_order(self, player):
-        """ตรรกะการส่งอาหาร"""
-        player_plate = sorted(player.plate)
-        objective_name = player.objective.get('name')
-        if not objective_name or objective_name not in RECIPES:
-            return
-
-        required_ingredients = RECIPES[objective_name]['ingredients']
-        if player_plate == required_ingredients:
-            # ทำอาหารสำเร็จ
-            recipe_data = RECIPES[objective_name]
-            self.game_state.score += recipe_data['points']
-            self.game_state.time_left = min(self.game_state.time_left + recipe_data['time_bonus'], 999)
-            
-            player.plate = []
-            self._assign_all_objectives() # สุ่มเป้าหมายใหม่ให้ทุกคน
-            
-            emit('action_success', {'message': f'ทำ {objective_name} สำเร็จ! (+{recipe_data["points"]} คะแนน)', 'sound': 'success'}, room=player.sid)
-
-            # ตรวจสอบเงื่อนไขผ่านด่าน
-            if self.game_state.score >= self.game_state.target_score:
-                self._level_up()
-        else:
-            emit('action_fail', {'message': 'สูตรไม่ถูกต้อง! ลองอีกครั้ง', 'sound': 'error'}, room=player.sid)
-
-    def _level_up(self):
-        """ตรรกะการเลื่อนขึ้นด่านใหม่"""
-        current_level = self.game_state.level
-        self.game_state.total_score += self.game_state.score
-        next_level = current_level + 1
-
-        if next_level in LEVEL_DEFINITIONS:
-            # ไปด่านต่อไป
-            self.game_state.is_active = False # หยุดเกมชั่วคราว
-            socketio.emit('level_complete', {'level': current_level, 'level_score': self.game_state.score, 'total_score': self.game_state.total_score}, room=self.id)
-            socketio.sleep(5) # รอ 5 วินาที
-
-            # รีเซ็ตสำหรับด่านใหม่
-            player_sids = list(self.players.keys())
-            random.shuffle(player_sids)
-            self.game_state = GameState(player_sids, self.players, level=next_level, total_score=self.game_state.total_score)
-            self._assign_abilities()
-            self._assign_all_objectives()
-            
-            socketio.emit('clear_all_items', {}, room=self.id)
-            socketio.emit('start_next_level', self.get_augmented_state_for_ui(), room=self.id)
-        else:
-            # ชนะเกม
-            self.game_state.is_active = False
-            socketio.emit('game_won', {'total_score': self.game_state.total_score}, room=self.id)
-            self.game_state = None
-
-    def use_ability(self, sid, item_name):
-        with self.lock:
-            player = self.players.get(sid)
-            if not player or not self.game_state or not self.game_state.is_active: return
-
-            if not player.ability or player.ability_processing:
-                emit('action_fail', {'message': 'ไม่สามารถใช้ความสามารถได้ในขณะนี้', 'sound': 'error'}, room=sid)
-                # [FIX] ส่งวัตถุดิบกลับคืนถ้าใช้ความสามารถไม่ได้
-                socketio.emit('receive_item', {'item': {'type': 'ingredient', 'name': item_name}}, room=sid)
-                return
-
-            ability_config = ABILITIES_CONFIG.get(player.ability)
-            if not ability_config or item_name not in ability_config['transformations']:
-                emit('action_fail', {'message': 'วัตถุดิบนี้ใช้กับความสามารถของคุณไม่ได้', 'sound': 'error'}, room=sid)
-                # [FIX] ส่งวัตถุดิบกลับคืนถ้าวัตถุดิบไม่ถูกต้อง
-                socketio.emit('receive_item', {'item': {'type': 'ingredient', 'name': item_name}}, room=sid)
-                return
-
-            output_item = ability_config['transformations'][item_name]
-            player.ability_processing = {'input': item_name, 'output': output_item, 'end_time': time.time() + 6}
-            
-            verb = ability_config['verb']
-            emit('action_success', {'message': f'กำลัง{verb}{item_name}...', 'sound': 'click'}, room=sid)
-            
-            ui_state = self.get_augmented_state_for_ui()
-            if ui_state:
-                socketio.emit('update_game_state', ui_state, room=self.id)
+topology = WorkerTopology.from_env(os.environ) # worker นี้เป็นเจ้าของห้องไหนบ้าง (ค่าเริ่มต้น: worker เดียว)
+# message queue (เช่น redis://127.0.0.1:6379/0) ทำให้ socketio.emit จาก worker ใดก็ถึง client ที่ต่ออยู่กับทุก worker
+MESSAGE_QUEUE = os.environ.get('MESSAGE_QUEUE') or None
+socketio = SocketIO(
+    app, async_mode='eventlet', json=json_cache, # json_cache: รองรับ state ที่ serialize ไว้แล้ว
+    message_queue=MESSAGE_QUEUE, channel='cooking-game',
+    cors_allowed_origins=list(topology.urls) or None, # หน้าเว็บจาก worker หนึ่งต้องต่อ Socket.IO ไปยัง worker อื่นได้หลัง redirect
+)
+game_scheduler = DeadlineScheduler() # ห้องเกมลงทะเบียน deadline ของตัวเองไว้ที่นี่
+ROOM_ID_LENGTH = int(os.environ.get('ROOM_ID_LENGTH', 4)) # ความยาวรหัสห้อง (36^4 ≈ 1.68 ล้านรหัส)
+ROOM_SWEEP_INTERVAL = 30 # วินาที: ความถี่ในการตรวจหาห้อง/ผู้เล่นที่ถูกทิ้งไว้
+EVENT_LOG_DIR = os.environ.get('EVENT_LOG_DIR') or None # โฟลเดอร์ของ event log (ไม่ตั้ง = ไม่บันทึก)
+if EVENT_LOG_DIR:
+    os.makedirs(EVENT_LOG_DIR, exist_ok=True)
+# ไฟล์ snapshot ของห้องตอน deploy ({worker} ถูกแทนด้วยลำดับของ worker) ไม่ตั้ง = SIGTERM จบ process ทันทีแบบเดิม
+ROOM_SNAPSHOT = (os.environ.get('ROOM_SNAPSHOT') or '').replace('{worker}', str(topology.index)) or None
+REJOIN_GRACE = 30 # วินาที: ผู้เล่นของห้องที่ restore มาที่ยังไม่กลับเข้าห้องภายในเวลานี้ถูกนำออก
+DRAIN_EXIT_DELAY = 0.5 # วินาที: รอให้ server_restarting ถึง client ก่อนจบ process
+draining = False # True ระหว่างเขียน snapshot: ไม่รับห้อง/ผู้เล่นใหม่
+migration = {} # ผลการ drain/restore ล่าสุดของ process นี้ (แสดงใน /stats)
+# ไฟล์หน้าเว็บที่ build แล้ว อ่านเข้าหน่วยความจำครั้งเดียว ASSET_URL (เช่น https://cdn.example.com/cooking) = URL ที่ส่ง static/dist/
+asset_manifest = AssetManifest.load(app.static_folder, url_prefix=os.environ.get('ASSET_URL') or None)
+app.jinja_env.globals['asset_url'] = lambda name: asset_manifest.url_for(name, lambda n: url_for('static', filename=n))
+
+def _socketio_send(event, data, to, skip_sid):
+    """sink ของ GameRoom: ส่งข้อความผ่าน Socket.IO
+    ผู้เล่นทุกคนของห้องต่ออยู่กับ worker เจ้าของห้อง (redirect ตอน join_room) จึงส่งตรงโดยไม่ผ่าน message queue
+    ข้อความอื่นของห้องใน app.py (lobby, ห้องปิด, เกมจบเพราะผู้เล่นออก) ใช้ทางนี้ด้วย และคำตอบถึงผู้ส่ง (emit) ใช้ ignore_queue=True
+    ทุกข้อความของห้องจึงถึง client ตามลำดับที่ส่ง (ข้อความที่ผ่าน queue อาจถึงหลังข้อความที่ส่งตรงซึ่งส่งทีหลัง)"""
+    socketio.emit(event, data, room=to, skip_sid=skip_sid, ignore_queue=True)
+
+def _new_event_log(room_id):
+    """event log ของห้องใหม่ (None ถ้าไม่ได้ตั้ง EVENT_LOG_DIR) รหัสห้องถูกใช้ซ้ำได้ ชื่อไฟล์จึงมีเวลาที่สร้างด้วย"""
+    if not EVENT_LOG_DIR:
+        return None
+    path = os.path.join(EVENT_LOG_DIR, f'{room_id}-{int(time.time() * 1000)}.cklog')
+    return EventLogWriter(path, room_id, random.getrandbits(63), game_scheduler.clock, time.time)
+
+def _everyone(room_id):
+    """ปลายทางของข้อความที่ทั้งผู้เล่นและผู้ชมของห้องควรได้รับ (lobby, ห้องถูกปิด, เกมจบเพราะผู้เล่นออก)"""
+    return [room_id, spectator_room(room_id)]
+
+def _close_room(room, message):
+    """แจ้งทุกคนในห้องที่ถูกลบแล้ว ว่าห้องปิด แล้วนำทุกคนออกจาก socket.io room ของห้อง (ต้องลบออกจาก registry แล้ว)"""
+    for sid in list(room.players) + list(room.spectators):
+        rooms.unbind_sid(sid, room)
+    _socketio_send('room_closed', {'message': message}, _everyone(room.id), None)
+    socketio.close_room(room.id)
+    socketio.close_room(compact_codec.compact_room(room.id))
+    socketio.close_room(spectator_room(room.id))
 
 
 # --- Global State & Master Loop ---
-rooms = {} # {'room_id': GameRoom object}
-rooms_lock = Lock()
+server_metrics.enabled = os.environ.get('METRICS', '1') != '0' # METRICS=0: ปิดการจับเวลา (ต้องตั้งก่อนสร้างห้อง)
+rooms = RoomRegistry(id_length=ROOM_ID_LENGTH, partition=topology.partition, metrics=server_metrics) # ห้องของ worker นี้แบ่งเป็น shard + ดัชนี sid -> ห้อง
+matchmaker = Matchmaker(MAX_PLAYERS, game_scheduler.clock, server_metrics.quick_play) # ห้อง quick play ที่ยังรอผู้เล่นของ worker นี้
 
 def master_game_loop():
     """
     Master Loop ที่ทำงานเบื้องหลังเพียง Loop เดียว
-    เพื่ออัปเดตสถานะของทุกห้องที่กำลังเล่นอยู่พร้อมกัน
+    ไม่ได้วนทุกห้องอีกต่อไป แต่ตื่นเฉพาะเมื่อมี deadline ของห้องใดห้องหนึ่งถึงกำหนด
+    (tick, สุ่มวัตถุดิบ, แปรรูปเสร็จ) ห้องที่ไม่ได้เล่นอยู่จึงไม่มีต้นทุนใน loop นี้
     """
-    while True:
-        with rooms_lock:
-            # สร้าง List ของห้องที่ต้องอัปเดตเพื่อไม่ให้ blockนาน
-            active_rooms = [room for room in rooms.values() if room.game_state and room.game_state.is_active]
-
-        if not active_rooms:
-            socketio.sleep(1) # ถ้าไม่มีห้องเล่นอยู่ ก็พัก 1 วิ
-            continue
-
-        for room in active_rooms:
-            room.update() # เรียกใช้ method update ของแต่ละห้อง
-            # ส่งข้อมูลอัปเดตให้ผู้เล่นในห้องนั้นๆ ทุกวินาที
-            ui_state = room.get_augmented_state_for_ui()
-            if ui_state:
-                socketio.emit('update_game_state', ui_state, room=room.id)
-        
-        # หลังจาก update ทุกห้องเสร็จแล้ว ค่อย sleep
-        # เพื่อให้การ update เกิดขึ้นใกล้เคียงกันทุก 1 วินาที
-        socketio.sleep(1)
+    game_scheduler.run_forever()
+
+def sweep_rooms():
+    """ตรวจห้องที่ถูกทิ้งไว้ (event ของ game_scheduler ทุก ROOM_SWEEP_INTERVAL วินาที)
+    - ผู้เล่นที่หลุดไปแล้วแต่ไม่เคยได้รับ disconnect ถูกนำออก (ห้องที่ไม่เหลือใครถูกลบ)
+    - ห้องใน LOBBY ที่ไม่มีการใช้งานนานเกิน ROOM_IDLE_TTL ถูกปิด และคืนรหัสห้องให้ allocator"""
+    now = game_scheduler.clock()
+    is_connected = lambda sid: socketio.server.manager.is_connected(sid, '/')  # noqa: E731
+    abandoned = 0
+    for room in rooms.values():
+        for sid in room.abandoned_spectators(is_connected):
+            rooms.unbind_sid(sid, room)
+            room.remove_spectator(sid)
+        for sid in room.abandoned_sids(now, is_connected):
+            rooms.unbind_sid(sid, room)
+            _remove_from_room(sid, room, reason='abandoned')
+            abandoned += 1
+
+    closed = 0
+    for room in rooms.idle_rooms(now):
+        if rooms.remove_room(room.id, reason='idle') is None:
+            continue # ถูกลบไปแล้วระหว่างนี้
+        matchmaker.room_closed(room)
+        room.close()
+        _close_room(room, 'ห้องถูกปิดเพราะไม่มีการใช้งานนานเกินไป')
+        closed += 1
+
+    if abandoned or closed:
+        print(f"sweeper: นำผู้เล่นที่หลุดออก {abandoned} คน, ปิดห้องที่ไม่มีการใช้งาน {closed} ห้อง")
+    game_scheduler.call_later(ROOM_SWEEP_INTERVAL, sweep_rooms)
+
+def drain_rooms():
+    """SIGTERM: หยุดรับห้องใหม่ เก็บ snapshot ของทุกห้องแล้วหยุดห้อง (เวลาของเกมไม่เดินต่อหลัง snapshot)
+    เขียนไฟล์ ROOM_SNAPSHOT แจ้ง client ให้ต่อใหม่ แล้วจบ process"""
+    global draining
+    if draining:
+        return
+    draining = True
+    started = time.perf_counter()
+    now = game_scheduler.clock()
+    snapshots = []
+    for room in rooms.values():
+        snapshots.append(room.snapshot(now))
+        room.close() # หยุด timer และเขียน event log ที่ค้างอยู่ลงไฟล์
+    try:
+        size = write_snapshot(ROOM_SNAPSHOT, snapshots, time.time())
+        print(f"drain: เขียน snapshot {len(snapshots)} ห้อง ({size / 1024:,.1f} KB) ลง {ROOM_SNAPSHOT} "
+              f"ใน {(time.perf_counter() - started) * 1000:.1f} ms")
+    except OSError as e:
+        # ห้องถูกปิดไปแล้ว: ต้องจบ process ต่อ ไม่เช่นนั้น worker จะค้างอยู่ในสถานะ draining (ไม่รับผู้เล่น) ตลอดไป
+        print(f"drain: เขียน snapshot ลง {ROOM_SNAPSHOT} ไม่ได้ ({e}) ห้อง {len(snapshots)} ห้องจะไม่ถูก restore")
+    # เฉพาะ client ที่ต่อกับ worker นี้ (ไม่ผ่าน message queue ไปถึง client ของ worker อื่นที่ไม่ได้รีสตาร์ท)
+    socketio.emit('server_restarting', {'message': 'เซิร์ฟเวอร์กำลังรีสตาร์ท กำลังต่อกลับเข้าห้อง...'}, ignore_queue=True)
+    socketio.sleep(DRAIN_EXIT_DELAY)
+    os._exit(0)
+
+def restore_rooms(path):
+    """สร้างห้องจาก snapshot ของ process ก่อนหน้า (ถ้ามีไฟล์) แล้วเปลี่ยนชื่อไฟล์เป็น .restored ไม่ให้ถูก restore ซ้ำ"""
+    if not path or not os.path.exists(path):
+        return
+    started = time.perf_counter()
+    try:
+        written_at, snapshots = read_snapshot(path)
+    except (OSError, SnapshotError) as e:
+        print(f"restore: อ่าน snapshot {path} ไม่ได้ ({e}) เริ่มโดยไม่มีห้อง")
+        return
+    restored = []
+    for data in snapshots:
+        if topology.owner_of(data[0]) != topology.index:
+            continue # จำนวน worker เปลี่ยน: ห้องนี้ไม่ใช่ของ worker นี้แล้ว
+        room = GameRoom.restore(data, game_scheduler, _socketio_send)
+        if rooms.restore_room(room):
+            restored.append(room)
+    os.replace(path, f'{path}.restored')
+    migration.update({
+        'restored_rooms': len(restored),
+        'restored_players': sum(len(room.players) for room in restored),
+        'restore_ms': round((time.perf_counter() - started) * 1000, 1),
+        'downtime_s': round(time.time() - written_at, 2), # ตั้งแต่ process เดิมเขียน snapshot จนห้องพร้อม
+    })
+    print(f"restore: ห้อง {len(restored)}/{len(snapshots)} ห้องจาก {path} ใน {migration['restore_ms']} ms "
+          f"(ห่างจากตอนเขียน snapshot {migration['downtime_s']} วินาที)")
+    if restored:
+        game_scheduler.call_later(REJOIN_GRACE, _drop_unclaimed_players, restored)
+
+def _drop_unclaimed_players(restored):
+    """นำผู้เล่นของห้องที่ restore มาซึ่งไม่ได้กลับเข้าห้อง (sid ยังเป็นของ process เดิม) ออกจากห้อง"""
+    dropped = 0
+    for room in restored:
+        if rooms.get(room.id) is not room:
+            continue # ห้องถูกลบไปแล้ว
+        for sid in list(room.players):
+            if rooms.room_for_sid(sid) is not room:
+                _remove_from_room(sid, room, reason='unclaimed')
+                dropped += 1
+    if dropped:
+        print(f"restore: นำผู้เล่นที่ไม่กลับเข้าห้องภายใน {REJOIN_GRACE} วินาทีออก {dropped} คน")
+
+def _rss_mb():
+    """หน่วยความจำ (RSS) ปัจจุบันของ process เป็น MB (None ถ้าอ่านไม่ได้ เช่นบน Windows)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # ค่าสูงสุด: KB บน Linux, byte บน macOS
+    return round(peak / (2**20 if sys.platform == 'darwin' else 2**10), 1)
 
 
 # --- SocketIO Event Handlers ---
@@ -431,6 +223,68 @@ def master_game_loop():
 def index():
     return render_template('index.html')
 
+@app.route('/assets/<path:filename>')
+def hashed_asset(filename):
+    """ไฟล์หน้าเว็บที่ build แล้ว: ส่งแบบบีบอัดที่ client รับได้จากหน่วยความจำ ไม่อ่านดิสก์/ไม่บีบอัดระหว่างเกม"""
+    asset = asset_manifest.by_file.get(filename)
+    if asset is None:
+        return Response('ไม่พบไฟล์', status=404)
+    encoding, data = asset.choose(lambda e: request.accept_encodings.quality(e) > 0)
+    etag = f'{asset.etag}-{encoding}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(data, content_type=asset.content_type)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+@app.route('/stats')
+def stats():
+    """สถิติของ server: จำนวนห้อง, event ที่รออยู่ และ tick ที่มาช้า (overrun)"""
+    all_rooms = rooms.values()
+    total_rooms = len(all_rooms)
+    active_rooms = sum(1 for room in all_rooms if room.game_state and room.game_state.is_active)
+    return jsonify({
+        'rooms': total_rooms,
+        'active_rooms': active_rooms,
+        'scheduled_events': len(game_scheduler),
+        'tick': tick_metrics.snapshot(),
+        'registry': rooms.gauges(),
+        'rss_mb': _rss_mb(),
+        'worker': {'index': topology.index, 'count': topology.count, 'message_queue': bool(MESSAGE_QUEUE)},
+        'migration': dict(migration, draining=draining),
+        'quick_play': matchmaker.gauges(),
+    })
+
+@app.route('/metrics')
+def metrics():
+    """metrics ในรูปแบบ text ของ Prometheus (?top=N เพิ่มสถิติของ N ห้องที่ใช้เวลาทำงานมากที่สุด)"""
+    all_rooms = rooms.values()
+    tick = tick_metrics.snapshot()
+    rss_mb = _rss_mb()
+    gauges = {
+        'cooking_rooms': ('Rooms on this worker', len(all_rooms)),
+        'cooking_active_rooms': ('Rooms with a running game clock', sum(1 for room in all_rooms if room.game_state and room.game_state.is_active)),
+        'cooking_players': ('Players in rooms on this worker', sum(len(room.players) for room in all_rooms)),
+        'cooking_spectators': ('Spectators in rooms on this worker', sum(len(room.spectators) for room in all_rooms)),
+        'cooking_scheduled_events': ('Events waiting in the game scheduler', len(game_scheduler)),
+        'cooking_tick_lateness_ewma_seconds': ('Smoothed lateness of game clock ticks', tick['lateness_ewma_ms'] / 1000),
+    }
+    if rss_mb is not None:
+        gauges['cooking_process_rss_bytes'] = ('Resident memory of this worker', int(rss_mb * 2**20))
+    counters = {
+        'cooking_ticks_total': ('Game clock ticks', tick['ticks']),
+        'cooking_tick_overruns_total': ('Ticks that ran at least one interval late', tick['overruns']),
+        'cooking_tick_catch_up_steps_total': ('Extra clock steps taken to catch up after late ticks', tick['catch_up_steps']),
+    }
+    top = max(0, request.args.get('top', default=0, type=int))
+    body = server_metrics.render(gauges, counters, all_rooms, top, game_scheduler.clock())
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 @socketio.on('connect')
 def handle_connect():
     print(f"ผู้เล่นเชื่อมต่อเข้ามา: {request.sid}")
@@ -438,102 +292,238 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print(f"ผู้เล่นตัดการเชื่อมต่อ: {request.sid}")
-    room_to_update = None
-    with rooms_lock:
-        for room in rooms.values():
-            if request.sid in room.players:
-                room_to_update = room
-                break
-    
-    if not room_to_update: return
-
-    player_name = room_to_update.players.get(request.sid, Player(None, 'Unknown')).name
-    result = room_to_update.remove_player(request.sid)
+    room_to_update = rooms.pop_sid(request.sid) # ค้นหาจากดัชนี sid -> ห้อง ไม่ต้องวนทุกห้อง
+    if room_to_update and not room_to_update.remove_spectator(request.sid):
+        _remove_from_room(request.sid, room_to_update)
+
+def _remove_from_room(leaving_sid, room_to_update, reason='empty'):
+    """นำผู้เล่นออกจากห้อง (ตัดการเชื่อมต่อ หรือ sweeper พบว่าหลุดไปแล้ว) ลบห้องถ้าไม่เหลือใคร"""
+    player_name = room_to_update.players.get(leaving_sid, Player(None, 'Unknown')).name
+    result = room_to_update.remove_player(leaving_sid)
     print(f"ผู้เล่น {player_name} ออกจากห้อง {room_to_update.id}")
 
     if result == 'delete_room':
-        with rooms_lock:
-            if room_to_update.id in rooms:
-                del rooms[room_to_update.id]
-            print(f"ห้อง {room_to_update.id} ว่างเปล่า, ทำการลบห้อง")
+        rooms.remove_room(room_to_update.id, reason)
+        matchmaker.room_closed(room_to_update)
+        if room_to_update.spectators:
+            _close_room(room_to_update, 'ผู้เล่นออกจากห้องหมดแล้ว')
+        print(f"ห้อง {room_to_update.id} ว่างเปล่า, ทำการลบห้อง")
         return
     
+    matchmaker.left(leaving_sid, room_to_update) # ห้อง quick play ที่ยังไม่เริ่ม: ที่นั่งว่างเพิ่มขึ้น
     if result == 'game_over_disconnect':
         total_final_score = room_to_update.game_state.total_score + room_to_update.game_state.score if room_to_update.game_state else 0
-        socketio.emit('game_over', {'total_score': total_final_score, 'message': 'ผู้เล่นไม่พอที่จะเล่นต่อ เกมจบลง'}, room=room_to_update.id)
+        _socketio_send('game_over', {'total_score': total_final_score, 'message': 'ผู้เล่นไม่พอที่จะเล่นต่อ เกมจบลง'}, _everyone(room_to_update.id), None)
         room_to_update.game_state = None
 
     # อัปเดตข้อมูล Lobby และเพื่อนบ้าน
-    socketio.emit('update_lobby', room_to_update.get_lobby_info(), room=room_to_update.id)
-    if room_to_update.host_sid == request.sid: # ถ้า host เดิมออก
-        socketio.emit('new_host', {'host_sid': room_to_update.host_sid}, room=room_to_update.id)
+    _socketio_send('update_lobby', room_to_update.get_lobby_info(), _everyone(room_to_update.id), None)
+    if room_to_update.host_sid == leaving_sid: # ถ้า host เดิมออก
+        _socketio_send('new_host', {'host_sid': room_to_update.host_sid}, room_to_update.id, None)
 
-    if room_to_update.game_state and room_to_update.game_state.is_active:
+    if room_to_update.game_state and room_to_update.phase != RoomPhase.LOBBY:
         player_sids = room_to_update.game_state.player_order_sids
         for i, sid in enumerate(player_sids):
             left_sid = player_sids[i - 1]
             right_sid = player_sids[(i + 1) % len(player_sids)]
-            socketio.emit('update_neighbors', {
+            _socketio_send('update_neighbors', {
                 'left_neighbor': room_to_update.players[left_sid].name,
                 'right_neighbor': room_to_update.players[right_sid].name
-            }, room=sid)
-        ui_state = room_to_update.get_augmented_state_for_ui()
-        if ui_state:
-            socketio.emit('update_game_state', ui_state, room=room_to_update.id)
+            }, sid, None)
+        room_to_update.broadcast_state()
+
+DRAINING_MESSAGE = 'เซิร์ฟเวอร์กำลังรีสตาร์ท กรุณาลองใหม่อีกครั้งในไม่กี่วินาที'
+
+def _join_game_rooms(room_id, codec):
+    """เข้า socket.io room ของห้องเกม (ข้อความ lobby เป็น JSON) และ room ของ client แบบย่อถ้าใช้ msgpack"""
+    join_room(room_id)
+    if codec != compact_codec.CODEC_JSON:
+        join_room(compact_codec.compact_room(room_id))
 
 @socketio.on('create_room')
 def handle_create_room(data):
+    if draining:
+        emit('error_message', {'message': DRAINING_MESSAGE}, ignore_queue=True)
+        return
     player_name = data.get('name', 'ผู้เล่นนิรนาม')
-    while True:
-        room_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        if room_id not in rooms:
-            break
-    
-    room = GameRoom(room_id, request.sid, player_name)
-    with rooms_lock:
-        rooms[room_id] = room
-    
-    join_room(room_id)
-    emit('room_created', {'room_id': room_id, 'is_host': True})
-    socketio.emit('update_lobby', room.get_lobby_info(), room=room_id)
+    codec = compact_codec.negotiate(data.get('codecs'))
+    try:
+        # รหัสห้องจาก allocator ไม่ซ้ำแน่นอน ไม่ต้องวนสุ่มจนกว่าจะเจอรหัสที่ว่าง
+        room = rooms.create_room(
+            lambda room_id: GameRoom(room_id, request.sid, player_name, game_scheduler, _socketio_send, host_codec=codec,
+                                     event_log=_new_event_log(room_id)),
+            request.sid)
+    except RoomIdsExhausted:
+        emit('error_message', {'message': 'เซิร์ฟเวอร์เต็ม ไม่สามารถสร้างห้องใหม่ได้'}, ignore_queue=True)
+        return
+    room_id = room.id
+
+    _join_game_rooms(room_id, codec)
+    emit('room_created', {'room_id': room_id, 'is_host': True, 'codec': codec, 'reconnect_token': room.players[request.sid].token}, ignore_queue=True)
+    _socketio_send('update_lobby', room.get_lobby_info(), _everyone(room_id), None)
 
 @socketio.on('join_room')
 def handle_join_room(data):
     player_name = data.get('name', 'ผู้เล่นนิรนาม')
     room_id = data.get('room_id', '').upper()
+    codec = compact_codec.negotiate(data.get('codecs'))
 
-    with rooms_lock:
-        room = rooms.get(room_id)
+    redirect_url = topology.redirect_url(room_id)
+    if redirect_url:
+        # ห้องอยู่ที่ worker อื่น: client ต่อใหม่ที่ worker เจ้าของแล้วส่ง join_room เดิมอีกครั้ง
+        emit('redirect', {'url': redirect_url, 'room_id': room_id}, ignore_queue=True)
+        return
+
+    if draining:
+        emit('error_message', {'message': DRAINING_MESSAGE}, ignore_queue=True)
+        return
+    room = rooms.get(room_id)
 
     if not room:
-        emit('error_message', {'message': 'ไม่พบห้องนี้!'})
+        emit('error_message', {'message': 'ไม่พบห้องนี้!'}, ignore_queue=True)
         return
-    if room.game_state and room.game_state.is_active:
-        emit('error_message', {'message': 'เกมในห้องนี้เริ่มไปแล้ว!'})
+    if room.phase != RoomPhase.LOBBY:
+        emit('error_message', {'message': 'เกมในห้องนี้เริ่มไปแล้ว!'}, ignore_queue=True)
         return
     
-    if not room.add_player(request.sid, player_name):
-        emit('error_message', {'message': 'ห้องเต็มแล้ว!'})
+    if not room.add_player(request.sid, player_name, codec):
+        emit('error_message', {'message': 'ห้องเต็มแล้ว!'}, ignore_queue=True)
         return
+    rooms.bind_sid(request.sid, room)
+    full = matchmaker.joined(room) # ห้อง quick play ที่มีคนเข้าด้วยรหัส: ที่นั่งว่างใน matchmaker ต้องตรงกับห้อง
+
+    _join_game_rooms(room_id, codec)
+    # ส่งตรงแบบเดียวกับ handle_quick_play: ห้อง quick play ที่เต็มเริ่มเกมทันที join_success ต้องถึงก่อน game_started
+    emit('join_success', {'room_id': room_id, 'is_host': request.sid == room.host_sid, 'codec': codec,
+                          'reconnect_token': room.players[request.sid].token}, ignore_queue=True)
+    _socketio_send('update_lobby', room.get_lobby_info(), _everyone(room_id), None)
+    if full:
+        matchmaker.room_started(room)
+        room.start_game()
+
+@socketio.on('quick_play')
+def handle_quick_play(data):
+    """เล่นด่วน: เข้าห้อง quick play ที่ใกล้เต็มที่สุด หรือเป็น host ของห้องใหม่ถ้าไม่มีห้องที่รอผู้เล่นอยู่"""
+    if draining:
+        emit('error_message', {'message': DRAINING_MESSAGE}, ignore_queue=True)
+        return
+    sid = request.sid
+    if rooms.room_for_sid(sid):
+        return # อยู่ในห้องอื่นแล้ว
+    player_name = data.get('name', 'ผู้เล่นนิรนาม')
+    codec = compact_codec.negotiate(data.get('codecs'))
 
+    def join(room):
+        if rooms.get(room.id) is not room or room.phase != RoomPhase.LOBBY:
+            return False
+        return room.add_player(sid, player_name, codec)
+
+    def create():
+        room = rooms.create_room(
+            lambda room_id: GameRoom(room_id, sid, player_name, game_scheduler, _socketio_send, host_codec=codec,
+                                     event_log=_new_event_log(room_id)),
+            sid)
+        game_scheduler.call_later(QUICK_PLAY_MAX_WAIT, _quick_play_timeout, room)
+        return room
+
+    try:
+        room, full = matchmaker.place(sid, join, create)
+    except RoomIdsExhausted:
+        emit('error_message', {'message': 'เซิร์ฟเวอร์เต็ม ไม่สามารถสร้างห้องใหม่ได้'}, ignore_queue=True)
+        return
+    rooms.bind_sid(sid, room) # host ของห้องใหม่ถูกผูกไว้แล้ว ผูกซ้ำได้
+
+    _join_game_rooms(room.id, codec)
+    # ส่งตรงแบบเดียวกับข้อความของเกม (_socketio_send) ไม่ผ่าน message queue:
+    # ห้องที่เต็มเริ่มเกมทันที join_success ต้องถึง client ก่อน game_started
+    emit('join_success', {'room_id': room.id, 'is_host': sid == room.host_sid, 'codec': codec,
+                          'reconnect_token': room.players[sid].token, 'quick_play': True}, ignore_queue=True)
+    _socketio_send('update_lobby', room.get_lobby_info(), _everyone(room.id), None)
+    if full:
+        matchmaker.room_started(room)
+        room.start_game()
+
+def _quick_play_timeout(room):
+    """ห้อง quick play รอครบ QUICK_PLAY_MAX_WAIT: เริ่มเกมถ้ามีผู้เล่นพอ ไม่เช่นนั้นรอต่ออีกรอบ"""
+    if not matchmaker.is_waiting(room):
+        return # เต็มแล้ว/host เริ่มเอง/ห้องถูกลบ
+    if matchmaker.ready_to_start(room):
+        matchmaker.room_started(room, timeout=True)
+        room.start_game()
+    else:
+        game_scheduler.call_later(QUICK_PLAY_MAX_WAIT, _quick_play_timeout, room)
+
+@socketio.on('rejoin_room')
+def handle_rejoin_room(data):
+    """ผู้เล่นที่หลุด (หรือ server รีสตาร์ท) กลับเข้าห้องเดิมด้วย reconnect token ผ่านการเชื่อมต่อใหม่"""
+    room_id = str(data.get('room_id', '')).upper()
+    token = data.get('token')
+    redirect_url = topology.redirect_url(room_id)
+    if redirect_url:
+        emit('redirect', {'url': redirect_url, 'room_id': room_id}, ignore_queue=True)
+        return
+
+    room = rooms.get(room_id)
+    if not room or draining or not isinstance(token, str):
+        emit('rejoin_failed', {'message': 'กลับเข้าห้องเดิมไม่ได้ ห้องอาจถูกปิดไปแล้ว'}, ignore_queue=True)
+        return
+    # เข้า room ของห้องก่อน เพื่อไม่ให้พลาด patch ที่ส่งระหว่าง rebind_player
     join_room(room_id)
-    emit('join_success', {'room_id': room_id, 'is_host': request.sid == room.host_sid})
-    socketio.emit('update_lobby', room.get_lobby_info(), room=room_id)
+    old_sid = room.rebind_player(token, request.sid)
+    if old_sid is None:
+        leave_room(room_id)
+        emit('rejoin_failed', {'message': 'กลับเข้าห้องเดิมไม่ได้ คุณอาจถูกนำออกจากห้องแล้ว'}, ignore_queue=True)
+        return
+    _join_game_rooms(room_id, room.players[request.sid].codec)
+    rooms.bind_sid(request.sid, room)
+    if old_sid != request.sid and rooms.room_for_sid(old_sid) is room:
+        # การเชื่อมต่อเดิมยังอยู่ (เช่นเปิดหลายแท็บ): การเชื่อมต่อใหม่แทนที่
+        rooms.unbind_sid(old_sid, room)
+        for name in (room_id, compact_codec.compact_room(room_id)):
+            leave_room(name, sid=old_sid)
+        _socketio_send('room_closed', {'message': 'คุณกลับเข้าห้องนี้จากการเชื่อมต่ออื่นแล้ว'}, old_sid, None)
+    print(f"ผู้เล่น {room.players[request.sid].name} กลับเข้าห้อง {room_id}")
+    _socketio_send('update_lobby', room.get_lobby_info(), _everyone(room_id), None)
+
+@socketio.on('spectate_room')
+def handle_spectate_room(data):
+    """เข้าดูห้องแบบผู้ชม (เข้าได้ทุกสถานะของห้อง ไม่นับเป็นผู้เล่น)"""
+    if rooms.room_for_sid(request.sid):
+        # sid ผูกกับห้องได้ห้องเดียว: ถ้าทับของผู้เล่น ตอน disconnect จะเอาออกแค่ผู้ชม ผู้เล่นจะค้างอยู่ในเกม
+        emit('error_message', {'message': 'คุณอยู่ในห้องอื่นอยู่แล้ว!'}, ignore_queue=True)
+        return
+    room_id = data.get('room_id', '').upper()
+    redirect_url = topology.redirect_url(room_id)
+    if redirect_url:
+        emit('redirect', {'url': redirect_url, 'room_id': room_id}, ignore_queue=True)
+        return
+
+    room = rooms.get(room_id)
+    if not room:
+        emit('error_message', {'message': 'ไม่พบห้องนี้!'}, ignore_queue=True)
+        return
+    # เข้า room ของผู้ชมก่อน เพื่อไม่ให้พลาด patch ที่ส่งหลัง snapshot ใน spectate_success
+    join_room(spectator_room(room_id))
+    if not room.add_spectator(request.sid):
+        leave_room(spectator_room(room_id))
+        emit('error_message', {'message': 'ผู้ชมในห้องนี้เต็มแล้ว!'}, ignore_queue=True)
+        return
+    rooms.bind_sid(request.sid, room)
 
 @socketio.on('start_game')
 def handle_start_game(data):
     room_id = data.get('room_id')
-    with rooms_lock:
-        room = rooms.get(room_id)
+    room = rooms.get(room_id)
     if not room or room.host_sid != request.sid:
         return
+    if matchmaker.is_waiting(room):
+        matchmaker.room_started(room) # host ของห้อง quick play กดเริ่มก่อนห้องเต็ม
     room.start_game()
 
 @socketio.on('player_action')
 def handle_player_action(data):
     room_id = data.get('room_id')
-    with rooms_lock:
-        room = rooms.get(room_id)
+    room = rooms.get(room_id)
     if room:
         room.handle_player_action(request.sid, data)
 
@@ -541,14 +531,30 @@ def handle_player_action(data):
 def handle_use_ability(data):
     room_id = data.get('room_id')
     item_name = data.get('item_name')
-    with rooms_lock:
-        room = rooms.get(room_id)
+    room = rooms.get(room_id)
     if room:
         room.use_ability(request.sid, item_name)
 
+@socketio.on('request_state_sync')
+def handle_request_state_sync(data):
+    """client ขอ state เต็มใหม่ เมื่อได้รับ patch ที่เวอร์ชันไม่ต่อเนื่อง"""
+    room_id = data.get('room_id')
+    room = rooms.get(room_id)
+    if room:
+        room.send_state_snapshot(request.sid)
+
 # --- Main Execution ---
 if __name__ == '__main__':
-    print("เซิร์ฟเวอร์กำลังจะเริ่มที่ http://127.0.0.1:5001")
+    port = int(os.environ.get('PORT', 5001))
+    print(f"เซิร์ฟเวอร์กำลังจะเริ่มที่ http://127.0.0.1:{port} (worker {topology.index + 1}/{topology.count})")
+    if asset_manifest:
+        print(f"assets: {len(asset_manifest)} ไฟล์ที่ build แล้ว {asset_manifest.bytes_total()} byte")
+    else:
+        print("assets: ยังไม่ได้ build (python tools/build_assets.py) ใช้ไฟล์ใน static/ แบบไม่บีบอัด")
     # เริ่ม Master Game Loop ใน Background
     socketio.start_background_task(target=master_game_loop)
-    socketio.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5001)), debug=False)
\ No newline at end of file
+    game_scheduler.call_later(ROOM_SWEEP_INTERVAL, sweep_rooms)
+    if ROOM_SNAPSHOT:
+        restore_rooms(ROOM_SNAPSHOT)
+        signal.signal(signal.SIGTERM, lambda signum, frame: socketio.start_background_task(drain_rooms))
+    socketio.run(app, host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
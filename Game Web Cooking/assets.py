@@ -0,0 +1,144 @@
+# assets.py
+# ไฟล์หน้าเว็บ (static/js/main.js, static/css/style.css) แบบใส่ hash ในชื่อไฟล์และบีบอัดไว้ล่วงหน้า
+#
+# - build_assets (เรียกจาก tools/build_assets.py ตอน deploy) เขียนไฟล์ลง static/dist/: ชื่อไฟล์มี hash ของเนื้อหา
+#   (เช่น js/main.1a2b3c4d5e.js) พร้อม .gz และ .br (ถ้ามีโมดูล brotli) บีบอัดระดับสูงสุดครั้งเดียว แล้วเขียน manifest.json
+# - เนื้อหาเปลี่ยน = ชื่อไฟล์เปลี่ยน browser/CDN จึง cache ได้ตลอดไป (immutable) ไม่ต้องถามซ้ำทุกครั้งที่เปิดหน้า
+# - AssetManifest อ่าน manifest และไฟล์ทุกแบบเข้าหน่วยความจำครั้งเดียวตอนเริ่ม process การส่งไฟล์ให้ client
+#   จึงไม่มีการอ่านดิสก์หรือบีบอัดใน process ของเกม ถ้ามี reverse proxy/CDN ให้ส่ง static/dist/ เองแล้วตั้ง ASSET_URL
+#   process ของเกมจะไม่ได้รับ request ของไฟล์เหล่านี้อีกเลย
+# - ไม่มี manifest (ยังไม่ได้ build): ใช้ /static/ ของ Flask แบบเดิม
+
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError: # ไม่มี brotli: มีเฉพาะ .gz
+    brotli = None
+
+SOURCES = ('js/main.js', 'css/style.css') # ไฟล์ใน static/ ที่ถูก build
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+HASH_LENGTH = 10
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable' # 1 ปี: ชื่อไฟล์เปลี่ยนทุกครั้งที่เนื้อหาเปลี่ยน
+# ลำดับที่เลือกเมื่อ client รับได้หลายแบบ (แบบที่เล็กกว่าก่อน) และนามสกุลของไฟล์แต่ละแบบ
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+CONTENT_TYPES = {'.js': 'text/javascript; charset=utf-8', '.css': 'text/css; charset=utf-8'}
+
+
+def _compress(encoding, data):
+    if encoding == 'gzip':
+        return gzip.compress(data, 9, mtime=0) # mtime=0: build ซ้ำได้ byte เดิม
+    return brotli.compress(data, quality=11)
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_assets(static_dir, sources=SOURCES):
+    """build ไฟล์ทุกไฟล์ลง static_dir/dist แล้วเขียน manifest คืนค่า manifest (dict)
+    ไฟล์ของ build ก่อนหน้าไม่ถูกลบ: หน้าเว็บที่เปิดค้างไว้ยังโหลดไฟล์เวอร์ชันเดิมได้ระหว่าง deploy"""
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    assets = {}
+    for name in sources:
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        root, ext = os.path.splitext(name)
+        hashed = f'{root}.{digest[:HASH_LENGTH]}{ext}'
+        _write(os.path.join(dist_dir, hashed), data)
+        sizes = {'identity': len(data)}
+        for encoding, suffix in ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+            compressed = _compress(encoding, data)
+            if len(compressed) >= len(data):
+                continue # บีบอัดแล้วไม่เล็กลง
+            _write(os.path.join(dist_dir, hashed + suffix), compressed)
+            sizes[encoding] = len(compressed)
+        assets[name] = {'file': hashed, 'sha256': digest, 'bytes': sizes}
+    manifest = {'version': MANIFEST_VERSION, 'assets': assets}
+    _write(os.path.join(dist_dir, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+class Asset:
+    """ไฟล์หนึ่งไฟล์ที่ build แล้ว: เนื้อหาทุกแบบอยู่ในหน่วยความจำ"""
+    __slots__ = ('name', 'file', 'etag', 'content_type', 'variants')
+
+    def __init__(self, name, file, etag, content_type, variants):
+        self.name = name
+        self.file = file
+        self.etag = etag
+        self.content_type = content_type
+        self.variants = variants # {encoding: bytes} ('identity' = ไม่บีบอัด)
+
+    def choose(self, accepts):
+        """(encoding, bytes) ที่เล็กที่สุดที่ client รับได้ `accepts(encoding)` คืนค่า True ถ้า Accept-Encoding มี encoding นั้น"""
+        for encoding, _ in ENCODINGS:
+            data = self.variants.get(encoding)
+            if data is not None and accepts(encoding):
+                return encoding, data
+        return 'identity', self.variants['identity']
+
+
+class AssetManifest:
+    """ไฟล์ที่ build แล้วของ process นี้ (ว่างถ้ายังไม่ได้ build)"""
+    def __init__(self, assets=(), url_prefix=None):
+        self.by_name = {asset.name: asset for asset in assets}
+        self.by_file = {asset.file: asset for asset in assets}
+        self.url_prefix = url_prefix # None = ส่งผ่าน route ของ app (ดู app.py)
+
+    def __len__(self):
+        return len(self.by_name)
+
+    @classmethod
+    def load(cls, static_dir, url_prefix=None):
+        """อ่าน manifest และไฟล์ทุกแบบ (ไม่มี manifest หรืออ่านไม่ได้ = manifest ว่าง ใช้ /static/ แบบเดิม)"""
+        dist_dir = os.path.join(static_dir, DIST_DIR)
+        try:
+            with open(os.path.join(dist_dir, MANIFEST), 'rb') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != MANIFEST_VERSION:
+                raise ValueError(f"manifest เวอร์ชัน {manifest.get('version')}")
+            assets = []
+            for name, entry in manifest['assets'].items():
+                variants = {}
+                for encoding, suffix in (('identity', ''),) + ENCODINGS:
+                    if encoding in entry['bytes']:
+                        with open(os.path.join(dist_dir, entry['file'] + suffix), 'rb') as f:
+                            variants[encoding] = f.read()
+                content_type = CONTENT_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream')
+                assets.append(Asset(name, entry['file'], entry['sha256'][:HASH_LENGTH], content_type, variants))
+        except FileNotFoundError:
+            return cls(url_prefix=url_prefix)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"assets: อ่าน {dist_dir} ไม่ได้ ({e}) ใช้ไฟล์ใน static/ แบบเดิม")
+            return cls(url_prefix=url_prefix)
+        return cls(assets, url_prefix)
+
+    def url_for(self, name, fallback):
+        """URL ของไฟล์ `name` (เช่น 'js/main.js') `fallback(name)` ใช้กับไฟล์ที่ไม่ได้ build"""
+        asset = self.by_name.get(name)
+        if asset is None:
+            return fallback(name)
+        if self.url_prefix:
+            return f'{self.url_prefix.rstrip("/")}/{asset.file}'
+        return f'/assets/{asset.file}'
+
+    def bytes_total(self):
+        """{encoding: byte รวมของทุกไฟล์} สำหรับ log ตอนเริ่ม"""
+        totals = {}
+        for asset in self.by_name.values():
+            for encoding, data in asset.variants.items():
+                totals[encoding] = totals.get(encoding, 0) + len(data)
+        return totals
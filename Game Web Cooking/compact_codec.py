@@ -0,0 +1,175 @@
+# compact_codec.py
+# การเข้ารหัสข้อความแบบย่อ (MessagePack + เลข ID) สำหรับ client ที่รองรับ เลือกได้ต่อ client
+#
+# - client ส่ง `codecs: ['msgpack']` มากับ create_room/join_room ถ้า server มีโมดูล msgpack จะตอบ `codec: 'msgpack'`
+#   client เก่าที่ไม่ได้ส่งมา (หรือ server ไม่มี msgpack) ใช้ JSON แบบเดิมทุกอย่าง
+# - วัตถุดิบ/เมนู/ความสามารถ และผู้เล่น (ที่นั่ง) ถูกแทนด้วยเลข index ของพจนานุกรม ซึ่งส่งครั้งเดียวใน game_started
+# - key ของ state/patch เป็นเลข index แทนชื่อ field และไม่ส่ง all_player_objectives
+#   (client สร้างเองจาก objective ของแต่ละที่นั่ง + ตารางเมนูในพจนานุกรม)
+# - ข้อความทั้งหมดของ 1 packet รวมเป็น msgpack array เดียว ส่งเป็น binary ใน event PACKED_EVENT
+# - ข้อความที่ส่งทั้งห้องไปถึง client แบบย่อผ่าน socket.io room แยก (compact_room) ห้อง JSON เดิมจึงไม่ต้องเปลี่ยน
+
+from json_cache import PreSerialized
+
+try:
+    import msgpack
+except ImportError: # ไม่มี msgpack: ทุก client ใช้ JSON
+    msgpack = None
+
+CODEC_JSON = 'json'
+CODEC_MSGPACK = 'msgpack'
+PACKED_EVENT = 'packed'
+
+# ลำดับในตารางเหล่านี้คือเลข ID ที่ส่งจริง (ต้องตรงกับ static/js/main.js) เพิ่มได้เฉพาะต่อท้าย
+EVENTS = (
+    'update_game_state', 'state_patch', 'receive_item', 'game_started', 'start_next_level',
+    'action_success', 'action_fail', 'level_complete', 'game_won', 'game_over', 'clear_all_items', 'update_neighbors',
+)
+STATE_FIELDS = (
+    'version', 'is_active', 'level', 'score', 'total_score', 'target_score', 'time_left',
+    'player_order_sids', 'players_state',
+)
+PATCH_KEYS = ('fields', 'players', 'removed_players', 'base_version', 'version')
+
+EVENT_IDS = {event: i for i, event in enumerate(EVENTS)}
+STATE_FIELD_IDS = {field: i for i, field in enumerate(STATE_FIELDS)}
+PATCH_KEY_IDS = {key: i for i, key in enumerate(PATCH_KEYS)}
+
+
+def negotiate(requested):
+    """เลือก codec จากรายการที่ client รองรับ (ค่าที่ไม่รู้จักหรือไม่ได้ส่งมา = JSON)"""
+    if msgpack and isinstance(requested, list) and CODEC_MSGPACK in requested:
+        return CODEC_MSGPACK
+    return CODEC_JSON
+
+
+def compact_room(room_id):
+    """ชื่อ socket.io room ของ client แบบย่อในห้องเกม room_id"""
+    return f'{room_id}:{CODEC_MSGPACK}'
+
+
+def pack_batch(encoded_messages):
+    """รวมข้อความที่เข้ารหัสแล้ว (msgpack ทีละข้อความ) เป็น msgpack array เดียว โดยไม่ต้องเข้ารหัสซ้ำ"""
+    count = len(encoded_messages)
+    if count < 16:
+        header = bytes((0x90 | count,))
+    else:
+        header = b'\xdc' + count.to_bytes(2, 'big')
+    return header + b''.join(encoded_messages)
+
+
+class CompactTables:
+    """ตาราง ID ของข้อมูลคงที่ของเกม (วัตถุดิบ, เมนู, ความสามารถ) สร้างครั้งเดียวตอน import"""
+    def __init__(self, items, recipes, recipe_hints, abilities):
+        self.item_ids = {name: i for i, name in enumerate(items)}
+        self.recipe_ids = {name: i for i, name in enumerate(recipes)}
+        self.ability_ids = {name: i for i, name in enumerate(abilities)}
+        item_ids = self.item_ids
+        self.dictionary = {
+            'items': list(items),
+            # [ชื่อเมนู, คะแนน, [[วัตถุดิบ, ความสามารถที่ใช้แปรรูป, วัตถุดิบก่อนแปรรูป], ...]]
+            'recipes': [
+                [name, recipes[name]['points'], [
+                    [item_ids[hint['name']], self.ability_ids.get(hint['hint']), item_ids.get(hint['base'])]
+                    for hint in recipe_hints[name]
+                ]]
+                for name in recipes
+            ],
+            'abilities': list(abilities),
+        }
+
+
+class CompactEncoder:
+    """เข้ารหัสข้อความของ 1 เกม (ที่นั่งของผู้เล่นกำหนดตอนเริ่มเกมและคงที่จนจบเกม)
+    ค่าที่ไม่มีในตาราง (เช่นไอเท็มที่ client ส่งมาเอง) ส่งเป็นข้อความตามเดิม"""
+    __slots__ = ('item_ids', 'recipe_ids', 'ability_ids', 'seat_ids', 'dictionary')
+
+    def __init__(self, tables, players):
+        self.item_ids = tables.item_ids
+        self.recipe_ids = tables.recipe_ids
+        self.ability_ids = tables.ability_ids
+        self.seat_ids = {sid: seat for seat, (sid, _) in enumerate(players)}
+        self.dictionary = dict(tables.dictionary, seats=[[sid, name] for sid, name in players])
+
+    def rename_seat(self, old_sid, sid):
+        """ผู้เล่นกลับเข้าห้องด้วย sid ใหม่: ที่นั่งเดิมชี้ไปที่ sid ใหม่ (client ได้พจนานุกรมใหม่ใน rejoin_success)"""
+        seat = self.seat_ids.pop(old_sid, None)
+        if seat is not None:
+            self.seat_ids[sid] = seat
+            self.dictionary['seats'][seat] = [sid, self.dictionary['seats'][seat][1]]
+
+    def encode(self, event, data):
+        """เข้ารหัสข้อความ 1 รายการเป็น msgpack ([event ID, ข้อมูลแบบย่อ])"""
+        if isinstance(data, PreSerialized):
+            data = data.obj
+        encode_data = _DATA_ENCODERS.get(event)
+        if encode_data:
+            data = encode_data(self, data)
+        return msgpack.packb([EVENT_IDS.get(event, event), data])
+
+    def _item(self, name):
+        return self.item_ids.get(name, name)
+
+    def _seat(self, sid):
+        return self.seat_ids.get(sid, sid)
+
+    def _player(self, p_state):
+        objective = p_state['objective']
+        ability = p_state['ability']
+        processing = p_state['ability_processing']
+        return [
+            [self._item(item) for item in p_state['plate']],
+            self.recipe_ids.get(objective['name'], objective['name']) if objective else None,
+            self.ability_ids.get(ability, ability) if ability else None,
+            [self._item(processing['input']), self._item(processing['output']), processing['end_time']] if processing else None,
+        ]
+
+    def _players(self, players_state):
+        return {self._seat(sid): self._player(p_state) for sid, p_state in players_state.items()}
+
+    def _state(self, state):
+        compact = {}
+        for field, value in state.items():
+            field_id = STATE_FIELD_IDS.get(field)
+            if field_id is None:
+                continue # all_player_objectives: client สร้างเอง
+            if field == 'player_order_sids':
+                value = [self._seat(sid) for sid in value]
+            elif field == 'players_state':
+                value = self._players(value)
+            compact[field_id] = value
+        return compact
+
+    def _patch(self, patch):
+        compact = {}
+        fields = self._state(patch.get('fields', {}))
+        if fields:
+            compact[PATCH_KEY_IDS['fields']] = fields
+        if 'players' in patch:
+            compact[PATCH_KEY_IDS['players']] = self._players(patch['players'])
+        if 'removed_players' in patch:
+            compact[PATCH_KEY_IDS['removed_players']] = [self._seat(sid) for sid in patch['removed_players']]
+        compact[PATCH_KEY_IDS['base_version']] = patch['base_version']
+        compact[PATCH_KEY_IDS['version']] = patch['version']
+        return compact
+
+    def _game_started(self, data):
+        initial_state = data['initial_state']
+        if isinstance(initial_state, PreSerialized):
+            initial_state = initial_state.obj
+        return dict(data, initial_state=self._state(initial_state), dictionary=self.dictionary)
+
+    def _receive_item(self, data):
+        item = data['item']
+        if item.get('type') == 'ingredient' and item.get('name') in self.item_ids:
+            return self.item_ids[item['name']]
+        return data
+
+
+_DATA_ENCODERS = {
+    'update_game_state': CompactEncoder._state,
+    'start_next_level': CompactEncoder._state,
+    'state_patch': CompactEncoder._patch,
+    'game_started': CompactEncoder._game_started,
+    'receive_item': CompactEncoder._receive_item,
+}
@@ -0,0 +1,280 @@
+# event_log.py
+# บันทึกเหตุการณ์ของห้องเกมแบบ binary ต่อท้ายไฟล์ (append-only) สำหรับเล่นซ้ำด้วย tools/replay.py
+#
+# - บันทึกเฉพาะสิ่งที่ทำให้ state ของห้องเปลี่ยน: การสร้างห้อง (seed ของตัวสุ่มของห้อง), ผู้เล่นเข้า/ออก, เริ่มเกม,
+#   ข้อมูลที่ได้รับจาก handle_player_action/use_ability, timer ที่ทำงาน (tick/spawn/phase/ability/broadcast)
+#   และการส่ง state ที่ app สั่ง (broadcast_state) พร้อมเวลาของนาฬิกา scheduler
+# - ตรวจผลได้: checksum ของ state หลังทุก tick และผลของเกม (level_complete/game_won/game_over พร้อมคะแนน)
+# - เวลา: ทุกครั้งที่อ่าน clock ระหว่าง op หนึ่งของห้องได้ค่าเดียวกัน (ปัดขึ้นเป็น µs นับจากตอนสร้างห้อง)
+#   การเล่นซ้ำจึงได้ค่าเวลาเดียวกันทุก bit ไม่ขึ้นกับความคลาดเคลื่อนของ float
+# - เขียนลงไฟล์เป็นก้อน (FLUSH_BYTES) และทุกครั้งที่เกมจบ/ห้องปิด ไม่มี IO ต่อ record
+#
+# รูปแบบไฟล์: header = MAGIC, version (u8), origin (f64 เวลา scheduler ตอนสร้างห้อง), wall_origin (f64),
+#   seed (u64), room_id (string) แล้วตามด้วย record: type (u8), เวลาที่ผ่านไปจาก record ก่อนหน้า (varint µs), ข้อมูล
+#   string = varint ความยาว + utf-8, sid เขียนเต็มเฉพาะใน CREATE/JOIN/REBIND ที่เหลือใช้เลขลำดับ, ข้อมูลจาก client เก็บเป็น JSON
+
+import json
+import math
+import struct
+
+MAGIC = b'CKLG'
+VERSION = 1
+
+# ชนิดของ record
+CREATE, JOIN, LEAVE, START, ACTION, ABILITY, TIMER, BROADCAST, CHECKPOINT, OUTCOME, CLOSE, REBIND = range(12)
+RECORD_NAMES = (
+    'create', 'join', 'leave', 'start', 'action', 'ability', 'timer', 'broadcast', 'checkpoint', 'outcome', 'close', 'rebind',
+)
+TIMER_KINDS = ('tick', 'spawn', 'phase', 'broadcast', 'ability')
+OUTCOME_EVENTS = ('level_complete', 'game_won', 'game_over')
+
+_HEADER = struct.Struct('<Bddq')
+FLUSH_BYTES = 64 * 1024 # เขียนลงไฟล์เมื่อ buffer ใหญ่เกินนี้ (และทุกครั้งที่เกมจบ/ห้องปิด)
+_encode_json = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode # สร้างครั้งเดียว (json.dumps ที่มี option สร้างใหม่ทุกครั้ง)
+
+
+class EventLogError(ValueError):
+    """ไฟล์ log เสียหายหรือไม่ใช่ไฟล์ของเกมนี้"""
+
+
+def _varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _string(text, out):
+    data = text.encode('utf-8')
+    _varint(len(data), out)
+    out += data
+
+
+class EventLogWriter:
+    """log ของห้อง 1 ห้อง (เรียกทุก method ขณะถือ lock ของห้อง) เขียนต่อท้าย path"""
+    def __init__(self, path, room_id, seed, clock, wall_clock):
+        self.path = path
+        self.seed = seed
+        self._raw_clock = clock
+        self._origin = clock()
+        self._now = self._origin
+        self._last_us = 0
+        self._sids = {} # sid -> เลขลำดับ
+        self._buffer = bytearray(MAGIC)
+        self._buffer += _HEADER.pack(VERSION, self._origin, wall_clock(), seed)
+        _string(room_id, self._buffer)
+        self.closed = False
+        self.records = 0
+
+    def clock(self):
+        """เวลาของ op ปัจจุบัน (ค่าเดียวกันตลอด op ใช้แทน scheduler.clock ของห้องที่บันทึก log)"""
+        return self._now
+
+    def _record(self, record_type, stamp=True):
+        """เริ่ม record ใหม่: ตรึงเวลาของ op นี้ไว้ที่ µs ปัจจุบัน (stamp=False: ใช้เวลาของ op ที่กำลังทำอยู่)
+        คืนค่า buffer สำหรับเขียนข้อมูลต่อ หลังปิด log แล้วเวลายังเดินต่อ (timer ของห้องยังใช้ clock) แต่ไม่บันทึก"""
+        us = self._last_us
+        if stamp:
+            now_us = math.ceil((self._raw_clock() - self._origin) * 1e6)
+            if now_us > us:
+                us = now_us
+            self._now = self._origin + us / 1e6
+        if self.closed:
+            self._last_us = us
+            return bytearray()
+        if len(self._buffer) >= FLUSH_BYTES:
+            self.flush()
+        out = self._buffer
+        out.append(record_type)
+        _varint(us - self._last_us, out)
+        self._last_us = us
+        self.records += 1
+        return out
+
+    def _sid(self, sid, out):
+        _varint(self._sids[sid], out)
+
+    # --- record ---
+    def created(self, host_sid, host_name, codec):
+        self._sids[host_sid] = len(self._sids)
+        out = self._record(CREATE)
+        _string(host_sid, out)
+        _string(host_name, out)
+        _string(codec, out)
+
+    def joined(self, sid, name, codec):
+        self._sids.setdefault(sid, len(self._sids))
+        out = self._record(JOIN)
+        _string(sid, out)
+        _string(name, out)
+        _string(codec, out)
+
+    def rebound(self, old_sid, sid):
+        """ผู้เล่นกลับเข้าห้องด้วย reconnect token ผ่าน sid ใหม่"""
+        out = self._record(REBIND)
+        self._sid(old_sid, out)
+        self._sids.setdefault(sid, len(self._sids))
+        _string(sid, out)
+
+    def left(self, sid):
+        out = self._record(LEAVE)
+        self._sid(sid, out)
+
+    def started(self):
+        self._record(START)
+
+    def action(self, sid, data):
+        out = self._record(ACTION)
+        self._sid(sid, out)
+        _string(_encode_json(data), out)
+
+    def ability(self, sid, item_name):
+        out = self._record(ABILITY)
+        self._sid(sid, out)
+        _string(_encode_json(item_name), out) # ค่าจาก client อาจไม่ใช่ string
+
+    def timer(self, name):
+        kind, _, sid = name.partition(':')
+        out = self._record(TIMER)
+        out.append(TIMER_KINDS.index(kind))
+        if sid:
+            self._sid(sid, out)
+
+    def broadcast(self):
+        self._record(BROADCAST)
+
+    # record สำหรับตรวจผล เขียนระหว่าง op จึงไม่เปลี่ยนเวลาของ op
+    def checkpoint(self, checksum):
+        out = self._record(CHECKPOINT, stamp=False)
+        out += checksum.to_bytes(4, 'little')
+
+    def outcome(self, event, total_score):
+        out = self._record(OUTCOME, stamp=False)
+        out.append(OUTCOME_EVENTS.index(event))
+        _varint(total_score, out)
+        self.flush() # เกมจบ/ผ่านด่าน: เขียนลงไฟล์ไว้ก่อน
+
+    def close(self):
+        if self.closed:
+            return
+        self._record(CLOSE)
+        self.flush()
+        self.closed = True
+
+    def flush(self):
+        if not self._buffer:
+            return
+        with open(self.path, 'ab') as f:
+            f.write(self._buffer)
+        self._buffer = bytearray()
+
+
+class LogHeader:
+    __slots__ = ('version', 'origin', 'wall_origin', 'seed', 'room_id')
+
+    def __init__(self, version, origin, wall_origin, seed, room_id):
+        self.version = version
+        self.origin = origin
+        self.wall_origin = wall_origin
+        self.seed = seed
+        self.room_id = room_id
+
+
+class _Reader:
+    __slots__ = ('data', 'pos')
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def byte(self):
+        if self.pos >= len(self.data):
+            raise EventLogError('ไฟล์ log จบกลาง record')
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def varint(self):
+        value = shift = 0
+        while True:
+            b = self.byte()
+            value |= (b & 0x7F) << shift
+            if b < 0x80:
+                return value
+            shift += 7
+
+    def string(self):
+        length = self.varint()
+        end = self.pos + length
+        if end > len(self.data):
+            self.pos = len(self.data)
+            raise EventLogError('ไฟล์ log จบกลาง record')
+        text = self.data[self.pos:end].decode('utf-8')
+        self.pos = end
+        return text
+
+
+def read_log(data):
+    """แยก log (bytes) เป็น (LogHeader, รายการ record) record = (ชนิด, เวลา µs นับจากสร้างห้อง, ข้อมูล)
+    sid ใน record ถูกแปลงกลับเป็น string แล้ว log ที่ถูกตัดกลาง record (server หยุดกะทันหัน) จะคืนเฉพาะ record ที่ครบ"""
+    if data[:len(MAGIC)] != MAGIC:
+        raise EventLogError('ไม่ใช่ไฟล์ log ของเกม')
+    reader = _Reader(data)
+    reader.pos = len(MAGIC)
+    if len(data) < reader.pos + _HEADER.size:
+        raise EventLogError('header ของ log ไม่ครบ')
+    version, origin, wall_origin, seed = _HEADER.unpack_from(data, reader.pos)
+    if version != VERSION:
+        raise EventLogError(f'ไม่รองรับ log เวอร์ชัน {version}')
+    reader.pos += _HEADER.size
+    header = LogHeader(version, origin, wall_origin, seed, reader.string())
+
+    records = []
+    sids = [] # เลขลำดับ -> sid
+    while reader.pos < len(data):
+        try:
+            records.append(_read_record(reader, sids, records[-1][1] if records else 0))
+        except EventLogError:
+            if reader.pos >= len(data):
+                break # record สุดท้ายไม่ครบ
+            raise
+    return header, records
+
+
+def _read_record(reader, sids, last_us):
+    record_type = reader.byte()
+    us = last_us + reader.varint()
+    if record_type in (CREATE, JOIN):
+        sid = reader.string()
+        if sid not in sids:
+            sids.append(sid)
+        fields = (sid, reader.string(), reader.string())
+    elif record_type == REBIND:
+        old_sid = _indexed_sid(reader, sids)
+        sid = reader.string()
+        if sid not in sids:
+            sids.append(sid)
+        fields = (old_sid, sid)
+    elif record_type == LEAVE:
+        fields = (_indexed_sid(reader, sids),)
+    elif record_type in (ACTION, ABILITY):
+        fields = (_indexed_sid(reader, sids), json.loads(reader.string()))
+    elif record_type == TIMER:
+        kind = TIMER_KINDS[reader.byte()]
+        fields = (f'{kind}:{_indexed_sid(reader, sids)}' if kind == 'ability' else kind,)
+    elif record_type == CHECKPOINT:
+        fields = (int.from_bytes(bytes(reader.byte() for _ in range(4)), 'little'),)
+    elif record_type == OUTCOME:
+        fields = (OUTCOME_EVENTS[reader.byte()], reader.varint())
+    elif record_type in (START, BROADCAST, CLOSE):
+        fields = ()
+    else:
+        raise EventLogError(f'record ชนิด {record_type} ที่ตำแหน่ง {reader.pos - 1} ไม่รู้จัก')
+    return record_type, us, fields
+
+
+def _indexed_sid(reader, sids):
+    index = reader.varint()
+    if index >= len(sids):
+        raise EventLogError(f'sid ลำดับที่ {index} ไม่เคยเข้าห้อง')
+    return sids[index]
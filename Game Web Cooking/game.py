@@ -0,0 +1,1107 @@
+# game.py
+# ตรรกะหลักของเกม (ข้อมูลเมนู/ด่าน, Player, GameState, GameRoom) แยกออกจาก Flask/Socket.IO
+#
+# - GameRoom ส่งข้อความผ่าน sink ที่ส่งเข้ามา (app.py ใช้ socketio.emit, เครื่องมือใน tools/ ใช้ตัวจำลอง)
+# - เวลาใช้ clock ของ DeadlineScheduler ที่ส่งเข้ามา และการสุ่มใช้ random.Random ของห้อง
+#   จึงรันห้องจำนวนมากแบบ headless ด้วยนาฬิกาจำลองได้เร็วเท่าที่ CPU ทำได้ (ดู tools/simulate.py)
+# - ประหยัดหน่วยความจำต่อห้อง/ผู้เล่น (ดู tools/bench_memory.py): class หลักใช้ __slots__,
+#   จาน/เป้าหมาย/ความสามารถเก็บเป็น tuple ของ string ชุดเดียวกับตารางของเกม (ไม่สร้าง dict เล็กๆ ต่อผู้เล่น)
+# - ผู้ชม (spectator) ไม่ใช่ Player: รับข้อความของห้องแบบอ่านอย่างเดียวผ่าน socket.io room แยก (spectator_room)
+#   state ที่ serialize แล้วของแต่ละเวอร์ชันถูก emit ครั้งเดียวไปยังผู้เล่นและผู้ชมพร้อมกัน ไม่มีงานต่อผู้ชม
+# - บันทึก event log ได้ (event_log.py): ห้องที่บันทึกใช้ตัวสุ่มของตัวเองจาก seed ใน log และเวลาที่ตรึงไว้ต่อ op
+#   จึงเล่นซ้ำด้วย tools/replay.py ได้ผลเหมือนเดิมทุกประการ
+# - ย้ายห้องไป process ใหม่ได้ (snapshot/restore ดู room_snapshot.py) ผู้เล่นกลับเข้าห้องด้วย reconnect token
+#   (rebind_player) ซึ่งเปลี่ยน sid ของผู้เล่นในทุกที่ที่ห้องใช้ sid อ้างถึงผู้เล่น
+
+import random
+import secrets
+import time
+import zlib
+from collections import namedtuple
+from threading import Lock
+
+import json_cache
+from compact_codec import CODEC_JSON, CompactEncoder, CompactTables, compact_room
+from event_log import OUTCOME_EVENTS
+from json_cache import PreSerialized
+from metrics import ServerMetrics
+from scheduler import TickMetrics
+from outbox import Outbox, spectator_room
+from rate_limit import TokenBucket
+from spawn_pool import SpawnPool
+
+# --- ข้อมูลหลักของเกม (Constants) ---
+# การเก็บข้อมูลเหล่านี้ไว้ในระดับ Global ทำให้เข้าถึงได้ง่ายและไม่เปลี่ยนแปลง
+RECIPES = {
+    'สลัดผัก': {'ingredients': sorted(['🥬', '🍅', '🥕']), 'points': 50, 'time_bonus': 10},
+    'สปาเก็ตตี้': {'ingredients': sorted(['🍝', '🥫', '🥩']), 'points': 110, 'time_bonus': 16},
+    'ไอศกรีม': {'ingredients': sorted(['🍨', '🍒']), 'points': 35, 'time_bonus': 7},
+    'ผลไม้รวม': {'ingredients': sorted(['🍓', '🍌', '🍎']), 'points': 30, 'time_bonus': 5},
+    'ซีฟู้ดต้ม': {'ingredients': sorted(['🦞', '🍄', '🌶️']), 'points': 200, 'time_bonus': 22},
+    'ไก่ทอด': {'ingredients': sorted(['🍗', '🍟']), 'points': 60, 'time_bonus': 10},
+    'อาหารเช้าชุดใหญ่': {'ingredients': sorted(['🍳', '🍞', '🍄']), 'points': 170, 'time_bonus': 20},
+    'สเต็กแอนด์ฟรายส์': {'ingredients': sorted(['🥓', '🥕', '🍄']), 'points': 210, 'time_bonus': 24},
+    'ซูชิ': {'ingredients': sorted(['🍣', '🥬']), 'points': 130, 'time_bonus': 18},
+    'สลัดสุขภาพ': {'ingredients': sorted(['🥗', '🥕', '🍅']), 'points': 160, 'time_bonus': 18},
+    'ส้มตำ': {'ingredients': sorted(['🥗', '🌶️', '🍅', '🥜']), 'points': 140, 'time_bonus': 19},
+}
+
+ABILITIES_CONFIG = {
+    'กระทะ': {'verb': 'ทอด', 'transformations': {'🥚': '🍳', '🥩': '🥓'}},
+    'หม้อ': {'verb': 'ต้ม', 'transformations': {'🦐': '🦞', '🥔': '🍟'}},
+    'เขียง': {'verb': 'หั่น', 'transformations': {'🥬': '🥗', '🥕': '🥒','🐟': '🍣'}}
+}
+
+TICK_INTERVAL = 1 # วินาทีต่อ 1 tick ของนาฬิกาเกม
+CLOCK_EPSILON = 1e-6 # วินาที: ค่าเผื่อความคลาดเคลื่อนของ float เมื่อเทียบเวลากับ deadline
+ABILITY_DURATION = 6 # วินาทีที่ใช้แปรรูปวัตถุดิบ
+LEVEL_COMPLETE_DELAY = 5 # วินาทีที่แสดงหน้าผ่านด่าน ก่อนเริ่มด่านถัดไป
+LEVEL_START_DELAY = 1 # วินาทีหลังส่งข้อมูลด่านใหม่ ก่อนนาฬิกาเกมเริ่มเดิน
+SPAWN_UNHELD_WEIGHT = 2 # โอกาสสุ่มได้วัตถุดิบที่ยังไม่มีใครใส่จาน เทียบกับวัตถุดิบที่มีในจานแล้ว (1 = เท่ากัน)
+CHECKPOINT_EVERY = 5 # บันทึก checksum ของ state ลง event log เมื่อ time_left หารด้วยค่านี้ลงตัว (ประมาณทุก 5 tick)
+BROADCAST_DEBOUNCE = 0.05 # วินาที: state ที่เปลี่ยนจาก action ภายในช่วงนี้จะถูกส่งรวมเป็นครั้งเดียว (0 = ส่งทุก action)
+ACTION_RATE = 10 # action ต่อวินาทีที่ผู้เล่นแต่ละคนทำได้ต่อเนื่อง
+ACTION_BURST = 20 # action ที่ทำติดกันได้ทันทีก่อนถูกจำกัดความถี่
+ROOM_IDLE_TTL = 15 * 60 # วินาที: ห้องใน LOBBY ที่ไม่มีผู้เล่นทำอะไรนานเท่านี้จะถูกปิด
+ROOM_ABANDONED_TTL = 60 # วินาที: ผู้เล่นที่หลุดไปแล้วแต่ยังค้างในห้อง (ไม่ได้รับ disconnect) จะถูกนำออกเมื่อห้องเงียบนานเท่านี้
+RESTORE_RESUME_DELAY = 3 # วินาที: ห้องที่ย้ายมาจาก process เดิมหยุดเวลาไว้เท่านี้ก่อนเดินต่อ (ให้ผู้เล่นต่อกลับเข้ามาก่อน)
+MAX_PLAYERS = 8 # ผู้เล่นต่อห้อง
+MAX_SPECTATORS = 500 # ผู้ชมต่อห้อง
+tick_metrics = TickMetrics(TICK_INTERVAL) # สถิติ tick ที่มาช้า/ต้องไล่ตาม รวมทุกห้องใน process (ดูได้ที่ /stats)
+server_metrics = ServerMetrics() # เวลาต่อ op, เวลารอ lock, packet ที่ส่ง รวมทุกห้องใน process (ดูได้ที่ /metrics)
+
+LEVEL_DEFINITIONS = {
+    1: {'target_score': 300, 'time': 130, 'spawn_interval': 3},
+    2: {'target_score': 475, 'time': 120, 'spawn_interval': 3},
+    3: {'target_score': 750, 'time': 110, 'spawn_interval': 3},
+}
+
+# --- สร้างข้อมูลอ้างอิงเพื่อการค้นหาที่รวดเร็ว ---
+TRANSFORMED_TO_BASE_INGREDIENT = {transformed: base for ability_config in ABILITIES_CONFIG.values() for base, transformed in ability_config['transformations'].items()}
+TRANSFORMED_ING_INFO = {transformed: ability for ability, config in ABILITIES_CONFIG.items() for transformed in config['transformations'].values()}
+ALL_INGREDIENTS = list(dict.fromkeys(ing for recipe in RECIPES.values() for ing in recipe['ingredients'])) # คงลำดับเดิม (ผลสุ่มซ้ำได้ด้วย seed เดิม)
+NORMAL_RECIPES_KEYS = [k for k, v in RECIPES.items() if not any(ing in TRANSFORMED_TO_BASE_INGREDIENT for ing in v['ingredients'])]
+ABILITY_TO_RECIPES = {
+    ability: [
+        recipe_name for recipe_name, recipe_data in RECIPES.items()
+        if any(ing in recipe_data['ingredients'] for ing in config['transformations'].values())
+    ]
+    for ability, config in ABILITIES_CONFIG.items()
+}
+# คำใบ้ของวัตถุดิบในแต่ละเมนู คำนวณครั้งเดียวตอน import (ถูกแชร์ระหว่างทุกห้อง ห้ามแก้ไขค่า)
+RECIPE_INGREDIENT_HINTS = {
+    recipe_name: [
+        {'name': ing, 'hint': TRANSFORMED_ING_INFO.get(ing), 'base': TRANSFORMED_TO_BASE_INGREDIENT.get(ing)}
+        for ing in recipe_data['ingredients']
+    ]
+    for recipe_name, recipe_data in RECIPES.items()
+}
+
+# วัตถุดิบพื้นฐาน (ก่อนแปรรูป) ที่ต้องสุ่มส่งให้ผู้เล่นสำหรับแต่ละเมนู (ไม่ซ้ำกัน)
+RECIPE_BASE_INGREDIENTS = {
+    recipe_name: tuple(dict.fromkeys(TRANSFORMED_TO_BASE_INGREDIENT.get(ing, ing) for ing in recipe_data['ingredients']))
+    for recipe_name, recipe_data in RECIPES.items()
+}
+# วัตถุดิบที่สุ่มเมื่อไม่มีผู้เล่นคนไหนมีเป้าหมาย
+SPAWN_FALLBACK_INGREDIENTS = tuple(ing for ing in ALL_INGREDIENTS if ing not in TRANSFORMED_TO_BASE_INGREDIENT)
+# ตาราง ID สำหรับ client แบบย่อ: ไอเท็มทุกชนิดที่มีในเกม (รวมวัตถุดิบก่อน/หลังแปรรูป)
+ALL_ITEMS = list(dict.fromkeys(
+    ALL_INGREDIENTS
+    + [item for config in ABILITIES_CONFIG.values() for pair in config['transformations'].items() for item in pair]
+))
+COMPACT_TABLES = CompactTables(ALL_ITEMS, RECIPES, RECIPE_INGREDIENT_HINTS, list(ABILITIES_CONFIG))
+# ชื่อไอเท็มที่มาจาก client (json.loads สร้าง string ใหม่ทุกครั้ง) ถูกแทนด้วย string ของตารางนี้ก่อนเก็บลงจาน
+INTERNED_ITEMS = {item: item for item in ALL_ITEMS}
+# ชื่อทั้งหมดที่เก็บในผู้เล่น (ไอเท็ม, เมนู, ความสามารถ) ใช้แทน string ที่อ่านจาก snapshot ตอน restore
+INTERNED_NAMES = {**INTERNED_ITEMS, **{name: name for name in RECIPES}, **{name: name for name in ABILITIES_CONFIG}}
+
+# ห้องที่ไม่มีผู้ชมใช้ค่าว่างตัวเดียวกันนี้ (ไม่สร้าง set ต่อห้อง)
+_NO_SPECTATORS = frozenset()
+
+# วัตถุดิบที่ผู้เล่นกำลังแปรรูป (end_time เป็นเวลาจริงให้ client นับถอยหลัง)
+AbilityJob = namedtuple('AbilityJob', ('input', 'output', 'end_time'))
+
+
+def to_base_ingredients(items):
+    """แปลงวัตถุดิบที่แปรรูปแล้วกลับเป็นวัตถุดิบพื้นฐาน"""
+    return [TRANSFORMED_TO_BASE_INGREDIENT.get(item, item) for item in items]
+
+
+# --- การส่ง State แบบ Delta ---
+def diff_ui_state(old_state, new_state):
+    """เปรียบเทียบ UI state เดิมกับใหม่ แล้วคืนค่าเฉพาะ field ที่เปลี่ยน (ว่าง = ไม่มีอะไรเปลี่ยน)"""
+    patch = {}
+    changed_fields = {
+        key: value for key, value in new_state.items()
+        if key != 'players_state' and old_state.get(key) != value
+    }
+    if changed_fields:
+        patch['fields'] = changed_fields
+
+    # players_state เทียบรายผู้เล่น เพื่อไม่ต้องส่งข้อมูลของทุกคนเมื่อมีคนเดียวเปลี่ยน
+    old_players = old_state.get('players_state', {})
+    new_players = new_state.get('players_state', {})
+    changed_players = {sid: p_state for sid, p_state in new_players.items() if old_players.get(sid) != p_state}
+    removed_players = [sid for sid in old_players if sid not in new_players]
+    if changed_players:
+        patch['players'] = changed_players
+    if removed_players:
+        patch['removed_players'] = removed_players
+    return patch
+
+# state ที่ห้อง cache ไว้ (ใช้ diff) เก็บผู้เล่นเป็น tuple (plate, objective, ability, ability_processing)
+# และ all_player_objectives เป็น tuple ของ (ชื่อผู้เล่น, ชื่อเมนู) แปลงเป็น dict รูปแบบเดิมของ client เฉพาะตอนส่ง
+def _wire_player(p_state):
+    plate, objective, ability, processing = p_state
+    return {
+        'plate': list(plate),
+        'objective': {'name': objective} if objective else None,
+        'ability': ability,
+        'ability_processing': processing._asdict() if processing else None,
+    }
+
+def _wire_fields(fields):
+    wire = dict(fields)
+    if 'players_state' in wire:
+        wire['players_state'] = {sid: _wire_player(p_state) for sid, p_state in wire['players_state'].items()}
+    if 'all_player_objectives' in wire:
+        wire['all_player_objectives'] = [
+            {
+                'player_name': player_name,
+                'objective_name': objective_name,
+                'ingredients': RECIPE_INGREDIENT_HINTS[objective_name],
+                'points': RECIPES[objective_name]['points']
+            } for player_name, objective_name in wire['all_player_objectives']
+        ]
+    return wire
+
+def wire_state(ui_state):
+    """แปลง state ของ get_augmented_state_for_ui เป็นข้อมูลที่ส่งให้ client"""
+    return _wire_fields(ui_state)
+
+def wire_patch(patch):
+    """แปลง patch ของ diff_ui_state เป็นข้อมูลที่ส่งให้ client"""
+    wire = dict(patch)
+    if 'fields' in wire:
+        wire['fields'] = _wire_fields(wire['fields'])
+    if 'players' in wire:
+        wire['players'] = {sid: _wire_player(p_state) for sid, p_state in wire['players'].items()}
+    return wire
+
+# --- โครงสร้างหลักแบบ OOP ---
+
+class RoomPhase:
+    """สถานะของห้อง การเปลี่ยนสถานะระหว่างเกมทำผ่าน timer ของ scheduler (ไม่มีการ sleep ขณะถือ lock)"""
+    LOBBY = 'lobby'                     # รอผู้เล่น / เกมจบแล้ว
+    STARTING = 'starting'               # ตั้งค่าด่านและส่งข้อมูลให้ client แล้ว รอ LEVEL_START_DELAY
+    PLAYING = 'playing'                 # กำลังเล่น นาฬิกาเกมเดิน รับ action จากผู้เล่น
+    LEVEL_COMPLETE = 'level_complete'   # ผ่านด่านแล้ว รอ LEVEL_COMPLETE_DELAY ก่อนเริ่มด่านถัดไป
+
+ROOM_PHASE_TRANSITIONS = {
+    RoomPhase.LOBBY: {RoomPhase.STARTING},
+    RoomPhase.STARTING: {RoomPhase.PLAYING, RoomPhase.LOBBY},
+    RoomPhase.PLAYING: {RoomPhase.LEVEL_COMPLETE, RoomPhase.LOBBY},
+    RoomPhase.LEVEL_COMPLETE: {RoomPhase.STARTING, RoomPhase.LOBBY},
+}
+
+class Player:
+    """เก็บข้อมูลและสถานะของผู้เล่นแต่ละคน"""
+    __slots__ = (
+        'sid', 'name', 'codec', 'token', 'plate', 'objective', 'ability', 'ability_processing', 'action_bucket', 'is_rate_limited',
+    )
+
+    def __init__(self, sid, name, codec=CODEC_JSON, token=None):
+        self.sid = sid
+        self.name = name
+        self.codec = codec # รูปแบบข้อความที่ client นี้รับ (compact_codec.negotiate)
+        self.token = token or secrets.token_urlsafe(12) # reconnect token: กลับเข้าห้องด้วย sid ใหม่ (rebind_player)
+        self.plate = () # tuple ของชื่อไอเท็ม (เปลี่ยนผ่าน GameRoom._set_plate)
+        self.objective = None # ชื่อเมนูเป้าหมาย (key ของ RECIPES)
+        self.ability = None
+        self.ability_processing = None # AbilityJob
+        self.action_bucket = TokenBucket(ACTION_RATE, ACTION_BURST)
+        self.is_rate_limited = False # เคยแจ้งเตือนเรื่องทำ action ถี่เกินไปแล้วหรือยัง
+
+    def objective_ingredients(self):
+        """วัตถุดิบพื้นฐานที่เป้าหมายปัจจุบันต้องใช้"""
+        return RECIPE_BASE_INGREDIENTS.get(self.objective, ()) if self.objective else ()
+
+    def assign_new_objective(self, possible_recipes, rng=random):
+        """สุ่มเป้าหมายใหม่ให้ผู้เล่น"""
+        if not possible_recipes:
+            possible_recipes = list(RECIPES.keys())
+        self.objective = rng.choice(possible_recipes)
+
+class GameState:
+    """จัดการสถานะโดยรวมของเกมในห้องนั้นๆ เช่น ด่าน, คะแนน, เวลา"""
+    __slots__ = (
+        'is_active', 'level', 'score', 'total_score', 'target_score', 'time_left',
+        'player_order_sids', 'players_map', 'last_tick_at', 'spawn_pool',
+    )
+
+    def __init__(self, player_sids, players_map, level=1, total_score=0):
+        self.is_active = True
+        self.level = level
+        self.score = 0
+        self.total_score = total_score
+        self.target_score = LEVEL_DEFINITIONS[level]['target_score']
+        self.time_left = LEVEL_DEFINITIONS[level]['time']
+        self.player_order_sids = player_sids
+        self.players_map = players_map # {sid: Player object}
+        self.last_tick_at = None # เวลา (monotonic) ของ step ล่าสุดของนาฬิกาเกม
+        # วัตถุดิบที่สุ่มได้ อัปเดตเฉพาะตอนเป้าหมาย/จานของผู้เล่นเปลี่ยน (ดู GameRoom._assign_all_objectives/_set_plate)
+        self.spawn_pool = SpawnPool(SPAWN_FALLBACK_INGREDIENTS, unheld_weight=SPAWN_UNHELD_WEIGHT)
+        for player in players_map.values():
+            self.spawn_pool.add(player.objective_ingredients())
+            self.spawn_pool.hold(to_base_ingredients(player.plate))
+
+    def start_clock(self, now):
+        self.last_tick_at = now
+
+    def advance_clock(self, now):
+        """เลื่อนนาฬิกาเกมแบบ fixed timestep ตามเวลาจริงที่ผ่านไป คืนค่าจำนวน step ที่เดิน
+        ถ้า tick มาช้า (loop ทำงานหนัก) จะเดินหลาย step ในครั้งเดียว เวลาในเกมจึงไม่ช้าลงตาม server"""
+        if not self.is_active:
+            return 0
+        # เผื่อความคลาดเคลื่อนของ float: tick ที่ถูกเรียกตรง deadline พอดี ((last + 1) - last อาจได้ 0.999...)
+        # ต้องนับเป็น 1 step ไม่เช่นนั้นจะนัด deadline เดิมซ้ำไม่รู้จบ
+        steps = int((now - self.last_tick_at + CLOCK_EPSILON) // TICK_INTERVAL)
+        if steps > 0:
+            self.time_left -= steps
+            self.last_tick_at += steps * TICK_INTERVAL
+        return steps
+
+    def get_spawnable_ingredients(self):
+        """วัตถุดิบที่จำเป็นสำหรับผู้เล่นทุกคน (ถ้าไม่มีเป้าหมายเลย คือวัตถุดิบพื้นฐานทั้งหมด)"""
+        return list(self.spawn_pool.items())
+
+class GameRoom:
+    """Class หลักในการจัดการห้องเกม 1 ห้อง
+
+    ไม่ขึ้นกับ Socket.IO: ข้อความขาออกทั้งหมดส่งผ่าน `sink(event, data, to, skip_sid)`
+    (`to` คือ sid ของผู้เล่นหรือ room_id, `skip_sid` คือรายการ sid ที่ไม่ต้องส่งให้หรือ None)
+    เวลาทั้งหมดมาจาก `scheduler.clock` และการสุ่มทั้งหมดใช้ `rng` จึงจำลองแบบ headless และให้ผลซ้ำได้ด้วย seed เดิม
+    `event_log` (EventLogWriter หรือตัวตรวจของ tools/replay.py): บันทึกทุก input ของห้อง ห้องใช้ `event_log.clock`
+    และ random.Random(event_log.seed) แทน
+    """
+    __slots__ = (
+        'id', 'scheduler', 'sink', 'rng', 'wall_clock', 'host_sid', 'players', 'game_state', 'phase', 'lock',
+        'state_version', '_ui_state_cache', '_last_sent_state', '_sent_version', '_diffed_version',
+        '_last_broadcast_at', '_snapshot_cache', '_timers', '_outbox', '_flush_pending', 'last_active_at', 'stats',
+        'spectators', 'event_log', 'clock',
+    )
+
+    def __init__(self, room_id, host_sid, host_name, scheduler, sink, rng=None, wall_clock=time.time, host_codec=CODEC_JSON,
+                 event_log=None):
+        self.id = room_id
+        self.scheduler = scheduler # DeadlineScheduler ที่ใช้นัด timer ของห้อง
+        self.sink = sink
+        self.event_log = event_log
+        if event_log:
+            event_log.created(host_sid, host_name, host_codec)
+            rng = random.Random(event_log.seed) # เล่นซ้ำได้: ตัวสุ่มต้องเป็นของห้องนี้เท่านั้น
+        # เวลาของเกม (ห้องที่บันทึก log ใช้เวลาที่ตรึงไว้ต่อ op ของ log)
+        self.clock = event_log.clock if event_log else scheduler.clock
+        self.rng = rng or random # ไม่ได้ส่งมา: ใช้ตัวสุ่มกลางของโมดูลร่วมกัน (random.Random ต่อห้องใช้หน่วยความจำ ~2.5 KB)
+        self.wall_clock = wall_clock # เวลาจริง ใช้เฉพาะค่าที่ client นำไปนับถอยหลัง
+        self.host_sid = host_sid
+        self.players = {host_sid: Player(host_sid, host_name, host_codec)}
+        self.spectators = _NO_SPECTATORS # sid ของผู้ชม (ใช้ตอนตัดการเชื่อมต่อ/จำกัดจำนวน ไม่ใช้ตอนสร้างหรือส่ง state)
+        self.game_state = None
+        self.phase = RoomPhase.LOBBY
+        self.lock = Lock() # ป้องกัน Race Condition เมื่อมีการเข้าถึงข้อมูลพร้อมกัน (lock ของห้องนี้เท่านั้น ห้องที่ช้าไม่ทำให้ห้องอื่นรอ)
+        self.state_version = 0 # เพิ่มขึ้นทุกครั้งที่ข้อมูลที่แสดงบน UI เปลี่ยน (ใช้ invalidate cache)
+        self._ui_state_cache = None # (version, ui_state) state ที่สร้างไว้แล้วของเวอร์ชันนั้น
+        self._last_sent_state = None # state ล่าสุดที่ส่งไปแล้ว ใช้เป็นฐานในการคำนวณ patch
+        self._sent_version = None # เวอร์ชันที่ client มีอยู่
+        self._diffed_version = None # เวอร์ชันล่าสุดที่เทียบ diff แล้ว
+        self._last_broadcast_at = float('-inf') # เวลา (self.clock) ที่ส่ง state ครั้งล่าสุด
+        self._snapshot_cache = None # (version, PreSerialized) snapshot ที่ serialize แล้ว (ทิ้งเมื่อส่ง patch ถัดไป)
+        self._timers = {} # {ชื่อ timer: ScheduledEvent} deadline ที่ห้องนี้ลงทะเบียนไว้กับ scheduler
+        self._outbox = Outbox(room_id, compact_room(room_id), spectator_room(room_id)) # ข้อความขาออกที่รอส่งรวดเดียวตอนจบ tick/action
+        self._flush_pending = False
+        self.last_active_at = scheduler.clock() # เวลาที่ผู้เล่นทำอะไรกับห้องครั้งล่าสุด (ใช้ตัดสินว่าห้องถูกทิ้งไว้)
+        self.stats = server_metrics.room_stats(self.last_active_at) # RoomStats (None ถ้าปิด metrics)
+        self._update_codecs()
+
+    def add_player(self, sid, name, codec=CODEC_JSON):
+        with self.lock:
+            if len(self.players) < MAX_PLAYERS:
+                if self.event_log:
+                    self.event_log.joined(sid, name, codec)
+                self._touch()
+                self.players[sid] = Player(sid, name, codec)
+                self._update_codecs()
+                return True
+            return False
+
+    def _update_codecs(self):
+        """แจ้ง outbox ว่าผู้เล่นคนไหนรับข้อความแบบย่อ (เรียกเมื่อรายชื่อผู้เล่นเปลี่ยน)"""
+        compact_sids = tuple(sid for sid, p in self.players.items() if p.codec != CODEC_JSON)
+        self._outbox.compact_sids = compact_sids
+        self._outbox.has_json_players = len(compact_sids) < len(self.players)
+
+    def remove_player(self, sid):
+        with self.lock:
+            if self.event_log and sid in self.players:
+                self.event_log.left(sid)
+            self._touch()
+            self._mark_state_changed()
+            if sid in self.players:
+                if self.game_state:
+                    # players_map ของ game_state คือ dict เดียวกับ self.players จึงต้องถอนออกจาก spawn pool ก่อนลบ
+                    player = self.players[sid]
+                    self.game_state.spawn_pool.remove(player.objective_ingredients())
+                    self.game_state.spawn_pool.release(to_base_ingredients(player.plate))
+                del self.players[sid]
+                self._update_codecs()
+            if not self.players:
+                if self.event_log:
+                    self.event_log.close()
+                return 'delete_room' # สัญญาณให้ลบห้องนี้ทิ้ง
+            if sid == self.host_sid:
+                self.host_sid = list(self.players.keys())[0]
+            if self.game_state and self.phase != RoomPhase.LOBBY:
+                if sid in self.game_state.player_order_sids:
+                    self.game_state.player_order_sids.remove(sid)
+                if sid in self.game_state.players_map:
+                    del self.game_state.players_map[sid]
+                if len(self.game_state.player_order_sids) < 1:
+                    self._set_phase(RoomPhase.LOBBY)
+                    return 'game_over_disconnect'
+        return 'ok'
+
+    # --- ผู้ชม ---
+    def add_spectator(self, sid):
+        """เพิ่มผู้ชม (sid ต้องเข้า spectator_room ของห้องแล้ว) แล้วส่ง `spectate_success` พร้อมข้อมูล lobby
+        และ snapshot ของเวอร์ชันล่าสุดถ้ากำลังเล่นอยู่ คืนค่า False ถ้าผู้ชมเต็ม"""
+        with self.lock:
+            if len(self.spectators) >= MAX_SPECTATORS:
+                return False
+            if not self.spectators:
+                self.spectators = set()
+            self.spectators.add(sid)
+            self._outbox.has_spectators = True
+            self._send_now(sid, 'spectate_success', {
+                'room_id': self.id,
+                'lobby': self.get_lobby_info(),
+                'state': self._sent_snapshot() if self.game_state and self._last_sent_state is not None else None,
+            })
+            return True
+
+    def remove_spectator(self, sid):
+        """นำผู้ชมออก คืนค่า False ถ้า sid ไม่ใช่ผู้ชมของห้องนี้"""
+        with self.lock:
+            if sid not in self.spectators:
+                return False
+            self.spectators.discard(sid)
+            if not self.spectators:
+                self.spectators = _NO_SPECTATORS
+                self._outbox.has_spectators = False
+            return True
+
+    # --- กลับเข้าห้องด้วย reconnect token ---
+    def rebind_player(self, token, sid):
+        """ผูกผู้เล่นที่ถือ token เข้ากับ sid ใหม่ แล้วส่ง `rejoin_success` (ข้อมูล lobby, ชื่อเพื่อนบ้าน, พจนานุกรมแบบย่อ)
+        ตามด้วย snapshot ของเกมที่กำลังเล่น รูปแบบข้อความ (codec) ของผู้เล่นคงเดิมตลอดที่อยู่ในห้อง
+        คืนค่า sid เดิมของผู้เล่น (None ถ้าไม่มี token นี้ในห้อง)"""
+        with self.lock:
+            player = next((p for p in self.players.values() if p.token == token), None)
+            if player is None:
+                return None
+            old_sid = player.sid
+            if self.event_log:
+                self.event_log.rebound(old_sid, sid)
+            self._touch()
+            if old_sid != sid:
+                self._rename_sid(player, sid)
+
+            game = None
+            if self.game_state and sid in self.game_state.player_order_sids:
+                self._broadcast_state() # ผู้เล่นคนอื่นได้ patch ที่ sid ของผู้เล่นนี้เปลี่ยน (และเป็นฐานของ snapshot ด้านล่าง)
+                order = self.game_state.player_order_sids
+                i = order.index(sid)
+                game = {
+                    'your_sid': sid,
+                    'your_name': player.name,
+                    'left_neighbor': self.players[order[i - 1]].name,
+                    'right_neighbor': self.players[order[(i + 1) % len(order)]].name,
+                }
+                if player.codec != CODEC_JSON and self._outbox.encoder:
+                    game['dictionary'] = self._outbox.encoder.dictionary # ข้อความแบบย่อที่ตามมาใช้ที่นั่งเดิม
+            self._send_now(sid, 'rejoin_success', {
+                'room_id': self.id,
+                'is_host': sid == self.host_sid,
+                'codec': player.codec,
+                'reconnect_token': token,
+                'phase': self.phase,
+                'lobby': self.get_lobby_info(),
+                'game': game,
+            })
+            if game:
+                # ผ่าน outbox: client แบบย่อได้ snapshot ที่เข้ารหัสด้วยพจนานุกรมข้างบน
+                self._send('update_game_state', self._sent_snapshot(), sid)
+                self._flush_outbox()
+            return old_sid
+
+    def _rename_sid(self, player, sid):
+        """เปลี่ยน sid ของผู้เล่นในทุกที่ที่ห้องใช้อ้างถึง (ต้องถือ lock อยู่) ลำดับผู้เล่นและที่นั่งคงเดิม"""
+        old_sid = player.sid
+        player.sid = sid
+        # players เป็น dict เดียวกับ game_state.players_map จึงแก้ใน dict เดิม
+        players = [(sid if key == old_sid else key, p) for key, p in self.players.items()]
+        self.players.clear()
+        self.players.update(players)
+        if self.host_sid == old_sid:
+            self.host_sid = sid
+        if self.game_state:
+            order = self.game_state.player_order_sids
+            if old_sid in order:
+                order[order.index(old_sid)] = sid
+        pending = self._timers.pop(f'ability:{old_sid}', None)
+        if pending:
+            pending.cancel()
+            self._schedule_at(f'ability:{sid}', pending.deadline, self._on_ability_done, sid)
+        self._update_codecs()
+        if self._outbox.encoder:
+            self._outbox.encoder.rename_seat(old_sid, sid)
+        self._mark_state_changed()
+
+    # --- ย้ายห้องไป process ใหม่ (room_snapshot.py) ---
+    def snapshot(self, now):
+        """ข้อมูลของห้องเป็น list/dict ล้วน (เขียนเป็น JSON ได้) เวลาของ timer เก็บเป็นวินาทีที่เหลือนับจาก now
+        [room_id, phase, ลำดับของ host, ผู้เล่น, เกม, {timer: วินาทีที่เหลือ}] ผู้ชมไม่ถูกเก็บ (ต่อเข้ามาดูใหม่เอง)"""
+        with self.lock:
+            sids = list(self.players)
+            players = []
+            for p in self.players.values():
+                job = p.ability_processing
+                pending = self._live_timer(f'ability:{p.sid}')
+                players.append([
+                    p.sid, p.name, p.codec, p.token, list(p.plate), p.objective, p.ability,
+                    [job.input, job.output, pending.deadline - now if pending else None] if job else None,
+                ])
+            game = None
+            gs = self.game_state
+            if gs:
+                game = [
+                    gs.level, gs.score, gs.total_score, gs.target_score, gs.time_left,
+                    [sids.index(sid) for sid in gs.player_order_sids],
+                    now - gs.last_tick_at if gs.last_tick_at is not None else None,
+                ]
+            timers = {}
+            for name in ('tick', 'spawn', 'phase'):
+                event = self._live_timer(name)
+                if event:
+                    timers[name] = event.deadline - now
+            return [self.id, self.phase, sids.index(self.host_sid), players, game, timers]
+
+    def _live_timer(self, name):
+        """timer ชื่อ name ที่จะทำงานจริง (ไม่ถูกยกเลิกและลงทะเบียนไว้ในด่าน/สถานะปัจจุบัน) หรือ None"""
+        event = self._timers.get(name)
+        if event is None or event.cancelled or event.args[1] is not self.game_state or event.args[2] != self.phase:
+            return None
+        return event
+
+    @classmethod
+    def restore(cls, data, scheduler, sink, wall_clock=time.time):
+        """สร้างห้องจากข้อมูลของ snapshot() เวลาของเกมเดินต่อหลัง RESTORE_RESUME_DELAY
+        (ผู้เล่นยังใช้ sid ของ process เดิมจนกว่าจะกลับเข้าห้องด้วย rebind_player)"""
+        room_id, phase, host_index, players, game, timers = data
+        host = players[host_index]
+        room = cls(room_id, host[0], host[1], scheduler, sink, wall_clock=wall_clock, host_codec=host[2])
+        room.players.clear()
+        jobs = []
+        for sid, name, codec, token, plate, objective, ability, job in players:
+            player = Player(sid, name, codec, token)
+            player.plate = tuple(INTERNED_NAMES.get(item, item) for item in plate)
+            player.objective = INTERNED_NAMES.get(objective, objective)
+            player.ability = INTERNED_NAMES.get(ability, ability)
+            room.players[sid] = player
+            if job:
+                jobs.append((player, job))
+        room._update_codecs()
+        if not game:
+            return room
+
+        resume_at = scheduler.clock() + RESTORE_RESUME_DELAY
+        level, score, total_score, target_score, time_left, order, tick_age = game
+        gs = GameState([players[i][0] for i in order], room.players, level=level, total_score=total_score)
+        gs.score, gs.target_score, gs.time_left = score, target_score, time_left
+        room.game_state = gs
+        room.phase = phase
+        gs.is_active = phase == RoomPhase.PLAYING
+        if tick_age is not None:
+            gs.start_clock(resume_at - tick_age)
+        if room._outbox.compact_sids:
+            room._outbox.encoder = CompactEncoder(COMPACT_TABLES, [(sid, p.name) for sid, p in room.players.items()])
+
+        wall_resume_at = wall_clock() + RESTORE_RESUME_DELAY
+        for player, (item, output, remaining) in jobs:
+            player.ability_processing = AbilityJob(
+                INTERNED_NAMES.get(item, item), INTERNED_NAMES.get(output, output), wall_resume_at + (remaining or 0))
+            if remaining is not None:
+                room._schedule_at(f'ability:{player.sid}', resume_at + remaining, room._on_ability_done, player.sid)
+        for name, remaining in timers.items():
+            deadline = resume_at + remaining
+            if name == 'tick':
+                room._schedule_at('tick', deadline, room._on_tick, deadline)
+            elif name == 'spawn':
+                room._schedule_at('spawn', deadline, room._on_spawn, deadline)
+            elif phase == RoomPhase.STARTING:
+                room._schedule_at('phase', deadline, room._on_level_started)
+            elif phase == RoomPhase.LEVEL_COMPLETE:
+                room._schedule_at('phase', deadline, room._start_next_level, level + 1, total_score)
+        return room
+
+    def _send_now(self, sid, event, data):
+        """ส่งข้อความถึง sid เดียวทันที ไม่ผ่าน outbox (ต้องถือ lock อยู่)
+        ส่งข้อความที่ค้างใน outbox ก่อน ข้อความนี้จึงเป็นข้อมูลล่าสุดเสมอ"""
+        self._flush_outbox()
+        self.sink(event, data, sid, None)
+
+    # --- การปิดห้องที่ถูกทิ้งไว้ ---
+    def _touch(self):
+        # ใช้เวลาจริงของ scheduler ไม่ใช่ self.clock: ใช้ตัดสินแค่ว่าห้องถูกทิ้งไว้ ไม่ใช่ส่วนหนึ่งของเกม
+        self.last_active_at = self.scheduler.clock()
+
+    def is_idle(self, now):
+        """ห้องรอผู้เล่นอยู่ใน LOBBY แต่ไม่มีใครทำอะไรนานเกิน ROOM_IDLE_TTL
+        (ห้องที่กำลังเล่นจะกลับมา LOBBY เองเมื่อหมดเวลา)"""
+        return self.phase == RoomPhase.LOBBY and now - self.last_active_at >= ROOM_IDLE_TTL
+
+    def abandoned_sids(self, now, is_connected):
+        """ผู้เล่นที่ไม่ได้เชื่อมต่ออยู่แล้ว (is_connected(sid) เป็น False) ในห้องที่เงียบนานเกิน ROOM_ABANDONED_TTL"""
+        if now - self.last_active_at < ROOM_ABANDONED_TTL:
+            return []
+        return [sid for sid in list(self.players) if not is_connected(sid)]
+
+    def abandoned_spectators(self, is_connected):
+        """ผู้ชมที่ไม่ได้เชื่อมต่ออยู่แล้ว (ไม่ได้รับ disconnect)"""
+        return [sid for sid in list(self.spectators) if not is_connected(sid)]
+
+    def close(self):
+        """หยุดเกมและ timer ทั้งหมดของห้อง (ใช้ตอนปิดห้องที่ไม่มีการใช้งาน)"""
+        with self.lock:
+            if self.phase != RoomPhase.LOBBY:
+                self._set_phase(RoomPhase.LOBBY) # ยกเลิก timer ของห้องด้วย
+            self.game_state = None
+            self._flush_outbox()
+            if self.event_log:
+                self.event_log.close()
+
+    def _set_phase(self, phase):
+        """เปลี่ยนสถานะห้องตาม ROOM_PHASE_TRANSITIONS (ต้องถือ lock อยู่)"""
+        if phase not in ROOM_PHASE_TRANSITIONS[self.phase]:
+            raise ValueError(f'ห้อง {self.id}: เปลี่ยนสถานะจาก {self.phase} เป็น {phase} ไม่ได้')
+        self.phase = phase
+        if self.game_state:
+            self.game_state.is_active = phase == RoomPhase.PLAYING
+        if phase == RoomPhase.LOBBY:
+            self._cancel_timers()
+            # ไม่เก็บ state ของเกมที่จบแล้วไว้ระหว่างรอใน LOBBY (เกมใหม่เริ่มด้วย snapshot เต็มเสมอ)
+            self._ui_state_cache = self._last_sent_state = self._snapshot_cache = None
+
+    def start_game(self):
+        with self.lock:
+            if self.phase != RoomPhase.LOBBY:
+                return
+            if self.event_log:
+                self.event_log.started()
+            self._touch()
+            self._begin_level(1, total_score=0)
+            player_sids = self.game_state.player_order_sids
+            # ที่นั่งของผู้เล่นสำหรับ client แบบย่อ คงที่ตลอดเกม (พจนานุกรมส่งไปพร้อม game_started)
+            self._outbox.encoder = CompactEncoder(
+                COMPACT_TABLES, [(sid, p.name) for sid, p in self.players.items()]
+            ) if self._outbox.compact_sids else None
+            
+            # ส่งข้อมูลเริ่มต้นเกมให้ผู้เล่นทุกคน (snapshot เต็ม serialize ครั้งเดียวใช้ได้ทุกคน)
+            ui_state = self._take_snapshot()
+            for i, sid in enumerate(player_sids):
+                left_sid = player_sids[i - 1]
+                right_sid = player_sids[(i + 1) % len(player_sids)]
+                self._send('game_started', {
+                    'initial_state': ui_state,
+                    'your_sid': sid,
+                    'your_name': self.players[sid].name,
+                    'left_neighbor': self.players[left_sid].name,
+                    'right_neighbor': self.players[right_sid].name
+                }, sid)
+            if self.spectators:
+                self._send('update_game_state', ui_state, self._outbox.spectator_room)
+            self._flush_outbox()
+            print(f"เกมในห้อง {self.id} เริ่มขึ้นแล้ว!")
+
+    def _begin_level(self, level, total_score):
+        """LOBBY/LEVEL_COMPLETE -> STARTING: สร้างสถานะของด่านใหม่ แล้วนัดเริ่มเล่นหลัง LEVEL_START_DELAY (ต้องถือ lock อยู่)"""
+        player_sids = list(self.players.keys())
+        self.rng.shuffle(player_sids)
+        self._cancel_timers()
+        self.game_state = GameState(player_sids, self.players, level=level, total_score=total_score)
+        self._set_phase(RoomPhase.STARTING)
+        self._assign_abilities()
+        self._assign_all_objectives()
+        self._mark_state_changed()
+        self._schedule('phase', LEVEL_START_DELAY, self._on_level_started)
+
+    def _on_level_started(self):
+        """STARTING -> PLAYING: เริ่มนาฬิกาเกมและการสุ่มวัตถุดิบ"""
+        self._set_phase(RoomPhase.PLAYING)
+        self._mark_state_changed()
+        self._start_timers()
+        self._broadcast_state()
+
+    def _assign_abilities(self):
+        """สุ่มความสามารถให้ผู้เล่นในห้อง"""
+        abilities_pool = list(ABILITIES_CONFIG.keys())
+        self.rng.shuffle(abilities_pool)
+        for i, player in enumerate(self.players.values()):
+            player.ability = abilities_pool[i] if i < len(abilities_pool) else None
+            player.ability_processing = None
+
+    def _assign_all_objectives(self):
+        """สุ่มเป้าหมายให้ผู้เล่นทุกคน"""
+        active_abilities = dict.fromkeys(p.ability for p in self.players.values() if p.ability) # ไม่ใช้ set เพื่อให้ลำดับคงที่
+        possible_recipes = list(NORMAL_RECIPES_KEYS)
+        for ability in active_abilities:
+            possible_recipes.extend(ABILITY_TO_RECIPES.get(ability, []))
+        
+        spawn_pool = self.game_state.spawn_pool
+        for player in self.players.values():
+            spawn_pool.remove(player.objective_ingredients())
+            player.assign_new_objective(possible_recipes, self.rng)
+            spawn_pool.add(player.objective_ingredients())
+
+    def _set_plate(self, player, contents):
+        """เปลี่ยนวัตถุดิบในจานของผู้เล่น พร้อมอัปเดตน้ำหนักการสุ่มของ spawn pool"""
+        spawn_pool = self.game_state.spawn_pool
+        spawn_pool.release(to_base_ingredients(player.plate))
+        player.plate = tuple(INTERNED_ITEMS.get(item, item) for item in contents)
+        spawn_pool.hold(to_base_ingredients(player.plate))
+
+    # --- Timer ของห้อง (ลงทะเบียนกับ scheduler) ---
+    def _schedule_at(self, name, deadline, callback, *args):
+        """ลงทะเบียน deadline ของห้อง (ถ้ามี timer ชื่อเดิมอยู่แล้วจะถูกแทนที่)
+        timer จะทำงานก็ต่อเมื่อห้องยังอยู่ในด่านและสถานะเดียวกับตอนที่ลงทะเบียน"""
+        previous = self._timers.get(name)
+        if previous:
+            previous.cancel()
+        self._timers[name] = self.scheduler.call_at(deadline, self._fire_timer, name, self.game_state, self.phase, callback, args)
+
+    def _schedule(self, name, delay, callback, *args):
+        self._schedule_at(name, self.clock() + delay, callback, *args)
+
+    def _fire_timer(self, name, game_state, phase, callback, args):
+        """ถูกเรียกโดย scheduler เมื่อถึงเวลา ข้าม timer ที่ค้างมาจากเกม/ด่าน/สถานะก่อนหน้า"""
+        with server_metrics.operation(self.stats, self.lock, name.partition(':')[0]): # ability:<sid> นับรวมเป็น ability
+            if self.game_state is not game_state or self.phase != phase:
+                return
+            self._timers.pop(name, None)
+            if self.event_log:
+                self.event_log.timer(name)
+            callback(*args)
+            if self.event_log and name == 'tick' and self.game_state and self.game_state.time_left % CHECKPOINT_EVERY == 0:
+                self.event_log.checkpoint(self.state_checksum())
+            needs_flush = self._outbox and not self._flush_pending
+            if needs_flush:
+                self._flush_pending = True
+        if needs_flush:
+            # รอส่งตอนจบรอบของ scheduler เพื่อรวมข้อความจาก timer หลายตัวที่ถึงกำหนดพร้อมกัน (เช่น tick + spawn)
+            # เรียกหลังปล่อย lock: นอก run_due แล้ว defer เรียก flush_outbox (ที่ขอ lock เดิม) ทันที
+            self.scheduler.defer(self.flush_outbox)
+
+    def run_timer(self, name):
+        """เรียก timer ชื่อ name ทันทีโดยไม่รอ scheduler (ใช้ตอนเล่น event log ซ้ำ เวลาของ timer มาจาก log)
+        ข้อความของ timer ถูกส่งก่อนคืนค่า (นอก run_due แล้ว defer ทำงานทันที) คืนค่า False ถ้าห้องไม่ได้นัด timer นี้ไว้"""
+        event = self._timers.get(name)
+        if event is None:
+            return False
+        event.cancel()
+        event.callback(*event.args)
+        return True
+
+    def _cancel_timers(self):
+        for event in self._timers.values():
+            event.cancel()
+        self._timers.clear()
+
+    def _start_timers(self):
+        """เริ่มนาฬิกาเกมและการสุ่มวัตถุดิบของด่านปัจจุบัน (ต้องถือ lock อยู่)"""
+        self._cancel_timers()
+        now = self.clock()
+        self.game_state.start_clock(now)
+        self._schedule_at('tick', now + TICK_INTERVAL, self._on_tick, now + TICK_INTERVAL)
+        spawn_at = now + LEVEL_DEFINITIONS[self.game_state.level]['spawn_interval']
+        self._schedule_at('spawn', spawn_at, self._on_spawn, spawn_at)
+
+    def _on_tick(self, deadline):
+        """นาฬิกาเกม: เดินเวลาตามเวลาจริง ตรวจสอบหมดเวลา และส่ง patch ของ state"""
+        now = self.clock()
+        steps = self.game_state.advance_clock(now)
+        tick_metrics.record(now - deadline, steps)
+        if steps:
+            self._mark_state_changed()
+
+        if self.game_state.time_left <= 0:
+            self._set_phase(RoomPhase.LOBBY)
+            total_final_score = self.game_state.total_score + self.game_state.score
+            self._send('game_over', {'total_score': total_final_score, 'message': 'หมดเวลา!'}, self.id)
+            self.game_state = None # รีเซ็ตสถานะเกม
+            return
+
+        # นัด step ถัดไปจากนาฬิกาเกม (ไม่ใช่เวลาปัจจุบัน) เพื่อไม่ให้ความล่าช้าสะสม
+        next_deadline = self.game_state.last_tick_at + TICK_INTERVAL
+        self._schedule_at('tick', next_deadline, self._on_tick, next_deadline)
+        self._broadcast_state() # ส่งเฉพาะส่วนที่เปลี่ยน (ปกติคือ time_left)
+
+    def _on_spawn(self, deadline):
+        """สุ่มวัตถุดิบให้ผู้เล่นทุกคน แล้วนัดรอบถัดไปตามตารางเดิม (รอบที่พลาดไปจะถูกข้าม ไม่ส่งย้อนหลัง)"""
+        player_sids = self.game_state.player_order_sids
+        ingredients = self.game_state.spawn_pool.sample(len(player_sids), self.rng)
+        for sid, ingredient in zip(player_sids, ingredients):
+            self._send('receive_item', {'item': {'type': 'ingredient', 'name': ingredient}}, sid)
+        spawn_interval = LEVEL_DEFINITIONS[self.game_state.level]['spawn_interval']
+        next_deadline = deadline + spawn_interval
+        now = self.clock()
+        if next_deadline <= now:
+            next_deadline += ((now - next_deadline) // spawn_interval + 1) * spawn_interval
+        self._schedule_at('spawn', next_deadline, self._on_spawn, next_deadline)
+
+    def _on_ability_done(self, sid):
+        """การแปรรูปวัตถุดิบของผู้เล่นเสร็จ: ส่งวัตถุดิบที่แปรรูปแล้วให้ผู้เล่น"""
+        player = self.players.get(sid)
+        if not player or not player.ability_processing:
+            return
+        output_item = player.ability_processing.output
+        self._send('receive_item', {'item': {'type': 'ingredient', 'name': output_item}}, sid)
+        player.ability_processing = None
+        self._mark_state_changed()
+        self._broadcast_state()
+    
+    def get_lobby_info(self):
+        """สร้างข้อมูลสำหรับหน้า Lobby"""
+        return {
+            'players': [{'sid': p.sid, 'name': p.name} for p in self.players.values()],
+            'host_sid': self.host_sid,
+            'room_id': self.id
+        }
+
+    def _mark_state_changed(self):
+        """เรียกทุกครั้งที่ข้อมูลซึ่งแสดงบน UI เปลี่ยน เพื่อให้ cache ของ state ถูกสร้างใหม่"""
+        self.state_version += 1
+
+    def get_augmented_state_for_ui(self):
+        """คืนข้อมูลเกมทั้งหมดสำหรับหน้า UI (สร้างใหม่เฉพาะเมื่อ state_version เปลี่ยน)"""
+        if not self.game_state: return None
+        cache = self._ui_state_cache
+        if cache and cache[0] == self.state_version:
+            return cache[1]
+        if server_metrics.enabled:
+            started = time.perf_counter()
+            ui_state = self._build_ui_state()
+            server_metrics.op_duration('build_ui_state').observe(time.perf_counter() - started)
+        else:
+            ui_state = self._build_ui_state()
+        self._ui_state_cache = (self.state_version, ui_state)
+        return ui_state
+
+    def _build_ui_state(self):
+        """สร้างข้อมูลเกมทั้งหมดเพื่อใช้อัปเดตหน้า UI (รูปแบบภายใน แปลงด้วย wire_state ก่อนส่ง)"""
+        # สร้างสำเนาข้อมูลพื้นฐาน
+        ui_state = {
+            'is_active': self.game_state.is_active,
+            'level': self.game_state.level,
+            'score': self.game_state.score,
+            'total_score': self.game_state.total_score,
+            'target_score': self.game_state.target_score,
+            'time_left': self.game_state.time_left,
+            'player_order_sids': tuple(self.game_state.player_order_sids),
+        }
+
+        # ข้อมูลผู้เล่นเป็น tuple ของค่าที่ไม่ถูกแก้ไขภายหลัง (จาน/AbilityJob ถูกแทนที่ทั้งก้อนเสมอ) จึงไม่ต้องคัดลอก
+        ui_state['players_state'] = {
+            sid: (p.plate, p.objective, p.ability, p.ability_processing)
+            for sid, p in self.players.items() if sid in self.game_state.players_map
+        }
+        
+        # เป้าหมายของทุกคน (คำใบ้และคะแนนเติมจากตารางของเมนูตอนส่ง)
+        ui_state['all_player_objectives'] = tuple(
+            (player.name, player.objective)
+            for player in self.game_state.players_map.values() if player.objective in RECIPES
+        )
+        return ui_state
+
+    def _take_snapshot(self):
+        """ตั้ง state ปัจจุบันเป็นฐานใหม่สำหรับ patch ถัดไป แล้วคืน snapshot ที่ serialize แล้ว (ต้องถือ lock อยู่)"""
+        ui_state = self.get_augmented_state_for_ui()
+        if not ui_state: return None
+        self._last_sent_state = ui_state
+        self._sent_version = self._diffed_version = self.state_version
+        return self._sent_snapshot()
+
+    def _sent_snapshot(self):
+        """snapshot ของเวอร์ชันที่ client มีอยู่ serialize เป็น JSON ครั้งเดียวต่อเวอร์ชัน"""
+        cache = self._snapshot_cache
+        if cache is None or cache[0] != self._sent_version:
+            snapshot = wire_state(self._last_sent_state)
+            snapshot['version'] = self._sent_version
+            cache = (self._sent_version, PreSerialized(snapshot))
+            self._snapshot_cache = cache
+        return cache[1]
+
+    def _request_broadcast(self):
+        """ส่ง state หลัง action โดยรวมการส่งที่ถี่กว่า BROADCAST_DEBOUNCE ไว้ด้วยกัน (ต้องถือ lock อยู่)
+        action แรกส่งทันที action ที่ตามมาในช่วงเวลาเดียวกันจะรอส่งรวมครั้งเดียวตอนหมดช่วง (ได้ state ล่าสุดเสมอ)"""
+        if 'broadcast' in self._timers:
+            return # มีการส่งรออยู่แล้ว ตอนส่งจะใช้ state ล่าสุด
+        next_at = self._last_broadcast_at + BROADCAST_DEBOUNCE
+        if self.clock() >= next_at:
+            self._broadcast_state()
+        else:
+            self._schedule_at('broadcast', next_at, self._broadcast_state)
+
+    def _broadcast_state(self):
+        """ส่งเฉพาะ field ที่เปลี่ยนจาก state ล่าสุดที่ส่งไป (ต้องถือ lock อยู่)"""
+        pending = self._timers.pop('broadcast', None)
+        if pending:
+            pending.cancel() # state ที่ส่งรอบนี้ครอบคลุมการส่งที่รออยู่แล้ว
+        self._last_broadcast_at = self.clock()
+        if self._last_sent_state is None:
+            snapshot = self._take_snapshot()
+            if snapshot:
+                self._send('update_game_state', snapshot, self.id)
+            return
+        if self.state_version == self._diffed_version:
+            return # ไม่มีการเปลี่ยนแปลงตั้งแต่ครั้งก่อน ไม่ต้องสร้าง state ใหม่
+
+        ui_state = self.get_augmented_state_for_ui()
+        if not ui_state: return
+        self._diffed_version = self.state_version
+        patch = diff_ui_state(self._last_sent_state, ui_state)
+        self._last_sent_state = ui_state
+        if not patch: return # ข้อมูลเหมือนเดิม client ยังใช้เวอร์ชันเดิมต่อได้
+
+        patch = wire_patch(patch)
+        patch['base_version'] = self._sent_version
+        patch['version'] = self._sent_version = self.state_version
+        self._snapshot_cache = None # client ที่ขอ resync จะได้ snapshot ของเวอร์ชันใหม่
+        self._send('state_patch', patch, self.id)
+
+    def broadcast_state(self):
+        with self.lock:
+            if self.game_state:
+                if self.event_log:
+                    self.event_log.broadcast()
+                self._broadcast_state()
+                self._flush_outbox()
+
+    def send_state_snapshot(self, sid):
+        """ส่ง state เต็มของเวอร์ชันล่าสุดให้ผู้เล่นหรือผู้ชมคนเดียว (ใช้ตอน client ขอ resync)"""
+        with self.lock:
+            if not self.game_state or self._last_sent_state is None:
+                return
+            if sid in self.players:
+                self._send('update_game_state', self._sent_snapshot(), sid)
+                self._flush_outbox()
+            elif sid in self.spectators:
+                # ผู้ชมไม่มีข้อความส่วนตัวใน outbox (ถ้าเข้าคิวไว้ ข้อความของห้องจะถูกรวมใน bundle ซ้ำกับที่ได้จาก spectator_room)
+                self._send_now(sid, 'update_game_state', self._sent_snapshot())
+
+    def state_checksum(self):
+        """crc32 ของ state ที่มีผลต่อเกม (สถานะห้อง, host, จาน/เป้าหมาย/ความสามารถของผู้เล่น, ด่าน/คะแนน/เวลา/ลำดับ)
+        ใช้เทียบผลตอนเล่น event log ซ้ำ (ไม่รวม end_time ของการแปรรูปซึ่งเป็นเวลาจริง)"""
+        parts = [self.phase, self.host_sid]
+        for sid, p in self.players.items():
+            job = p.ability_processing
+            parts.append((sid, p.plate, p.objective, p.ability, job and (job.input, job.output)))
+        gs = self.game_state
+        if gs:
+            parts.append((gs.level, gs.score, gs.total_score, gs.time_left, tuple(gs.player_order_sids)))
+        return zlib.crc32(repr(parts).encode('utf-8'))
+
+    # --- ข้อความขาออก ---
+    def _send(self, event, data, to):
+        """เข้าคิวข้อความไว้ส่งตอนจบ tick/action (ต้องถือ lock อยู่)"""
+        if self.event_log and to == self.id and event in OUTCOME_EVENTS:
+            self.event_log.outcome(event, data['total_score'])
+        self._outbox.send(event, data, to)
+
+    def _flush_outbox(self):
+        """ส่งข้อความที่เข้าคิวไว้ทั้งหมด ปลายทางละ 1 packet (ต้องถือ lock อยู่ เพื่อคงลำดับของ patch)"""
+        self._flush_pending = False
+        encoded_chars, binary_bytes = json_cache.encoded_chars, self._outbox.binary_bytes
+        packets = self._outbox.flush(self.sink)
+        if packets:
+            # sink ของ app.py เข้ารหัส packet ทันทีระหว่าง flush ส่วนต่างของตัวนับจึงเป็นขนาดของห้องนี้
+            payload_bytes = json_cache.encoded_chars - encoded_chars + self._outbox.binary_bytes - binary_bytes
+            server_metrics.record_emits(self.stats, packets, payload_bytes)
+
+    def flush_outbox(self):
+        with self.lock:
+            self._flush_outbox()
+
+    def handle_player_action(self, sid, data):
+        """จัดการ Action ต่างๆ จากผู้เล่น"""
+        with server_metrics.operation(self.stats, self.lock, 'player_action'):
+            if self.event_log and sid in self.players:
+                self.event_log.action(sid, data)
+            self._touch()
+            self._apply_player_action(sid, data)
+            self._flush_outbox()
+
+    def _apply_player_action(self, sid, data):
+        """ตรรกะของ action (ต้องถือ lock อยู่)"""
+        player = self.players.get(sid)
+        if not player or not self.game_state or not self.game_state.is_active:
+            return
+
+        action_type = data.get('type')
+        if not self._allow_action(player):
+            # client เอาวัตถุดิบออกจากสายพานไปแล้ว ส่งคืนเพื่อไม่ให้ของหาย
+            if action_type == 'pass_item' and (data.get('item') or {}).get('type') == 'ingredient':
+                self._send('receive_item', {'item': data['item']}, sid)
+            elif action_type == 'add_to_plate':
+                for ingredient in _added_items(player.plate, data.get('new_plate_contents', [])):
+                    self._send('receive_item', {'item': {'type': 'ingredient', 'name': ingredient}}, sid)
+            return
+        
+        if action_type == 'pass_item':
+            item_data = data.get('item')
+            if item_data.get('type') == 'plate':
+                self._send('action_fail', {'message': 'ไม่สามารถส่งจานได้!', 'sound': 'error'}, sid)
+                return
+            
+            player_sids = self.game_state.player_order_sids
+            if len(player_sids) <= 1: return
+
+            player_index = player_sids.index(sid)
+            direction = data.get('direction')
+            target_sid = player_sids[player_index - 1] if direction == 'left' else player_sids[(player_index + 1) % len(player_sids)]
+            self._send('receive_item', {'item': item_data}, target_sid)
+
+        elif action_type == 'add_to_plate':
+            self._set_plate(player, data.get('new_plate_contents', []))
+            self._mark_state_changed()
+
+        elif action_type == 'submit_order':
+            self._handle_submit_order(player)
+
+        # ส่ง state ล่าสุดให้ทุกคนหลัง action (เฉพาะส่วนที่เปลี่ยน และรวมการส่งที่ถี่เกินไป)
+        if self.game_state:
+            self._request_broadcast()
+
+    def _allow_action(self, player):
+        """ตรวจโควต้า action ของผู้เล่น แจ้งเตือนครั้งเดียวเมื่อเริ่มถูกจำกัด (ต้องถือ lock อยู่)"""
+        if player.action_bucket.consume(self.clock()):
+            player.is_rate_limited = False
+            return True
+        if not player.is_rate_limited:
+            player.is_rate_limited = True
+            self._send('action_fail', {'message': 'ทำเร็วเกินไป! ช้าลงหน่อย', 'sound': 'error'}, player.sid)
+        return False
+
+    def _handle_submit_order(self, player):
+        """ตรรกะการส่งอาหาร"""
+        player_plate = sorted(player.plate)
+        objective_name = player.objective
+        if not objective_name or objective_name not in RECIPES:
+            return
+
+        required_ingredients = RECIPES[objective_name]['ingredients']
+        if player_plate == required_ingredients:
+            # ทำอาหารสำเร็จ
+            recipe_data = RECIPES[objective_name]
+            self.game_state.score += recipe_data['points']
+            self.game_state.time_left = min(self.game_state.time_left + recipe_data['time_bonus'], 999)
+            
+            self._set_plate(player, [])
+            self._assign_all_objectives() # สุ่มเป้าหมายใหม่ให้ทุกคน
+            self._mark_state_changed()
+            
+            self._send('action_success', {'message': f'ทำ {objective_name} สำเร็จ! (+{recipe_data["points"]} คะแนน)', 'sound': 'success'}, player.sid)
+
+            # ตรวจสอบเงื่อนไขผ่านด่าน
+            if self.game_state.score >= self.game_state.target_score:
+                self._level_up()
+        else:
+            self._send('action_fail', {'message': 'สูตรไม่ถูกต้อง! ลองอีกครั้ง', 'sound': 'error'}, player.sid)
+
+    def _level_up(self):
+        """ตรรกะการเลื่อนขึ้นด่านใหม่ (PLAYING -> LEVEL_COMPLETE)
+        ไม่รอด้วย sleep ขณะถือ lock แต่นัดเริ่มด่านถัดไปไว้กับ scheduler แทน"""
+        current_level = self.game_state.level
+        self.game_state.total_score += self.game_state.score
+        next_level = current_level + 1
+
+        if next_level in LEVEL_DEFINITIONS:
+            # ไปด่านต่อไป
+            self._cancel_timers()
+            self._set_phase(RoomPhase.LEVEL_COMPLETE) # หยุดเกมชั่วคราว
+            self._send('level_complete', {'level': current_level, 'level_score': self.game_state.score, 'total_score': self.game_state.total_score}, self.id)
+            self._schedule('phase', LEVEL_COMPLETE_DELAY, self._start_next_level, next_level, self.game_state.total_score)
+        else:
+            # ชนะเกม
+            self._set_phase(RoomPhase.LOBBY)
+            self._send('game_won', {'total_score': self.game_state.total_score}, self.id)
+            self.game_state = None
+
+    def _start_next_level(self, level, total_score):
+        """LEVEL_COMPLETE -> STARTING: รีเซ็ตสำหรับด่านใหม่ แล้วส่ง snapshot ให้ทุกคน"""
+        self._begin_level(level, total_score)
+        self._send('clear_all_items', {}, self.id)
+        self._send('start_next_level', self._take_snapshot(), self.id)
+
+    def use_ability(self, sid, item_name):
+        """ใช้ความสามารถแปรรูปวัตถุดิบ"""
+        with server_metrics.operation(self.stats, self.lock, 'use_ability'):
+            if self.event_log and sid in self.players:
+                self.event_log.ability(sid, item_name)
+            self._touch()
+            self._apply_use_ability(sid, item_name)
+            self._flush_outbox()
+
+    def _apply_use_ability(self, sid, item_name):
+        """ตรรกะการใช้ความสามารถ (ต้องถือ lock อยู่)"""
+        player = self.players.get(sid)
+        if not player or not self.game_state or not self.game_state.is_active: return
+
+        if not self._allow_action(player):
+            self._send('receive_item', {'item': {'type': 'ingredient', 'name': item_name}}, sid)
+            return
+
+        if not player.ability or player.ability_processing:
+            self._send('action_fail', {'message': 'ไม่สามารถใช้ความสามารถได้ในขณะนี้', 'sound': 'error'}, sid)
+            # [FIX] ส่งวัตถุดิบกลับคืนถ้าใช้ความสามารถไม่ได้
+            self._send('receive_item', {'item': {'type': 'ingredient', 'name': item_name}}, sid)
+            return
+
+        ability_config = ABILITIES_CONFIG.get(player.ability)
+        if not ability_config or item_name not in ability_config['transformations']:
+            self._send('action_fail', {'message': 'วัตถุดิบนี้ใช้กับความสามารถของคุณไม่ได้', 'sound': 'error'}, sid)
+            # [FIX] ส่งวัตถุดิบกลับคืนถ้าวัตถุดิบไม่ถูกต้อง
+            self._send('receive_item', {'item': {'type': 'ingredient', 'name': item_name}}, sid)
+            return
+
+        output_item = ability_config['transformations'][item_name]
+        # end_time เป็นเวลาจริง (wall_clock) เพื่อให้ client นับถอยหลังได้
+        player.ability_processing = AbilityJob(INTERNED_ITEMS[item_name], output_item, self.wall_clock() + ABILITY_DURATION)
+        self._schedule(f'ability:{sid}', ABILITY_DURATION, self._on_ability_done, sid)
+        self._mark_state_changed()
+        
+        verb = ability_config['verb']
+        self._send('action_success', {'message': f'กำลัง{verb}{item_name}...', 'sound': 'click'}, sid)
+        
+        self._request_broadcast()
+
+
+def _added_items(old_items, new_items):
+    """รายการที่มีใน new_items มากกว่าใน old_items (นับจำนวนซ้ำด้วย)"""
+    remaining = list(old_items)
+    added = []
+    for item in new_items:
+        if item in remaining:
+            remaining.remove(item)
+        else:
+            added.append(item)
+    return added
@@ -0,0 +1,56 @@
+# json_cache.py
+# โมดูล JSON สำหรับ Socket.IO ที่รองรับข้อมูลที่ serialize ไว้ล่วงหน้า
+#
+# - `PreSerialized`: ห่อข้อมูลที่แปลงเป็น JSON แล้ว 1 ครั้ง นำไปใส่ใน emit กี่ครั้งก็ได้โดยไม่ต้อง serialize ซ้ำ
+# - `dumps`/`loads`: ส่งให้ SocketIO(json=...) ใช้แทนโมดูล json ปกติ
+#   `dumps` จะนำข้อความของ PreSerialized ไปแทรกลงใน packet ตรงๆ
+#   และใช้ ensure_ascii=False เพื่อไม่ให้ emoji/ภาษาไทยถูกขยายเป็น \uXXXX
+
+import json
+import uuid
+
+from engineio.json import loads  # noqa: F401 (ใช้ loads ของ engineio ที่จำกัดขนาดตัวเลข)
+
+# ข้อความแทนตำแหน่งที่จะแทรก JSON ที่ serialize ไว้แล้ว (สุ่มต่อ process เพื่อไม่ให้ชนกับข้อมูลจากผู้เล่น)
+_PLACEHOLDER = f'__preserialized_{uuid.uuid4().hex}__'
+_QUOTED_PLACEHOLDER = json.dumps(_PLACEHOLDER)
+encoded_chars = 0 # ความยาวรวมของข้อความที่ dumps สร้าง (ใช้วัดขนาด payload ที่ส่งใน metrics)
+
+
+class PreSerialized:
+    """ข้อมูลที่ถูกแปลงเป็น JSON เรียบร้อยแล้ว (เก็บข้อมูลต้นฉบับไว้ใน obj สำหรับ codec อื่น)"""
+    __slots__ = ('obj', 'text')
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.text = json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+    def __len__(self):
+        return len(self.text)
+
+
+def dumps(obj, **kwargs):
+    """json.dumps ที่แทรกข้อความของ PreSerialized ลงไปโดยไม่ serialize ข้อมูลซ้ำ"""
+    chunks = []
+
+    def default(value):
+        if isinstance(value, PreSerialized):
+            chunks.append(value.text)
+            return _PLACEHOLDER
+        raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+    global encoded_chars
+    kwargs.setdefault('ensure_ascii', False)
+    text = json.dumps(obj, default=default, **kwargs)
+    if not chunks:
+        encoded_chars += len(text)
+        return text
+
+    parts = text.split(_QUOTED_PLACEHOLDER)
+    out = [parts[0]]
+    for chunk, part in zip(chunks, parts[1:]):
+        out.append(chunk)
+        out.append(part)
+    text = ''.join(out)
+    encoded_chars += len(text)
+    return text
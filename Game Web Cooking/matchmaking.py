@@ -0,0 +1,146 @@
+# matchmaking.py
+# เล่นด่วน (quick play): จับผู้เล่นที่ไม่มีรหัสห้องเข้าห้องที่ยังรอผู้เล่นอยู่ แทนการสร้างห้องใหม่ที่มีคนเดียว
+#
+# - ดัชนีห้องตามจำนวนที่นั่งว่าง (QuickPlayIndex): ถังละจำนวนที่นั่งว่าง 1..MAX_PLAYERS แต่ละถังเป็น dict ที่เรียงตามเวลาเข้าถัง
+#   ผู้เล่นใหม่ได้ห้องที่ว่างน้อยที่สุด (ใกล้เต็มที่สุด) และรอนานที่สุดในถังนั้น ห้องจึงเต็มเร็วแทนที่จะมีห้องครึ่งๆ กลางๆ หลายห้อง
+#   หาห้อง/ย้ายถังเป็น O(จำนวนถัง) = O(MAX_PLAYERS) ไม่ขึ้นกับจำนวนห้องหรือผู้เล่นที่รออยู่
+# - เฉพาะห้องที่สร้างจาก quick play อยู่ในดัชนี (ห้องที่สร้างด้วยรหัสยังเป็นห้องส่วนตัว) และออกจากดัชนีเมื่อเกมเริ่ม
+# - ห้องเต็มเริ่มเกมทันที ห้องที่ไม่เต็มเริ่มเองเมื่อรอครบ max_wait วินาทีและมีผู้เล่นอย่างน้อย min_players คน (app.py นัดเวลา)
+# - วัดเวลาหาห้อง (place) และเวลารอตั้งแต่กดเล่นด่วนจนเกมเริ่ม (wait) ลง QuickPlayStats ของ ServerMetrics (/metrics)
+
+import time
+from threading import Lock
+
+from metrics import QuickPlayStats
+
+QUICK_PLAY_MAX_WAIT = 15 # วินาที: ห้องที่ไม่เต็มเริ่มเกมเองเมื่อรอนานเท่านี้ (ถ้ามีผู้เล่นพอ)
+QUICK_PLAY_MIN_PLAYERS = 2 # ผู้เล่นขั้นต่ำที่ห้อง quick play เริ่มเกมเองได้
+
+
+class QuickPlayIndex:
+    """ห้องที่ยังรับผู้เล่นได้ แบ่งเป็นถังตามจำนวนที่นั่งว่าง (ต้องเรียกขณะถือ lock ของ Matchmaker)"""
+    def __init__(self, seats):
+        self.seats = seats
+        self._buckets = [{} for _ in range(seats + 1)] # [ที่นั่งว่าง] -> {room_id: room} (ถัง 0 ไม่ใช้)
+        self._free = {} # room_id -> ที่นั่งว่าง (ถังที่ห้องอยู่)
+
+    def __len__(self):
+        return len(self._free)
+
+    def __contains__(self, room_id):
+        return room_id in self._free
+
+    def update(self, room, free):
+        """ย้ายห้องไปถังของจำนวนที่นั่งว่างใหม่ (free <= 0: นำออกจากดัชนี)"""
+        self.discard(room.id)
+        if free > 0:
+            self._buckets[min(free, self.seats)][room.id] = room
+            self._free[room.id] = free
+
+    def discard(self, room_id):
+        free = self._free.pop(room_id, None)
+        if free is not None:
+            del self._buckets[min(free, self.seats)][room_id]
+
+    def best(self):
+        """ห้องที่ที่นั่งว่างน้อยที่สุด (รอนานที่สุดในถังเดียวกัน) หรือ None ถ้าไม่มีห้องที่รับผู้เล่นได้"""
+        for bucket in self._buckets[1:]:
+            if bucket:
+                return next(iter(bucket.values()))
+        return None
+
+    def open_seats(self):
+        """{ที่นั่งว่าง: จำนวนห้อง} สำหรับ /stats"""
+        return {free: len(bucket) for free, bucket in enumerate(self._buckets) if bucket}
+
+
+class Matchmaker:
+    """จับผู้เล่น quick play เข้าห้อง ถือ lock ของตัวเองก่อน lock ของห้อง/registry เสมอ"""
+    def __init__(self, seats, clock=time.monotonic, stats=None, min_players=QUICK_PLAY_MIN_PLAYERS):
+        self.index = QuickPlayIndex(seats)
+        self.seats = seats
+        self.clock = clock
+        self.stats = stats or QuickPlayStats()
+        self.min_players = min_players
+        self._waiting = {} # sid -> (เวลาที่กดเล่นด่วน, room_id)
+        self._lock = Lock()
+
+    def place(self, sid, join, create):
+        """หาห้องให้ sid: `join(room)` เพิ่มผู้เล่นเข้าห้อง (False ถ้าห้องรับไม่ได้แล้ว) `create()` สร้างห้องใหม่ที่มี sid เป็น host
+        คืนค่า (ห้อง, ห้องเต็มแล้วหรือไม่) ห้องที่เต็มถูกนำออกจากดัชนี ผู้เรียกเริ่มเกมได้ทันที"""
+        started = time.perf_counter()
+        with self._lock:
+            while True:
+                room = self.index.best()
+                if room is None:
+                    room = create()
+                    self.stats.rooms_created += 1
+                    break
+                if join(room):
+                    break
+                self.index.discard(room.id) # ห้องเริ่มเกม/ถูกลบไปแล้ว (ไม่ได้ผ่าน room_started/room_closed)
+            free = self.seats - len(room.players)
+            self.index.update(room, free)
+            self._waiting[sid] = (self.clock(), room.id)
+            self.stats.players += 1
+        self.stats.place_seconds.observe(time.perf_counter() - started)
+        return room, free <= 0
+
+    def joined(self, room):
+        """ผู้เล่นเข้าห้องด้วยรหัสห้อง (ไม่ผ่าน place): ถ้าเป็นห้อง quick play ที่ยังไม่เริ่ม ย้ายถังตามที่นั่งว่างที่เหลือ
+        คืนค่า True ถ้าห้องเต็มแล้ว (ถูกนำออกจากดัชนี ผู้เรียกเริ่มเกมได้ทันทีแบบเดียวกับ place)"""
+        with self._lock:
+            if room.id not in self.index:
+                return False
+            free = self.seats - len(room.players)
+            self.index.update(room, free)
+            return free <= 0
+
+    def left(self, sid, room):
+        """ผู้เล่นออกจากห้อง: ถ้าเป็นห้อง quick play ที่ยังไม่เริ่ม ที่นั่งว่างเพิ่มขึ้น (ห้องอื่นไม่มีผล ห้องที่ไม่เหลือใครใช้ room_closed)"""
+        with self._lock:
+            if self._waiting.pop(sid, None) is not None:
+                self.stats.abandoned += 1
+            if room.id in self.index and room.players:
+                self.index.update(room, self.seats - len(room.players))
+
+    def room_started(self, room, timeout=False):
+        """เกมของห้องเริ่มแล้ว: นำออกจากดัชนีและบันทึกเวลารอของผู้เล่นทุกคนในห้อง"""
+        now = self.clock()
+        with self._lock:
+            self.index.discard(room.id)
+            for sid in list(room.players):
+                waiting = self._waiting.pop(sid, None)
+                if waiting is not None and waiting[1] == room.id:
+                    self.stats.wait_seconds.observe(now - waiting[0])
+            if timeout:
+                self.stats.started_timeout += 1
+            else:
+                self.stats.started_full += 1
+
+    def room_closed(self, room):
+        with self._lock:
+            self.index.discard(room.id)
+            for sid in list(room.players):
+                self._waiting.pop(sid, None)
+
+    def is_waiting(self, room):
+        """ห้องยังอยู่ในดัชนี (ยังไม่เริ่มเกม)"""
+        return room.id in self.index
+
+    def ready_to_start(self, room):
+        """ห้องที่รอครบ max_wait แล้วเริ่มเกมได้หรือยัง (มีผู้เล่นพอ)"""
+        return room.id in self.index and len(room.players) >= self.min_players
+
+    def gauges(self):
+        with self._lock:
+            return {
+                'open_rooms': len(self.index),
+                'open_rooms_by_free_seats': self.index.open_seats(),
+                'waiting_players': len(self._waiting),
+                'players_total': self.stats.players,
+                'rooms_created': self.stats.rooms_created,
+                'started_full': self.stats.started_full,
+                'started_timeout': self.stats.started_timeout,
+                'abandoned': self.stats.abandoned,
+            }
@@ -0,0 +1,240 @@
+# metrics.py
+# ตัววัดการทำงานของห้องเกมสำหรับ production (ดูผลที่ GET /metrics ในรูปแบบ text ของ Prometheus)
+#
+# - histogram เวลาที่ใช้ต่อการทำงานของห้อง (op): timer ของห้อง (tick/spawn/ability/phase/broadcast),
+#   player_action, use_ability และ build_ui_state (สร้าง state ใหม่ใน get_augmented_state_for_ui)
+# - histogram เวลารอ lock: lock ของห้อง (room) และ lock ของ shard ใน RoomRegistry (registry)
+# - จำนวน packet ที่ส่งและขนาด payload (ความยาวข้อความ JSON + byte ของข้อมูล binary)
+# - สถิติสะสมต่อห้อง (RoomStats) สำหรับดูห้องที่ใช้เวลามากที่สุด N ห้อง (/metrics?top=N)
+# - quick play (matchmaking.py): เวลาหาห้องต่อผู้เล่น, เวลารอจนเกมเริ่ม และจำนวนห้องที่เริ่มเพราะเต็ม/รอครบเวลา
+#
+# ต้นทุนต่ำ: bucket คงที่ + bisect ไม่มี lock (ตัวนับอาจคลาดเล็กน้อยเมื่อใช้ thread จริง ภายใต้ eventlet ไม่คลาด)
+# ปิดได้ด้วย env METRICS=0 (ห้องจะใช้ lock ตรงๆ โดยไม่จับเวลา)
+
+import bisect
+import heapq
+import time
+
+# ขอบบนของ bucket (วินาที) ครอบคลุม 20 µs ถึง 0.5 วินาที
+DURATION_BUCKETS = (0.00002, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+# ขอบบนของ bucket ของเวลารอเกมเริ่มใน quick play (วินาที)
+WAIT_BUCKETS = (0.5, 1, 2, 5, 10, 15, 20, 30, 60, 120)
+
+
+class Histogram:
+    """histogram แบบ bucket คงที่ (นับสะสมแบบ Prometheus ตอน render)"""
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds=DURATION_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # ช่องสุดท้ายคือ +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RoomStats:
+    """สถิติสะสมของห้อง 1 ห้อง"""
+    __slots__ = ('created_at', 'busy_seconds', 'operations', 'emits', 'payload_bytes', 'lock_wait_seconds')
+
+    def __init__(self, now):
+        self.created_at = now
+        self.busy_seconds = 0.0 # เวลาที่ถือ lock ของห้องทำงาน (op ทั้งหมด)
+        self.operations = 0
+        self.emits = 0 # packet ที่ส่งออก
+        self.payload_bytes = 0
+        self.lock_wait_seconds = 0.0
+
+
+class QuickPlayStats:
+    """histogram และตัวนับของ quick play (ดู matchmaking.py)"""
+    __slots__ = ('place_seconds', 'wait_seconds', 'players', 'rooms_created', 'started_full', 'started_timeout', 'abandoned')
+
+    def __init__(self):
+        self.place_seconds = Histogram() # เวลาที่ใช้หาห้อง/สร้างห้องให้ผู้เล่น 1 คน
+        self.wait_seconds = Histogram(WAIT_BUCKETS) # เวลาตั้งแต่กดเล่นด่วนจนเกมเริ่ม
+        self.players = 0
+        self.rooms_created = 0
+        self.started_full = 0 # ห้องที่เริ่มเพราะผู้เล่นเต็ม (หรือ host กดเริ่มเอง)
+        self.started_timeout = 0 # ห้องที่เริ่มเองเมื่อรอครบเวลา
+        self.abandoned = 0 # ผู้เล่นที่ออกก่อนเกมเริ่ม
+
+
+class TimedLock:
+    """ห่อ lock เพื่อจับเวลารอ lock ลง histogram (ใช้กับ `with` ได้เหมือน lock เดิม)"""
+    __slots__ = ('lock', 'wait')
+
+    def __init__(self, lock, wait):
+        self.lock = lock
+        self.wait = wait
+
+    def __enter__(self):
+        started = time.perf_counter()
+        self.lock.acquire()
+        self.wait.observe(time.perf_counter() - started)
+        return self
+
+    def __exit__(self, *exc):
+        self.lock.release()
+
+
+class RoomOperation:
+    """context manager ของ 1 op ของห้อง: ถือ lock ของห้อง จับเวลารอ lock และเวลาที่ทำงาน"""
+    __slots__ = ('metrics', 'stats', 'lock', 'op', '_acquired_at')
+
+    def __init__(self, metrics, stats, lock, op):
+        self.metrics = metrics
+        self.stats = stats
+        self.lock = lock
+        self.op = op
+
+    def __enter__(self):
+        started = time.perf_counter()
+        self.lock.acquire()
+        self._acquired_at = time.perf_counter()
+        wait = self._acquired_at - started
+        self.metrics.lock_wait('room').observe(wait)
+        self.stats.lock_wait_seconds += wait
+        return self
+
+    def __exit__(self, *exc):
+        busy = time.perf_counter() - self._acquired_at
+        self.lock.release()
+        self.metrics.op_duration(self.op).observe(busy)
+        self.stats.busy_seconds += busy
+        self.stats.operations += 1
+
+
+class ServerMetrics:
+    """ตัววัดรวมของ process (1 ตัวต่อ process เหมือน tick_metrics)"""
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.op_seconds = {} # {op: Histogram}
+        self.lock_wait_seconds = {} # {ชื่อ lock: Histogram}
+        self.emits = 0
+        self.payload_bytes = 0
+        self.quick_play = QuickPlayStats()
+
+    def op_duration(self, op):
+        histogram = self.op_seconds.get(op)
+        if histogram is None:
+            histogram = self.op_seconds[op] = Histogram()
+        return histogram
+
+    def lock_wait(self, name):
+        histogram = self.lock_wait_seconds.get(name)
+        if histogram is None:
+            histogram = self.lock_wait_seconds[name] = Histogram()
+        return histogram
+
+    def room_stats(self, now):
+        return RoomStats(now) if self.enabled else None
+
+    def operation(self, stats, lock, op):
+        """context manager สำหรับ op ของห้อง (lock ตรงๆ ถ้าปิดการวัด)"""
+        return RoomOperation(self, stats, lock, op) if self.enabled and stats is not None else lock
+
+    def timed_lock(self, lock, name):
+        return TimedLock(lock, self.lock_wait(name)) if self.enabled else lock
+
+    def record_emits(self, stats, packets, payload_bytes):
+        self.emits += packets
+        self.payload_bytes += payload_bytes
+        if stats is not None:
+            stats.emits += packets
+            stats.payload_bytes += payload_bytes
+
+    # --- รูปแบบ text ของ Prometheus ---
+    def render(self, gauges, counters, rooms=(), top=0, now=None):
+        """gauges/counters: {ชื่อ metric: (คำอธิบาย, ค่า)}, rooms: ห้องทั้งหมด (ใช้เมื่อ top > 0)"""
+        lines = []
+        for name, (help_text, value) in gauges.items():
+            _family(lines, name, 'gauge', help_text)
+            lines.append(f'{name} {_number(value)}')
+        for name, (help_text, value) in counters.items():
+            _family(lines, name, 'counter', help_text)
+            lines.append(f'{name} {_number(value)}')
+
+        _family(lines, 'cooking_emits_total', 'counter', 'Socket.IO packets sent by rooms')
+        lines.append(f'cooking_emits_total {self.emits}')
+        _family(lines, 'cooking_emit_payload_bytes_total', 'counter', 'Payload size of packets sent by rooms (JSON characters + binary bytes)')
+        lines.append(f'cooking_emit_payload_bytes_total {self.payload_bytes}')
+        _histograms(lines, 'cooking_room_op_seconds', 'Time spent holding the room lock per operation', 'op', self.op_seconds)
+        _histograms(lines, 'cooking_lock_wait_seconds', 'Time spent waiting to acquire a lock', 'lock', self.lock_wait_seconds)
+        quick_play = self.quick_play
+        for name, help_text, value in (
+            ('cooking_quickplay_players_total', 'Players placed by quick play', quick_play.players),
+            ('cooking_quickplay_rooms_created_total', 'Rooms created by quick play', quick_play.rooms_created),
+            ('cooking_quickplay_abandoned_total', 'Quick play players that left before their game started', quick_play.abandoned),
+        ):
+            _family(lines, name, 'counter', help_text)
+            lines.append(f'{name} {value}')
+        _family(lines, 'cooking_quickplay_started_total', 'counter', 'Quick play rooms whose game started, by reason')
+        lines.append(f'cooking_quickplay_started_total{{reason="full"}} {quick_play.started_full}')
+        lines.append(f'cooking_quickplay_started_total{{reason="timeout"}} {quick_play.started_timeout}')
+        _family(lines, 'cooking_quickplay_place_seconds', 'histogram', 'Time spent finding or creating a room for a quick play player')
+        _histogram_lines(lines, 'cooking_quickplay_place_seconds', '', quick_play.place_seconds)
+        _family(lines, 'cooking_quickplay_wait_seconds', 'histogram', 'Time from quick play request until the game started')
+        _histogram_lines(lines, 'cooking_quickplay_wait_seconds', '', quick_play.wait_seconds)
+        if top > 0:
+            _top_rooms(lines, rooms, top, now)
+        return '\n'.join(lines) + '\n'
+
+
+def _family(lines, name, kind, help_text):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histograms(lines, name, help_text, label, histograms):
+    _family(lines, name, 'histogram', help_text)
+    for key, histogram in sorted(histograms.items()):
+        _histogram_lines(lines, name, f'{label}="{_label(key)}"', histogram)
+
+
+def _histogram_lines(lines, name, labels, histogram):
+    """series ของ histogram 1 ตัว (labels: label อื่นนอกจาก le เช่น 'op="tick"' หรือ '')"""
+    prefix = f'{labels},' if labels else ''
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    suffix = f'{{{labels}}}' if labels else ''
+    lines.append(f'{name}_sum{suffix} {histogram.sum!r}')
+    lines.append(f'{name}_count{suffix} {histogram.count}')
+
+
+def _top_rooms(lines, rooms, top, now):
+    """ห้องที่ใช้เวลาทำงานรวมมากที่สุด top ห้อง (อัตราต่อวินาทีเฉลี่ยตั้งแต่สร้างห้อง)"""
+    ranked = heapq.nlargest(top, (room for room in rooms if room.stats is not None), key=lambda room: room.stats.busy_seconds)
+    series = (
+        ('cooking_room_busy_seconds_total', 'counter', 'Time spent holding the room lock', lambda s, age: s.busy_seconds),
+        ('cooking_room_operations_total', 'counter', 'Room operations', lambda s, age: s.operations),
+        ('cooking_room_lock_wait_seconds_total', 'counter', 'Time spent waiting for the room lock', lambda s, age: s.lock_wait_seconds),
+        ('cooking_room_emits_per_second', 'gauge', 'Packets sent per second since the room was created', lambda s, age: s.emits / age),
+        ('cooking_room_payload_bytes_total', 'counter', 'Payload size of packets sent by the room', lambda s, age: s.payload_bytes),
+    )
+    for name, kind, help_text, value in series:
+        _family(lines, name, kind, help_text)
+        for room in ranked:
+            age = max(now - room.stats.created_at, 1e-9)
+            lines.append(f'{name}{{room="{_label(room.id)}"}} {_number(value(room.stats, age))}')
+    _family(lines, 'cooking_room_players', 'gauge', 'Players in the room')
+    for room in ranked:
+        lines.append(f'cooking_room_players{{room="{_label(room.id)}"}} {len(room.players)}')
+    _family(lines, 'cooking_room_spectators', 'gauge', 'Spectators watching the room')
+    for room in ranked:
+        lines.append(f'cooking_room_spectators{{room="{_label(room.id)}"}} {len(room.spectators)}')
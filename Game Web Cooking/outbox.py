@@ -0,0 +1,116 @@
+# outbox.py
+# รวบรวมข้อความขาออกของห้องระหว่าง 1 tick หรือ 1 action แล้วส่งรวดเดียว
+#
+# - ข้อความทั้งหมดที่ผู้เล่นคนหนึ่งจะได้รับในรอบนั้น (ทั้งข้อความส่วนตัว เช่น receive_item/toast
+#   และข้อความที่ส่งทั้งห้อง เช่น state_patch) ถูกรวมเป็น event `bundle` เดียว ในรูป [[event, data], ...]
+#   ลดจำนวน packet และการเขียน socket ต่อ tick
+# - ผู้เล่นที่ไม่มีข้อความส่วนตัวจะได้รับข้อความของห้องผ่านการ emit ไปยังห้องครั้งเดียวตามเดิม
+# - client จะแยก bundle แล้วเรียก handler ของแต่ละ event ตามลำดับเดิม (ยังได้ทีละไอเท็มเหมือนเดิม)
+# - ถ้ามีข้อความเดียวจะส่งเป็น event ปกติ ไม่ห่อเป็น bundle
+# - client แบบย่อ (compact_sids) ได้ข้อความชุดเดียวกันเป็น msgpack ใน event PACKED_EVENT (ดู compact_codec.py)
+#   ข้อความของห้องเข้ารหัสครั้งเดียวต่อ codec แล้วส่งไปที่ compact_room ส่วน JSON ส่งไปที่ห้องเดิมโดยข้าม client แบบย่อ
+# - ผู้ชม (has_spectators) ได้ข้อความของห้องแบบ JSON ใน emit เดียวกับผู้เล่น (ปลายทางเป็น [ห้อง, spectator_room])
+#   Socket.IO เข้ารหัส packet ครั้งเดียวแล้วเขียนให้ทุก sid จึงไม่มีการ serialize เพิ่มตามจำนวนผู้ชม
+#   ข้อความที่ส่งถึง spectator_room โดยตรง (เช่น snapshot ตอนเริ่มเกม) ส่งต่อจากข้อความของห้องใน packet แยก
+
+from compact_codec import PACKED_EVENT, pack_batch
+from json_cache import PreSerialized
+
+
+def spectator_room(room_id):
+    """ชื่อ socket.io room ของผู้ชมในห้องเกม room_id"""
+    return f'{room_id}:spectators'
+
+
+class Outbox:
+    """คิวข้อความขาออกของห้อง (คงลำดับการส่งตามที่เข้าคิว)"""
+    __slots__ = (
+        'room', 'compact_room', 'spectator_room', 'encoder', 'compact_sids', 'has_json_players', 'has_spectators',
+        'binary_bytes', '_messages',
+    )
+
+    def __init__(self, room, compact_room=None, spectator_room=None):
+        self.room = room # ปลายทางที่หมายถึงทุกคนในห้อง (room_id)
+        self.compact_room = compact_room # ปลายทางที่หมายถึง client แบบย่อทุกคนในห้อง
+        self.spectator_room = spectator_room # ปลายทางที่หมายถึงผู้ชมทุกคนของห้อง
+        self.encoder = None # CompactEncoder ของเกมปัจจุบัน (None = ส่ง JSON ให้ทุกคน)
+        self.compact_sids = () # sid ที่รับข้อความแบบย่อ
+        self.has_json_players = True # มีผู้เล่นที่รับ JSON อยู่ในห้องหรือไม่
+        self.has_spectators = False # มีผู้ชมหรือไม่
+        self.binary_bytes = 0 # byte รวมของข้อมูลแบบย่อที่ส่งไปแล้ว (สำหรับ metrics)
+        self._messages = [] # [(ปลายทาง, [event, data])]
+
+    def __bool__(self):
+        return bool(self._messages)
+
+    def send(self, event, data, to):
+        self._messages.append((to, [event, data]))
+
+    def flush(self, emit):
+        """ส่งข้อความทั้งหมดผ่าน emit(event, data, to, skip_sid) แล้วล้างคิว คืนค่าจำนวน packet ที่ส่งจริง"""
+        messages, self._messages = self._messages, []
+        if not messages:
+            return 0
+
+        compact_sids = self.compact_sids if self.encoder else ()
+        private_sids = list(dict.fromkeys(to for to, _ in messages if to != self.room and to != self.spectator_room))
+        json_sids = [sid for sid in private_sids if sid not in compact_sids]
+        shared = [message for to, message in messages if to == self.room]
+        if json_sids and shared:
+            # ข้อความของห้องจะถูกใส่ซ้ำใน bundle ของหลายคน จึง serialize ไว้ครั้งเดียว
+            for message in shared:
+                if not isinstance(message[1], PreSerialized):
+                    message[1] = PreSerialized(message[1])
+
+        packets = 0
+        for sid in json_sids:
+            batch = [message for to, message in messages if to == sid or to == self.room]
+            self._emit_batch(emit, batch, sid, None)
+            packets += 1
+        if shared:
+            targets = [self.room] if self.has_json_players or not compact_sids else []
+            if self.has_spectators:
+                targets.append(self.spectator_room)
+            if targets:
+                skip_sids = json_sids + list(compact_sids)
+                self._emit_batch(emit, shared, targets[0] if len(targets) == 1 else targets, skip_sids or None)
+                packets += 1
+        if self.has_spectators:
+            spectator_only = [message for to, message in messages if to == self.spectator_room]
+            if spectator_only:
+                self._emit_batch(emit, spectator_only, self.spectator_room, None)
+                packets += 1
+        if compact_sids:
+            packets += self._flush_compact(emit, messages, private_sids, compact_sids)
+        return packets
+
+    def _flush_compact(self, emit, messages, private_sids, compact_sids):
+        """ส่งข้อความให้ client แบบย่อ: แต่ละข้อความเข้ารหัสครั้งเดียวไม่ว่าจะมีผู้รับกี่คน"""
+        encode = self.encoder.encode
+        encoded = [
+            (to, encode(*message)) for to, message in messages
+            if to == self.room or to in compact_sids
+        ]
+        if not encoded:
+            return 0
+        packets = 0
+        compact_private = [sid for sid in private_sids if sid in compact_sids]
+        for sid in compact_private:
+            payload = pack_batch([data for to, data in encoded if to == sid or to == self.room])
+            self.binary_bytes += len(payload)
+            emit(PACKED_EVENT, payload, sid, None)
+            packets += 1
+        shared = [data for to, data in encoded if to == self.room]
+        if shared:
+            payload = pack_batch(shared)
+            self.binary_bytes += len(payload)
+            emit(PACKED_EVENT, payload, self.compact_room, compact_private or None)
+            packets += 1
+        return packets
+
+    @staticmethod
+    def _emit_batch(emit, batch, to, skip_sid):
+        if len(batch) == 1:
+            emit(batch[0][0], batch[0][1], to, skip_sid)
+        else:
+            emit('bundle', batch, to, skip_sid)
@@ -0,0 +1,26 @@
+# rate_limit.py
+# จำกัดความถี่ของ action ต่อผู้เล่นแบบ Token Bucket
+#
+# ผู้เล่นทำ action ติดกันได้ไม่เกิน `capacity` ครั้ง (เช่นลากวัตถุดิบหลายชิ้นรวดเร็ว)
+# หลังจากนั้นจะได้โควต้าคืน `rate` ครั้งต่อวินาที action ที่เกินโควต้าจะถูกปฏิเสธ
+
+
+class TokenBucket:
+    """โควต้า action ของผู้เล่น 1 คน (เริ่มต้นเต็มถัง)"""
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = None
+
+    def consume(self, now, amount=1):
+        """ใช้โควต้า `amount` หน่วย ณ เวลา now (วินาที, monotonic) คืนค่า False ถ้าโควต้าไม่พอ"""
+        if self.updated_at is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens < amount:
+            return False
+        self.tokens -= amount
+        return True
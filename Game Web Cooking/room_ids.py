@@ -0,0 +1,108 @@
+# room_ids.py
+# ตัวจัดสรรรหัสห้อง (room_id) ที่ไม่ซ้ำกันแน่นอนใน O(1)
+#
+# - รหัสยาว `length` ตัวจากตัวอักษร `alphabet` มีทั้งหมด N = len(alphabet) ** length รหัส
+# - รหัสใหม่มาจากลำดับ index = (a * n + b) mod N โดย gcd(a, N) = 1 ซึ่งเป็นการเรียงสับเปลี่ยน (permutation) ของ 0..N-1
+#   n ที่เพิ่มทีละ 1 จึงได้รหัสไม่ซ้ำกันจนครบ N รหัส โดยไม่ต้องสุ่มใหม่เมื่อชน และรหัสที่ออกติดกันดูไม่เรียงกัน
+# - รหัสของห้องที่ถูกลบจะเข้าคิว (free list) และนำกลับมาใช้เมื่อคิวยาวเกิน `reuse_after` หรือรหัสใหม่หมดแล้ว
+#   รหัสที่เพิ่งปิดไปจึงไม่ถูกใช้ซ้ำทันที (ผู้เล่นที่ถือรหัสเก่าไม่หลงเข้าห้องใหม่) และคิวมีขนาดจำกัด
+# - เมื่อรันหลาย worker (ดู sharding.py) แต่ละ worker ออกเฉพาะรหัสใน partition ของตัวเอง:
+#   index mod จำนวน worker == ลำดับของ worker (permutation ข้างบนทำบน index ภายใน partition)
+#   ทุก worker จึงคำนวณเจ้าของของรหัสใดๆ ได้จากตัวรหัสเอง (room_id_index)
+# - ห้องที่ย้ายมาจาก process เดิม (room_snapshot.py) จองรหัสเดิมไว้ด้วย reserve รหัสนั้นจะไม่ถูกออกซ้ำจนกว่าจะคืน
+
+import math
+import random
+import string
+from collections import deque
+from threading import Lock
+
+ROOM_ID_ALPHABET = string.ascii_uppercase + string.digits
+
+
+class RoomIdsExhausted(Exception):
+    """รหัสห้องถูกใช้ครบทุกรหัสแล้ว"""
+
+
+def room_id_index(room_id, alphabet=ROOM_ID_ALPHABET):
+    """ตำแหน่งของรหัสห้องในลำดับรหัสทั้งหมด (ผกผันของ RoomIdAllocator._encode) None ถ้ามีตัวอักษรนอก alphabet"""
+    base = len(alphabet)
+    index = 0
+    for char in room_id:
+        digit = alphabet.find(char)
+        if digit < 0:
+            return None
+        index = index * base + digit
+    return index
+
+
+class RoomIdAllocator:
+    """จัดสรรรหัสห้องแบบไม่ซ้ำ allocate/release เป็น O(1) และปลอดภัยเมื่อเรียกจากหลาย thread"""
+    def __init__(self, length=4, alphabet=ROOM_ID_ALPHABET, reuse_after=1024, rng=None, partition=(0, 1)):
+        rng = rng or random.SystemRandom() # ค่า a, b ต่างกันทุก process จึงเดารหัสถัดไปไม่ได้
+        self.length = length
+        self.alphabet = alphabet
+        self.partition, self.partitions = partition # (ลำดับของ worker, จำนวน worker)
+        # จำนวน index ใน 0..len(alphabet)**length - 1 ที่ mod partitions ได้ partition
+        self.capacity = (len(alphabet) ** length - self.partition + self.partitions - 1) // self.partitions
+        self.reuse_after = reuse_after
+        self._multiplier = rng.randrange(1, self.capacity)
+        while math.gcd(self._multiplier, self.capacity) != 1:
+            self._multiplier = rng.randrange(1, self.capacity)
+        self._offset = rng.randrange(self.capacity)
+        self._issued = 0 # จำนวนรหัสใหม่ที่ออกไปแล้ว (n)
+        self._free = deque() # รหัสที่คืนมาแล้ว เรียงตามลำดับที่คืน
+        self._reserved = {} # {รหัสที่ reserve ไว้: ถูกข้ามไปแล้วหรือยัง} allocate ข้ามรหัสเหล่านี้
+        self._lock = Lock()
+        self.in_use = 0
+
+    def allocate(self):
+        """คืนรหัสห้องที่ยังไม่มีห้องไหนใช้อยู่ (RoomIdsExhausted ถ้าใช้ครบทุกรหัสแล้ว)"""
+        with self._lock:
+            while True:
+                if self._free and (len(self._free) > self.reuse_after or self._issued >= self.capacity):
+                    room_id = self._free.popleft()
+                elif self._issued < self.capacity:
+                    index = (self._multiplier * self._issued + self._offset) % self.capacity
+                    self._issued += 1
+                    room_id = self._encode(index * self.partitions + self.partition)
+                else:
+                    raise RoomIdsExhausted(f'รหัสห้องยาว {self.length} ตัวถูกใช้ครบ {self.capacity:,} รหัสแล้ว')
+                if room_id not in self._reserved:
+                    break
+                self._reserved[room_id] = True
+            self.in_use += 1
+            return room_id
+
+    def reserve(self, room_id):
+        """จองรหัสที่ไม่ได้มาจาก allocate (ห้องที่ restore มา) คืนรหัสด้วย release เหมือนรหัสอื่น"""
+        with self._lock:
+            self._reserved[room_id] = False
+            self.in_use += 1
+
+    def release(self, room_id):
+        """คืนรหัสของห้องที่ถูกลบแล้ว (เรียกครั้งเดียวต่อการ allocate)"""
+        with self._lock:
+            # รหัสที่ reserve ไว้แต่ allocate ยังไม่เคยพบ จะถูกออกตามปกติจาก permutation ภายหลัง จึงไม่เข้า free list
+            if self._reserved.pop(room_id, True):
+                self._free.append(room_id)
+            self.in_use -= 1
+
+    def _encode(self, index):
+        base = len(self.alphabet)
+        chars = []
+        for _ in range(self.length):
+            index, digit = divmod(index, base)
+            chars.append(self.alphabet[digit])
+        return ''.join(reversed(chars))
+
+    def stats(self):
+        return {
+            'length': self.length,
+            'capacity': self.capacity,
+            'partition': [self.partition, self.partitions],
+            'in_use': self.in_use,
+            'free_list': len(self._free),
+            'reserved': len(self._reserved),
+            'never_issued': self.capacity - self._issued,
+        }
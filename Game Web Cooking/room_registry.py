@@ -0,0 +1,145 @@
+# room_registry.py
+# ที่เก็บห้องเกมทั้งหมดของ server
+#
+# - แบ่งห้องเป็นหลาย shard ตาม room_id แต่ละ shard มี lock ของตัวเอง
+#   การค้นหาห้องใน handle_player_action / handle_use_ability / handle_start_game จึงไม่แย่ง lock เดียวกัน
+# - มีดัชนี sid -> ห้อง (แบ่ง shard ตาม sid เช่นกัน) ทำให้ตอนผู้เล่นตัดการเชื่อมต่อหาห้องได้ใน O(1)
+#   แทนการวนหาทุกห้อง
+# - ลำดับการถือ lock: shard ของห้อง -> shard ของ sid เสมอ (ป้องกัน deadlock)
+# - รหัสห้องมาจาก RoomIdAllocator (room_ids.py) ได้รหัสไม่ซ้ำใน O(1) และคืนรหัสเมื่อห้องถูกลบ
+# - นับจำนวนห้องที่ถูกลบตามสาเหตุ (ว่าง / ไม่มีการใช้งานนานเกิน TTL / ผู้เล่นหลุดหมด) สำหรับ /stats
+# - restore_room: เพิ่มห้องที่ย้ายมาจาก process เดิมด้วยรหัสเดิม (จองรหัสไว้กับ allocator)
+# - ถ้าส่ง metrics (ServerMetrics) มา เวลารอ lock ของ shard ถูกบันทึกเป็น lock="registry"
+
+from collections import Counter
+from threading import Lock
+
+from room_ids import RoomIdAllocator
+
+
+class _Shard:
+    __slots__ = ('lock', 'items')
+
+    def __init__(self, metrics=None):
+        self.lock = metrics.timed_lock(Lock(), 'registry') if metrics else Lock()
+        self.items = {}
+
+
+class RoomRegistry:
+    """เก็บห้องตาม room_id และดัชนีว่าแต่ละ sid อยู่ห้องไหน"""
+    def __init__(self, shard_count=16, id_length=4, partition=(0, 1), metrics=None):
+        self._room_shards = [_Shard(metrics) for _ in range(shard_count)]
+        self._sid_shards = [_Shard(metrics) for _ in range(shard_count)]
+        self.ids = RoomIdAllocator(id_length, partition=partition) # partition: รหัสของ worker นี้ (ดู sharding.py)
+        self.removed = Counter() # {สาเหตุ: จำนวนห้องที่ถูกลบ}
+
+    def _room_shard(self, room_id):
+        return self._room_shards[hash(room_id) % len(self._room_shards)]
+
+    def _sid_shard(self, sid):
+        return self._sid_shards[hash(sid) % len(self._sid_shards)]
+
+    # --- ห้อง ---
+    def get(self, room_id):
+        shard = self._room_shard(room_id)
+        with shard.lock:
+            return shard.items.get(room_id)
+
+    def __contains__(self, room_id):
+        return self.get(room_id) is not None
+
+    def __len__(self):
+        return sum(len(shard.items) for shard in self._room_shards)
+
+    def values(self):
+        """สำเนารายการห้องทั้งหมด ณ ขณะนั้น (วนใช้ได้โดยไม่ต้องถือ lock)"""
+        rooms = []
+        for shard in self._room_shards:
+            with shard.lock:
+                rooms.extend(shard.items.values())
+        return rooms
+
+    def create_room(self, factory, host_sid):
+        """สร้างห้องด้วยรหัสใหม่จาก allocator (`factory(room_id)` คืนค่าห้อง) แล้วผูก host เข้ากับห้อง
+        รหัสไม่ซ้ำแน่นอนจึงไม่ต้องวนสุ่มใหม่ (RoomIdsExhausted ถ้ารหัสเต็ม)"""
+        room = factory(self.ids.allocate())
+        if not self.add_room(room, host_sid):
+            raise RuntimeError(f'รหัสห้อง {room.id} ถูกใช้อยู่แล้ว') # เกิดได้เฉพาะเมื่อมีการ add_room ด้วยรหัสที่ไม่ได้มาจาก allocator
+        return room
+
+    def add_room(self, room, host_sid):
+        """เพิ่มห้องพร้อมผูก host เข้ากับห้อง คืนค่า False ถ้ามี room_id นี้อยู่แล้ว"""
+        shard = self._room_shard(room.id)
+        with shard.lock:
+            if room.id in shard.items:
+                return False
+            shard.items[room.id] = room
+            self._bind_sid(host_sid, room)
+        return True
+
+    def restore_room(self, room):
+        """เพิ่มห้องที่ restore จาก snapshot (ยังไม่ผูก sid ใด: ผู้เล่นผูก sid ใหม่ตอน rejoin_room)
+        คืนค่า False ถ้ามี room_id นี้อยู่แล้ว"""
+        shard = self._room_shard(room.id)
+        with shard.lock:
+            if room.id in shard.items:
+                return False
+            shard.items[room.id] = room
+        self.ids.reserve(room.id)
+        return True
+
+    def remove_room(self, room_id, reason='empty'):
+        """ลบห้องและคืนรหัสให้ allocator คืนค่าห้องที่ถูกลบ (None ถ้าถูกลบไปแล้ว)"""
+        shard = self._room_shard(room_id)
+        with shard.lock:
+            room = shard.items.pop(room_id, None)
+            if room is None:
+                return None
+            self.removed[reason] += 1
+        self.ids.release(room_id)
+        return room
+
+    def idle_rooms(self, now):
+        """ห้องที่ไม่มีการใช้งานนานเกิน TTL ณ เวลา now (ดู GameRoom.is_idle)"""
+        return [room for room in self.values() if room.is_idle(now)]
+
+    def gauges(self):
+        """จำนวนห้อง/ผู้เล่น/ผู้ชม/รหัสห้อง ณ ขณะนั้น สำหรับ /stats"""
+        rooms = self.values()
+        return {
+            'rooms': len(rooms),
+            'rooms_by_phase': dict(Counter(room.phase for room in rooms)),
+            'players': sum(len(room.players) for room in rooms),
+            'spectators': sum(len(room.spectators) for room in rooms),
+            'indexed_sids': sum(len(shard.items) for shard in self._sid_shards),
+            'room_ids': self.ids.stats(),
+            'removed': dict(self.removed),
+        }
+
+    # --- ดัชนี sid -> ห้อง ---
+    def _bind_sid(self, sid, room):
+        shard = self._sid_shard(sid)
+        with shard.lock:
+            shard.items[sid] = room
+
+    def bind_sid(self, sid, room):
+        """บันทึกว่า sid อยู่ในห้อง room (ใช้ตอนเข้าร่วมห้อง)"""
+        self._bind_sid(sid, room)
+
+    def room_for_sid(self, sid):
+        shard = self._sid_shard(sid)
+        with shard.lock:
+            return shard.items.get(sid)
+
+    def unbind_sid(self, sid, room):
+        """ลบ sid ออกจากดัชนีเฉพาะเมื่อยังชี้ไปที่ห้อง room (sid อาจย้ายไปสร้าง/เข้าห้องอื่นแล้ว)"""
+        shard = self._sid_shard(sid)
+        with shard.lock:
+            if shard.items.get(sid) is room:
+                del shard.items[sid]
+
+    def pop_sid(self, sid):
+        """ลบ sid ออกจากดัชนี คืนค่าห้องที่ sid นั้นอยู่ (None ถ้าไม่ได้อยู่ห้องไหน)"""
+        shard = self._sid_shard(sid)
+        with shard.lock:
+            return shard.items.pop(sid, None)
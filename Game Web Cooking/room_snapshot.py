@@ -0,0 +1,58 @@
+# room_snapshot.py
+# ไฟล์ snapshot ของห้องเกมทั้งหมดใน process สำหรับ deploy โดยไม่ต้องปิดเกมที่เล่นอยู่
+#
+# - process เดิม (ได้รับ SIGTERM) หยุดรับห้องใหม่ เก็บข้อมูลทุกห้องด้วย GameRoom.snapshot แล้วเขียนไฟล์นี้
+#   process ใหม่อ่านไฟล์ตอนเริ่มแล้วสร้างห้องคืนด้วย GameRoom.restore ผู้เล่นกลับเข้าห้องเดิมด้วย reconnect token
+# - ข้อมูลของห้องเป็น list ตามตำแหน่ง (ไม่มีชื่อ field ซ้ำทุกห้อง) เขียนเป็น JSON แล้วบีบอัดด้วย zlib
+#   ห้องละไม่กี่สิบ byte หลายพันห้องจึงเขียน/อ่านได้ในเวลาไม่กี่สิบ ms (วัดด้วย tools/bench_snapshot.py)
+# - เขียนลงไฟล์ชั่วคราวแล้ว os.replace: process ใหม่ไม่มีทางอ่านได้ไฟล์ที่เขียนไม่ครบ
+#
+# รูปแบบไฟล์: MAGIC, version (u8) แล้วตามด้วย zlib(JSON [เวลาจริงตอนเขียน, [ห้อง, ...]])
+
+import json
+import os
+import zlib
+
+MAGIC = b'CKSN'
+VERSION = 1
+
+
+class SnapshotError(ValueError):
+    """ไฟล์ snapshot เสียหายหรือเป็นเวอร์ชันที่ไม่รองรับ"""
+
+
+def encode_snapshot(rooms, wall_time):
+    """ข้อมูลของห้อง (ผลของ GameRoom.snapshot) เป็น bytes ของไฟล์ snapshot"""
+    body = json.dumps([wall_time, rooms], separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return MAGIC + bytes((VERSION,)) + zlib.compress(body, 6)
+
+
+def decode_snapshot(data):
+    """คืนค่า (เวลาจริงตอนเขียน, รายการข้อมูลของห้อง)"""
+    if data[:len(MAGIC)] != MAGIC:
+        raise SnapshotError('ไม่ใช่ไฟล์ snapshot ของเกม')
+    version = data[len(MAGIC)] if len(data) > len(MAGIC) else None
+    if version != VERSION:
+        raise SnapshotError(f'ไม่รองรับ snapshot เวอร์ชัน {version}')
+    try:
+        wall_time, rooms = json.loads(zlib.decompress(data[len(MAGIC) + 1:]))
+    except (zlib.error, ValueError) as e:
+        raise SnapshotError(f'ไฟล์ snapshot เสียหาย: {e}') from e
+    return wall_time, rooms
+
+
+def write_snapshot(path, rooms, wall_time):
+    """เขียนไฟล์ snapshot แบบ atomic คืนค่าขนาดไฟล์ (byte)"""
+    data = encode_snapshot(rooms, wall_time)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def read_snapshot(path):
+    with open(path, 'rb') as f:
+        return decode_snapshot(f.read())
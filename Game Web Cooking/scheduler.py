@@ -0,0 +1,146 @@
+# scheduler.py
+# ตัวจัดตารางเวลาแบบ Deadline (min-heap) สำหรับแทน Master Game Loop แบบวนทุกห้อง
+#
+# - ห้องเกมลงทะเบียนเฉพาะ deadline ที่ต้องใช้จริง (tick, สุ่มวัตถุดิบ, แปรรูปเสร็จ, เปลี่ยนด่าน)
+# - Loop จะตื่นเฉพาะตอนที่มี event ถึงกำหนด ห้องที่ไม่มีอะไรต้องทำจึงไม่กิน CPU
+# - ยกเลิก event แบบ lazy: ทำเครื่องหมายไว้ แล้วทิ้งตอนถูก pop ออกจาก heap (O(1))
+#
+# ความแม่นยำ: event จะถูกเรียกหลังเวลาที่กำหนดไม่เกิน `resolution` (ค่าเริ่มต้น 5 ms)
+# บวกกับเวลาที่ callback ก่อนหน้าในคิวใช้ไป (ดูผลวัดใน README)
+
+import heapq
+import itertools
+import time
+import traceback
+from threading import Event, Lock
+
+
+class ScheduledEvent:
+    """event 1 รายการใน scheduler"""
+    __slots__ = ('deadline', 'callback', 'args', 'cancelled')
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class DeadlineScheduler:
+    """จัดลำดับ event ตามเวลา (time.monotonic) แล้วเรียก callback เมื่อถึงกำหนด"""
+    def __init__(self, clock=time.monotonic, resolution=0.005):
+        self.clock = clock
+        # เวลารอขั้นต่ำ: event ที่ deadline ห่างกันไม่เกินค่านี้จะถูกทำรวดเดียวในการตื่นครั้งเดียว
+        # (แลกความแม่นยำไม่เกิน resolution กับจำนวนครั้งที่ loop ต้องตื่น)
+        self.resolution = resolution
+        self._heap = [] # [(deadline, seq, ScheduledEvent)]
+        self._seq = itertools.count() # ใช้เรียงลำดับ event ที่ deadline เท่ากัน
+        self._lock = Lock()
+        self._wakeup = Event()
+        self._deferred = [] # callback ที่จะถูกเรียกหลังจบรอบ run_due ปัจจุบัน
+        self._running = False
+
+    def __len__(self):
+        return len(self._heap)
+
+    def call_at(self, deadline, callback, *args):
+        """ลงทะเบียน callback ให้ทำงานที่เวลา deadline (ค่าจาก clock)"""
+        event = ScheduledEvent(deadline, callback, args)
+        with self._lock:
+            is_earliest = not self._heap or deadline < self._heap[0][0]
+            heapq.heappush(self._heap, (deadline, next(self._seq), event))
+        if is_earliest:
+            self._wakeup.set() # ปลุก loop ให้คำนวณเวลารอใหม่
+        return event
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def defer(self, callback, *args):
+        """เรียก callback หลังจบรอบ run_due ปัจจุบัน (ใช้รวมผลของหลาย event ที่ถึงกำหนดพร้อมกัน)
+        ถ้าไม่ได้อยู่ระหว่าง run_due จะเรียกทันที"""
+        if not self._running:
+            callback(*args)
+            return
+        self._deferred.append((callback, args))
+
+    def next_deadline(self):
+        """deadline ที่ใกล้ที่สุดที่ยังไม่ถูกยกเลิก (None ถ้าไม่มี)"""
+        with self._lock:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def run_due(self, now=None):
+        """เรียก callback ของทุก event ที่ถึงกำหนดแล้ว คืนค่าจำนวน event ที่ทำงาน"""
+        if now is None:
+            now = self.clock()
+        count = 0
+        self._running = True
+        try:
+            while True:
+                with self._lock:
+                    if not self._heap or self._heap[0][0] > now:
+                        break
+                    _, _, event = heapq.heappop(self._heap)
+                if event.cancelled:
+                    continue
+                count += 1
+                self._call(event.callback, event.args)
+        finally:
+            self._running = False
+            deferred, self._deferred = self._deferred, []
+            for callback, args in deferred:
+                self._call(callback, args)
+        return count
+
+    @staticmethod
+    def _call(callback, args):
+        try:
+            callback(*args)
+        except Exception:
+            # callback ของห้องใดห้องหนึ่งพัง ต้องไม่ทำให้ loop ของทุกห้องหยุด
+            traceback.print_exc()
+
+    def run_forever(self):
+        """Loop หลัก: ทำงานเฉพาะ event ที่ถึงกำหนด แล้วหลับจนถึง deadline ถัดไป"""
+        while True:
+            self._wakeup.clear()
+            self.run_due()
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else max(self.resolution, deadline - self.clock())
+            self._wakeup.wait(timeout)
+
+
+class TickMetrics:
+    """สถิติของนาฬิกาเกมรวมทุกห้อง ใช้ดูว่า server เริ่มรับภาระไม่ไหว (ควรลดจำนวนห้อง) หรือยัง"""
+    def __init__(self, interval, smoothing=0.05):
+        self.interval = interval
+        self.smoothing = smoothing
+        self.ticks = 0
+        self.overruns = 0 # tick ที่ถูกเรียกช้ากว่ากำหนดตั้งแต่ 1 interval ขึ้นไป
+        self.catch_up_steps = 0 # จำนวน step ที่ต้องไล่ตามเพิ่มเพราะ tick มาช้า
+        self.max_lateness = 0.0
+        self.lateness_ewma = 0.0
+
+    def record(self, lateness, steps):
+        self.ticks += 1
+        if lateness >= self.interval:
+            self.overruns += 1
+        if steps > 1:
+            self.catch_up_steps += steps - 1
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+        self.lateness_ewma += (lateness - self.lateness_ewma) * self.smoothing
+
+    def snapshot(self):
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'catch_up_steps': self.catch_up_steps,
+            'max_lateness_ms': round(self.max_lateness * 1000, 3),
+            'lateness_ewma_ms': round(self.lateness_ewma * 1000, 3),
+        }
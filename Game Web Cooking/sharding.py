@@ -0,0 +1,45 @@
+# sharding.py
+# แบ่งห้องเกมให้ worker หลาย process (แต่ละ worker คือ app.py 1 process ดู tools/run_workers.py)
+#
+# - ห้องแต่ละห้องมี worker เจ้าของคนเดียว: เจ้าของ = room_id_index(room_id) mod จำนวน worker
+#   worker สร้างห้องได้เฉพาะรหัสใน partition ของตัวเอง (RoomIdAllocator) ทุก worker จึงรู้เจ้าของของรหัสใดๆ
+#   จากตัวรหัสเอง โดยไม่ต้องมีตารางกลางหรือถาม worker อื่น
+# - ผู้เล่นทุกคนของห้องเชื่อมต่ออยู่กับ worker เจ้าของ: join_room ที่ส่งไปผิด worker ได้ event `redirect`
+#   พร้อม URL ของเจ้าของ client ต่อใหม่ที่ URL นั้นแล้วส่ง join_room อีกครั้ง (create_room สร้างที่ worker ที่ต่ออยู่)
+# - ตั้งค่าผ่าน env: WORKER_URLS (URL ของทุก worker คั่นด้วย , เรียงตามลำดับ) และ WORKER_INDEX (ลำดับของ worker นี้)
+#   ถ้าไม่ได้ตั้ง WORKER_URLS ถือว่ามี worker เดียว (ทำงานแบบเดิมทุกอย่าง)
+
+from room_ids import ROOM_ID_ALPHABET, room_id_index
+
+
+class WorkerTopology:
+    """รายชื่อ worker ทั้งหมดและลำดับของ worker นี้"""
+    def __init__(self, index=0, urls=(), alphabet=ROOM_ID_ALPHABET):
+        self.urls = tuple(urls)
+        self.count = max(1, len(self.urls))
+        if not 0 <= index < self.count:
+            raise ValueError(f'WORKER_INDEX={index} ต้องอยู่ระหว่าง 0 ถึง {self.count - 1}')
+        self.index = index
+        self.alphabet = alphabet
+
+    @classmethod
+    def from_env(cls, environ):
+        urls = [url.strip().rstrip('/') for url in environ.get('WORKER_URLS', '').split(',') if url.strip()]
+        return cls(int(environ.get('WORKER_INDEX', 0)), urls)
+
+    @property
+    def partition(self):
+        """(ลำดับของ worker, จำนวน worker) สำหรับ RoomIdAllocator"""
+        return (self.index, self.count)
+
+    def owner_of(self, room_id):
+        """ลำดับของ worker เจ้าของห้อง room_id (None ถ้ารหัสไม่ถูกต้อง)"""
+        index = room_id_index(room_id, self.alphabet)
+        return None if index is None else index % self.count
+
+    def redirect_url(self, room_id):
+        """URL ของ worker เจ้าของห้อง ถ้าเจ้าของไม่ใช่ worker นี้ (None = ห้องอยู่ที่นี่ หรือไม่รู้จักรหัส)"""
+        owner = self.owner_of(room_id)
+        if owner is None or owner == self.index:
+            return None
+        return self.urls[owner]
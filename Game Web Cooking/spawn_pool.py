@@ -0,0 +1,66 @@
+# spawn_pool.py
+# ชุดวัตถุดิบที่ห้องจะสุ่มส่งให้ผู้เล่น แบบนับจำนวนการอ้างอิง (reference count)
+#
+# - `add`/`remove`: วัตถุดิบที่เป้าหมายของผู้เล่นต้องใช้ (เรียกเฉพาะตอนเป้าหมายเปลี่ยนหรือผู้เล่นออก)
+# - `hold`/`release`: วัตถุดิบที่อยู่ในจานของผู้เล่นแล้ว ใช้ถ่วงน้ำหนักให้สุ่มได้ของที่ยังไม่มีใครถืออยู่บ่อยขึ้น
+# - รายการสำหรับสุ่มและน้ำหนักสะสมจะถูกสร้างใหม่เฉพาะเมื่อมีการเปลี่ยนแปลง ไม่ใช่ทุกครั้งที่สุ่ม
+
+import itertools
+import random
+
+
+class SpawnPool:
+    """วัตถุดิบที่สุ่มได้ พร้อมจำนวนการอ้างอิงของแต่ละชิ้น"""
+    __slots__ = ('fallback', 'unheld_weight', '_required', '_held', '_items', '_cum_weights')
+
+    def __init__(self, fallback, unheld_weight=1):
+        self.fallback = tuple(fallback) # ใช้สุ่มเมื่อไม่มีใครมีเป้าหมาย
+        self.unheld_weight = unheld_weight # น้ำหนักของวัตถุดิบที่ไม่มีใครถืออยู่ (ของที่ถืออยู่มีน้ำหนัก 1)
+        self._required = {} # {วัตถุดิบ: จำนวนเป้าหมายที่ต้องใช้}
+        self._held = {} # {วัตถุดิบ: จำนวนชิ้นที่อยู่ในจานของผู้เล่น}
+        self._items = None # cache รายการสำหรับสุ่ม (None = ต้องสร้างใหม่)
+        self._cum_weights = None
+
+    @staticmethod
+    def _update(counts, items, delta):
+        for item in items:
+            count = counts.get(item, 0) + delta
+            if count > 0:
+                counts[item] = count
+            else:
+                counts.pop(item, None)
+
+    def add(self, items):
+        self._update(self._required, items, 1)
+        self._items = None
+
+    def remove(self, items):
+        self._update(self._required, items, -1)
+        self._items = None
+
+    def hold(self, items):
+        self._update(self._held, items, 1)
+        self._items = None
+
+    def release(self, items):
+        self._update(self._held, items, -1)
+        self._items = None
+
+    def items(self):
+        """วัตถุดิบที่สุ่มได้ในตอนนี้"""
+        self._rebuild()
+        return self._items
+
+    def _rebuild(self):
+        if self._items is not None:
+            return
+        self._items = tuple(self._required) or self.fallback
+        weights = (1 if item in self._held else self.unheld_weight for item in self._items)
+        self._cum_weights = tuple(itertools.accumulate(weights))
+
+    def sample(self, k, rng=random):
+        """สุ่มวัตถุดิบ k ชิ้น (สุ่มแบบใส่คืน ตามน้ำหนัก) คืนค่ารายการว่างถ้าไม่มีอะไรให้สุ่ม"""
+        self._rebuild()
+        if not self._items:
+            return []
+        return rng.choices(self._items, cum_weights=self._cum_weights, k=k)
@@ -6,6 +6,11 @@
 // 2. ปรับปรุงการจัดการ State: แยกฟังก์ชันการอัปเดตส่วนต่างๆ ของ UI ให้ชัดเจนขึ้น
 //    ทำให้โค้ดอ่านง่ายและลดโอกาสเกิดข้อผิดพลาด
 // 3. เพิ่ม Client-side validation: ตรวจสอบ action ก่อนส่งไป server เพื่อลดข้อผิดพลาดและ network traffic
+// 4. รองรับข้อความแบบย่อ (msgpack + เลข ID) เมื่อโหลด MessagePack ได้ (ดู compact_codec.py) ถ้าไม่ได้จะใช้ JSON แบบเดิม
+// 5. เมื่อ server รันหลาย worker: join_room ที่ไปผิด worker ได้ event `redirect` จะต่อใหม่ที่ worker เจ้าของห้องแล้วเข้าห้องอีกครั้ง
+// 6. โหมดผู้ชม (spectate_room): ดู state ของห้องแบบอ่านอย่างเดียว แสดงจานและเป้าหมายของผู้เล่นทุกคน
+// 7. การเชื่อมต่อหลุด (เช่น server รีสตาร์ทตอน deploy): ต่อใหม่อัตโนมัติแล้วกลับเข้าห้องเดิมด้วย reconnect token (rejoin_room)
+// 8. เล่นด่วน (quick_play): server หาห้องที่รอผู้เล่นอยู่ให้ เกมเริ่มเองเมื่อห้องเต็มหรือรอครบเวลา
 
 const socket = io();
 
@@ -17,6 +22,16 @@ let isHost = false;
 let myAbility = null;
 let myCurrentObjective = null; // เก็บข้อมูล objective ปัจจุบันเพื่อเปรียบเทียบ
 let isAbilityProcessing = false;
+let gameState = null; // state ล่าสุดของห้อง (ประกอบจาก snapshot + patch)
+let stateVersion = 0;
+let isResyncPending = false;
+const supportedCodecs = window.MessagePack ? ['msgpack'] : []; // ส่งไปกับ create_room/join_room
+let compactDictionary = null; // พจนานุกรม ID ของเกมปัจจุบัน (ได้มากับ game_started เมื่อใช้ msgpack)
+let pendingJoin = null; // { event, data } ของ join_room/spectate_room ที่จะส่งอีกครั้งหลังต่อใหม่กับ worker เจ้าของห้อง (event redirect)
+let isSpectator = false;
+let reconnectInfo = null; // { room_id, token } ของห้องที่อยู่ ใช้กลับเข้าห้องเดิมเมื่อการเชื่อมต่อหลุด
+let playerNames = {}; // sid -> ชื่อ จากข้อมูล lobby (ผู้ชมใช้แสดงชื่อเจ้าของจาน)
+let spectatorPlatesKey = null; // จานของทุกคนที่แสดงอยู่ (ผู้ชม) ใช้ตรวจว่าต้องวาดใหม่หรือไม่
 
 // --- Audio ---
 let audioInitialized = false;
@@ -29,6 +44,8 @@ const playerNameInput = document.getElementById('player-name');
 const roomCodeInput = document.getElementById('room-code-input');
 const createBtn = document.getElementById('create-btn');
 const joinBtn = document.getElementById('join-btn');
+const spectateBtn = document.getElementById('spectate-btn');
+const quickPlayBtn = document.getElementById('quick-play-btn');
 const leaveRoomBtn = document.getElementById('leave-room-btn');
 const roomCodeDisplay = document.getElementById('room-code-display');
 const playerList = document.getElementById('player-list');
@@ -287,8 +304,10 @@ function createPlateElement(contents = []) {
 
 // --- Event Listeners ---
 function setupEventListeners() {
-    createBtn.addEventListener('click', () => { initAudio(); playSound('click'); myName = playerNameInput.value.trim(); if (!myName) { showPopup('กรุณาใส่ชื่อของคุณ!'); return; } socket.emit('create_room', { name: myName }); });
-    joinBtn.addEventListener('click', () => { initAudio(); playSound('click'); myName = playerNameInput.value.trim(); const roomId = roomCodeInput.value.trim().toUpperCase(); if (!myName || !roomId) { showPopup('กรุณาใส่ชื่อและรหัสห้อง!'); return; } socket.emit('join_room', { name: myName, room_id: roomId }); });
+    createBtn.addEventListener('click', () => { initAudio(); playSound('click'); isSpectator = false; myName = playerNameInput.value.trim(); if (!myName) { showPopup('กรุณาใส่ชื่อของคุณ!'); return; } socket.emit('create_room', { name: myName, codecs: supportedCodecs }); });
+    joinBtn.addEventListener('click', () => { initAudio(); playSound('click'); isSpectator = false; myName = playerNameInput.value.trim(); const roomId = roomCodeInput.value.trim().toUpperCase(); if (!myName || !roomId) { showPopup('กรุณาใส่ชื่อและรหัสห้อง!'); return; } socket.emit('join_room', { name: myName, room_id: roomId, codecs: supportedCodecs }); });
+    quickPlayBtn.addEventListener('click', () => { initAudio(); playSound('click'); isSpectator = false; myName = playerNameInput.value.trim(); if (!myName) { showPopup('กรุณาใส่ชื่อของคุณ!'); return; } socket.emit('quick_play', { name: myName, codecs: supportedCodecs }); });
+    spectateBtn.addEventListener('click', () => { initAudio(); playSound('click'); const roomId = roomCodeInput.value.trim().toUpperCase(); if (!roomId) { showPopup('กรุณาใส่รหัสห้อง!'); return; } isSpectator = true; socket.emit('spectate_room', { room_id: roomId }); });
     leaveRoomBtn.addEventListener('click', () => { playSound('click'); location.reload(); });
     roomCodeDisplay.addEventListener('click', () => { if(currentRoomId) navigator.clipboard.writeText(currentRoomId).then(() => { showToast('คัดลอกรหัสห้องแล้ว!', 'success'); playSound('click'); }); });
     startGameBtn.addEventListener('click', () => { playSound('levelUp'); socket.emit('start_game', { room_id: currentRoomId }); });
@@ -392,8 +411,43 @@ function updateAbilityStationUI(myState) {
     }
 }
 
+function updateSpectatorUI(state) {
+    // เป้าหมายของทุกคน
+    const objectivesKey = JSON.stringify(state.all_player_objectives || []);
+    if (objectivesKey !== myCurrentObjective) {
+        myCurrentObjective = objectivesKey;
+        objectivesListEl.innerHTML = '';
+        (state.all_player_objectives || []).forEach(obj => {
+            const li = document.createElement('li');
+            li.className = 'bg-green-100 dark:bg-green-900/50 p-2 rounded-lg shadow-sm border-l-4 border-green-500 dark:border-green-400';
+            li.innerHTML = `<div class="text-xs text-gray-500 dark:text-gray-400"></div><div class="font-bold text-green-800 dark:text-green-200"></div><div class="text-xl"></div>`;
+            li.children[0].textContent = `${obj.player_name} (${obj.points} คะแนน)`;
+            li.children[1].textContent = obj.objective_name;
+            li.children[2].textContent = obj.ingredients.map(ing => ing.name).join(' ');
+            objectivesListEl.appendChild(li);
+        });
+    }
+
+    // จานของทุกคน ตามลำดับที่นั่ง
+    const sids = state.player_order_sids.filter(sid => state.players_state[sid]);
+    const platesKey = JSON.stringify(sids.map(sid => [playerNames[sid], state.players_state[sid].plate]));
+    if (platesKey === spectatorPlatesKey) return;
+    spectatorPlatesKey = platesKey;
+    plateContainer.innerHTML = '';
+    sids.forEach(sid => {
+        const plate = createPlateElement(state.players_state[sid].plate);
+        plate.firstChild.textContent = playerNames[sid] || 'ผู้เล่น';
+        plateContainer.appendChild(plate);
+    });
+}
+
 function updateGameStateUI(state) {
     if (!state || screens.game.classList.contains('hidden')) return;
+    if (isSpectator) {
+        updateGlobalUI(state);
+        updateSpectatorUI(state);
+        return;
+    }
 
     const myState = state.players_state ? state.players_state[mySid] : null;
 
@@ -405,39 +459,248 @@ function updateGameStateUI(state) {
     }
 }
 
+// --- Versioned State (snapshot + patch) ---
+function applyStateSnapshot(state) {
+    if (!state) return;
+    if (compactDictionary) state.all_player_objectives = buildCompactObjectives(state.players_state);
+    gameState = state;
+    stateVersion = state.version;
+    isResyncPending = false;
+    updateGameStateUI(gameState);
+}
+
+function applyStatePatch(patch) {
+    if (!gameState || patch.base_version !== stateVersion) {
+        // patch ไม่ต่อเนื่องกับ state ที่มี ขอ snapshot ใหม่จาก server
+        if (!isResyncPending && currentRoomId) {
+            isResyncPending = true;
+            socket.emit('request_state_sync', { room_id: currentRoomId });
+        }
+        return;
+    }
+    if (patch.fields) Object.assign(gameState, patch.fields);
+    if (patch.players || patch.removed_players) {
+        const playersState = { ...gameState.players_state, ...(patch.players || {}) };
+        (patch.removed_players || []).forEach(sid => delete playersState[sid]);
+        gameState.players_state = playersState;
+        if (compactDictionary) gameState.all_player_objectives = buildCompactObjectives(playersState);
+    }
+    stateVersion = patch.version;
+    updateGameStateUI(gameState);
+}
+
+// --- ข้อความแบบย่อ (msgpack) ---
+// ลำดับในตารางคือเลข ID ที่ server ส่งมา ต้องตรงกับ EVENTS/STATE_FIELDS/PATCH_KEYS ใน compact_codec.py
+const COMPACT_EVENTS = ['update_game_state', 'state_patch', 'receive_item', 'game_started', 'start_next_level',
+    'action_success', 'action_fail', 'level_complete', 'game_won', 'game_over', 'clear_all_items', 'update_neighbors'];
+const COMPACT_STATE_FIELDS = ['version', 'is_active', 'level', 'score', 'total_score', 'target_score', 'time_left',
+    'player_order_sids', 'players_state'];
+const COMPACT_PATCH_KEYS = ['fields', 'players', 'removed_players', 'base_version', 'version'];
+
+// ค่าที่เป็นตัวเลขคือ index ในตาราง ค่าอื่น (ข้อความ) server ส่งมาตามเดิมเพราะไม่มีในตาราง
+const fromTable = (table, value) => typeof value === 'number' ? table[value] : value;
+const compactItem = (id) => fromTable(compactDictionary.items, id);
+const compactSid = (seat) => typeof seat === 'number' ? compactDictionary.seats[seat][0] : seat;
+
+function decodeCompactPlayers(players) {
+    const decoded = {};
+    Object.entries(players).forEach(([seat, [plate, objective, ability, processing]]) => {
+        decoded[compactSid(Number(seat))] = {
+            plate: plate.map(compactItem),
+            objective: objective === null ? null : { name: typeof objective === 'number' ? compactDictionary.recipes[objective][0] : objective },
+            ability: ability === null ? null : fromTable(compactDictionary.abilities, ability),
+            ability_processing: processing ? { input: compactItem(processing[0]), output: compactItem(processing[1]), end_time: processing[2] } : null,
+        };
+    });
+    return decoded;
+}
+
+function decodeCompactState(compact) {
+    const state = {};
+    Object.entries(compact).forEach(([fieldId, value]) => {
+        const field = COMPACT_STATE_FIELDS[fieldId];
+        if (field === 'player_order_sids') value = value.map(compactSid);
+        else if (field === 'players_state') value = decodeCompactPlayers(value);
+        state[field] = value;
+    });
+    return state;
+}
+
+function decodeCompactPatch(compact) {
+    const patch = {};
+    Object.entries(compact).forEach(([keyId, value]) => {
+        const key = COMPACT_PATCH_KEYS[keyId];
+        if (key === 'fields') value = decodeCompactState(value);
+        else if (key === 'players') value = decodeCompactPlayers(value);
+        else if (key === 'removed_players') value = value.map(compactSid);
+        patch[key] = value;
+    });
+    return patch;
+}
+
+// all_player_objectives ไม่ถูกส่งมาในแบบย่อ สร้างจาก objective ของแต่ละที่นั่งและตารางเมนู (ลำดับเดียวกับ server)
+function buildCompactObjectives(playersState) {
+    const objectives = [];
+    compactDictionary.seats.forEach(([sid, name]) => {
+        const objective = playersState?.[sid]?.objective;
+        const recipe = objective && compactDictionary.recipes.find(r => r[0] === objective.name);
+        if (!recipe) return;
+        objectives.push({
+            player_name: name,
+            objective_name: recipe[0],
+            ingredients: recipe[2].map(([item, hint, base]) => ({
+                name: compactItem(item),
+                hint: hint === null ? null : compactDictionary.abilities[hint],
+                base: base === null ? null : compactItem(base),
+            })),
+            points: recipe[1],
+        });
+    });
+    return objectives;
+}
+
+function decodeCompactMessage(event, data) {
+    switch (event) {
+        case 'game_started':
+            compactDictionary = data.dictionary;
+            return { ...data, initial_state: decodeCompactState(data.initial_state) };
+        case 'update_game_state':
+        case 'start_next_level':
+            return decodeCompactState(data);
+        case 'state_patch':
+            return decodeCompactPatch(data);
+        case 'receive_item':
+            return typeof data === 'number' ? { item: { type: 'ingredient', name: compactItem(data) } } : data;
+        default:
+            return data;
+    }
+}
+
 // --- Socket.IO Handlers ---
+// server รวมข้อความหลายรายการที่ส่งถึงเราใน tick/action เดียวกันเป็น event `bundle` ([[event, data], ...])
+// จึงเก็บ handler ไว้ในตารางเพื่อเรียกทีละข้อความตามลำดับ เหมือนได้รับแยกกัน
+function renderLobby(data) {
+    playerNames = {};
+    playerList.innerHTML = '';
+    data.players.forEach(p => {
+        playerNames[p.sid] = p.name;
+        const li = document.createElement('li');
+        li.className = 'text-[var(--text-primary)]';
+        li.textContent = p.name;
+        if (p.sid === data.host_sid) li.innerHTML += ' <span class="player-tag bg-yellow-400 text-yellow-900">Host</span>';
+        if (p.sid === mySid) li.innerHTML += ' <span class="player-tag bg-blue-400 text-white">You</span>';
+        playerList.appendChild(li);
+    });
+    isHost = (mySid === data.host_sid);
+    startGameBtn.classList.toggle('hidden', !(isHost && data.players.length >= 1));
+}
+
+const serverEventHandlers = {};
+function onServerEvent(event, handler) {
+    serverEventHandlers[event] = handler;
+    socket.on(event, handler);
+}
+
 function setupSocketListeners() {
-    socket.on('connect', () => { mySid = socket.id; showScreen('login'); });
-    socket.on('disconnect', () => { showPopup('การเชื่อมต่อหลุด!'); showScreen('login'); setTimeout(() => location.reload(), 2000); });
-    socket.on('room_created', (data) => { currentRoomId = data.room_id; isHost = data.is_host; roomCodeDisplay.textContent = currentRoomId; showScreen('lobby'); });
-    socket.on('join_success', (data) => { currentRoomId = data.room_id; isHost = data.is_host; roomCodeDisplay.textContent = currentRoomId; showScreen('lobby'); });
-    socket.on('update_lobby', (data) => {
-        if (screens.lobby.classList.contains('hidden') || currentRoomId !== data.room_id) return;
-        playerList.innerHTML = '';
-        data.players.forEach(p => {
-            const li = document.createElement('li');
-            li.className = 'text-[var(--text-primary)]';
-            li.textContent = p.name;
-            if (p.sid === data.host_sid) li.innerHTML += ' <span class="player-tag bg-yellow-400 text-yellow-900">Host</span>';
-            if (p.sid === mySid) li.innerHTML += ' <span class="player-tag bg-blue-400 text-white">You</span>';
-            playerList.appendChild(li);
+    socket.on('connect', () => {
+        mySid = socket.id;
+        if (pendingJoin) { socket.emit(pendingJoin.event, pendingJoin.data); pendingJoin = null; return; }
+        showScreen('login');
+    });
+    socket.on('redirect', (data) => {
+        // ห้องอยู่ที่ worker อื่น: เปลี่ยน URL ของการเชื่อมต่อแล้วต่อใหม่ (handler ทั้งหมดยังผูกกับ socket เดิม)
+        if (reconnectInfo && reconnectInfo.room_id === data.room_id) pendingJoin = { event: 'rejoin_room', data: reconnectInfo };
+        else pendingJoin = isSpectator
+            ? { event: 'spectate_room', data: { room_id: data.room_id } }
+            : { event: 'join_room', data: { name: myName, room_id: data.room_id, codecs: supportedCodecs } };
+        socket.io.uri = data.url;
+        socket.disconnect();
+        socket.connect();
+    });
+    socket.on('bundle', (messages) => {
+        messages.forEach(([event, data]) => {
+            const handler = serverEventHandlers[event];
+            if (handler) handler(data);
         });
-        isHost = (mySid === data.host_sid);
-        startGameBtn.classList.toggle('hidden', !(isHost && data.players.length >= 1));
     });
-    socket.on('new_host', (data) => { isHost = (mySid === data.host_sid); if (isHost) showToast('คุณได้รับตำแหน่ง Host!', 'info'); });
-    socket.on('error_message', (data) => { showPopup(data.message); playSound('error'); });
-    socket.on('game_started', (data) => {
+    socket.on('packed', (buffer) => {
+        MessagePack.decode(buffer).forEach(([eventId, data]) => {
+            const event = fromTable(COMPACT_EVENTS, eventId);
+            const handler = serverEventHandlers[event];
+            if (handler) handler(decodeCompactMessage(event, data));
+        });
+    });
+    socket.on('disconnect', () => {
+        if (pendingJoin) return;
+        const roomId = currentRoomId;
+        if (reconnectInfo || (isSpectator && roomId)) {
+            // socket.io ต่อใหม่เอง: ส่ง rejoin_room/spectate_room ตอน connect ระหว่างนี้ไม่ใช้ข้อความของห้อง
+            pendingJoin = reconnectInfo ? { event: 'rejoin_room', data: reconnectInfo } : { event: 'spectate_room', data: { room_id: roomId } };
+            currentRoomId = null;
+            gameState = null;
+            showToast('การเชื่อมต่อหลุด กำลังกลับเข้าห้อง...', 'info');
+            return;
+        }
+        showPopup('การเชื่อมต่อหลุด!'); showScreen('login'); setTimeout(() => location.reload(), 2000);
+    });
+    onServerEvent('room_created', (data) => { currentRoomId = data.room_id; isHost = data.is_host; reconnectInfo = { room_id: data.room_id, token: data.reconnect_token }; roomCodeDisplay.textContent = currentRoomId; showScreen('lobby'); });
+    onServerEvent('join_success', (data) => {
+        currentRoomId = data.room_id; isHost = data.is_host; reconnectInfo = { room_id: data.room_id, token: data.reconnect_token }; roomCodeDisplay.textContent = currentRoomId; showScreen('lobby');
+        if (data.quick_play) showToast('กำลังรอผู้เล่นอื่น เกมจะเริ่มเองเมื่อห้องเต็ม', 'info');
+    });
+    onServerEvent('rejoin_success', (data) => {
+        currentRoomId = data.room_id;
+        reconnectInfo = { room_id: data.room_id, token: data.reconnect_token };
+        roomCodeDisplay.textContent = currentRoomId;
+        const game = data.game;
+        if (game) {
+            mySid = game.your_sid;
+            if (game.dictionary) compactDictionary = game.dictionary;
+            passLeftNameEl.textContent = game.left_neighbor;
+            passRightNameEl.textContent = game.right_neighbor;
+            myNameEl.textContent = game.your_name;
+            showScreen('game'); // snapshot ตามมาใน update_game_state
+        } else {
+            showScreen('lobby');
+        }
+        renderLobby(data.lobby);
+        showToast('กลับเข้าห้องแล้ว!', 'success');
+    });
+    onServerEvent('rejoin_failed', (data) => { reconnectInfo = null; showPopup(data.message); showScreen('login'); });
+    onServerEvent('server_restarting', (data) => { if (currentRoomId) showToast(data.message, 'info'); });
+    onServerEvent('spectate_success', (data) => {
+        currentRoomId = data.room_id;
+        isHost = false;
+        roomCodeDisplay.textContent = currentRoomId;
+        document.body.classList.add('spectating');
+        myNameEl.textContent = 'ทุกคน';
+        renderLobby(data.lobby);
+        if (data.state) { showScreen('game'); applyStateSnapshot(data.state); }
+        else showScreen('lobby');
+    });
+    onServerEvent('update_lobby', (data) => {
+        if (currentRoomId !== data.room_id) return;
+        renderLobby(data);
+    });
+    onServerEvent('new_host', (data) => { isHost = (mySid === data.host_sid); if (isHost) showToast('คุณได้รับตำแหน่ง Host!', 'info'); });
+    onServerEvent('error_message', (data) => { showPopup(data.message); playSound('error'); });
+    onServerEvent('room_closed', (data) => { currentRoomId = null; reconnectInfo = null; showPopup(data.message); showScreen('login'); });
+    onServerEvent('game_started', (data) => {
         showScreen('game');
         mySid = data.your_sid;
         passLeftNameEl.textContent = data.left_neighbor;
         passRightNameEl.textContent = data.right_neighbor;
         myNameEl.textContent = data.your_name;
-        updateGameStateUI(data.initial_state);
+        applyStateSnapshot(data.initial_state);
+    });
+    onServerEvent('update_game_state', (state) => {
+        // ผู้ชมได้ snapshot นี้ตอนเกมใหม่เริ่ม (ผู้เล่นได้ game_started แทน)
+        if (isSpectator && screens['level-complete'].classList.contains('hidden')) showScreen('game');
+        applyStateSnapshot(state);
     });
-    socket.on('update_game_state', updateGameStateUI);
-    socket.on('update_neighbors', (data) => { passLeftNameEl.textContent = data.left_neighbor; passRightNameEl.textContent = data.right_neighbor; });
-    socket.on('receive_item', (data) => {
+    onServerEvent('state_patch', applyStatePatch);
+    onServerEvent('update_neighbors', (data) => { passLeftNameEl.textContent = data.left_neighbor; passRightNameEl.textContent = data.right_neighbor; });
+    onServerEvent('receive_item', (data) => {
         playSound('receive');
         const placeholder = conveyorBelt.querySelector('span');
         if (placeholder) placeholder.remove();
@@ -445,13 +708,13 @@ function setupSocketListeners() {
             conveyorBelt.appendChild(createItemElement(data.item.name));
         }
     });
-    socket.on('action_success', (data) => { showToast(data.message, 'success'); if (data.sound) playSound(data.sound); });
-    socket.on('action_fail', (data) => { showToast(data.message, 'error'); if (data.sound) playSound(data.sound); });
-    socket.on('clear_all_items', () => { conveyorBelt.innerHTML = '<span class="text-[var(--text-secondary)] flex-shrink-0">วัตถุดิบที่ได้รับ...</span>'; });
-    socket.on('level_complete', (data) => { playSound('levelUp'); levelCompleteMessageEl.textContent = `คะแนนในด่าน ${data.level}: ${data.level_score}`; totalScoreMessageEl.textContent = `คะแนนรวม: ${data.total_score}`; showScreen('level-complete'); });
-    socket.on('start_next_level', (data) => { showScreen('game'); updateGameStateUI(data); });
-    socket.on('game_over', (data) => { playSound('gameOver'); finalTotalScoreEl.textContent = data.total_score; gameOverMessageEl.textContent = data.message || ''; gameOverMessageEl.classList.toggle('hidden', !data.message); showScreen('game-over'); });
-    socket.on('game_won', (data) => { playSound('levelUp'); finalWonScoreEl.textContent = data.total_score; showScreen('game-won'); });
+    onServerEvent('action_success', (data) => { showToast(data.message, 'success'); if (data.sound) playSound(data.sound); });
+    onServerEvent('action_fail', (data) => { showToast(data.message, 'error'); if (data.sound) playSound(data.sound); });
+    onServerEvent('clear_all_items', () => { conveyorBelt.innerHTML = '<span class="text-[var(--text-secondary)] flex-shrink-0">วัตถุดิบที่ได้รับ...</span>'; });
+    onServerEvent('level_complete', (data) => { playSound('levelUp'); levelCompleteMessageEl.textContent = `คะแนนในด่าน ${data.level}: ${data.level_score}`; totalScoreMessageEl.textContent = `คะแนนรวม: ${data.total_score}`; showScreen('level-complete'); });
+    onServerEvent('start_next_level', (data) => { showScreen('game'); applyStateSnapshot(data); });
+    onServerEvent('game_over', (data) => { playSound('gameOver'); finalTotalScoreEl.textContent = data.total_score; gameOverMessageEl.textContent = data.message || ''; gameOverMessageEl.classList.toggle('hidden', !data.message); showScreen('game-over'); });
+    onServerEvent('game_won', (data) => { playSound('levelUp'); finalWonScoreEl.textContent = data.total_score; showScreen('game-won'); });
 }
 
 // --- Initial Setup on Load ---
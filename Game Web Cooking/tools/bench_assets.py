@@ -0,0 +1,61 @@
+# bench_assets.py
+# เทียบการส่งไฟล์หน้าเว็บแบบเดิม (/static/ ของ Flask) กับไฟล์ที่ build แล้ว (/assets/ ของ assets.py) ด้วย test client ของ app.py
+#
+# - วัดเวลา CPU ต่อ request ใน process ของเกม และจำนวน byte ที่ส่งจริงตาม Accept-Encoding ของ browser
+# - นับ request ต่อการเปิดหน้า: แบบเดิมไม่มี Cache-Control browser จึงถามซ้ำ (If-Modified-Since) ทุกครั้งที่เปิดหน้า
+#   แบบ immutable ถูก cache จนกว่า deploy ครั้งถัดไปเปลี่ยนชื่อไฟล์
+#
+# ต้อง build ก่อน: python tools/build_assets.py
+# วิธีใช้:  python tools/bench_assets.py [--requests 2000]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def measure(client, path, headers, count):
+    """คืนค่า (µs ต่อ request, byte ของ body, header ของ response)"""
+    response = client.get(path, headers=headers)
+    body_bytes = len(response.get_data())
+    started = time.process_time()
+    for _ in range(count):
+        client.get(path, headers=headers).close()
+    return (time.process_time() - started) / count * 1e6, body_bytes, response.headers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    manifest = app.asset_manifest
+    if not manifest:
+        raise SystemExit('ยังไม่ได้ build: python tools/build_assets.py')
+    client = app.app.test_client()
+    cases = [
+        ('/static/ (เดิม)', lambda name: f'/static/{name}', {'Accept-Encoding': 'gzip, deflate, br'}),
+        ('/assets/ identity', lambda name: manifest.url_for(name, None), {}),
+        ('/assets/ gzip', lambda name: manifest.url_for(name, None), {'Accept-Encoding': 'gzip, deflate'}),
+        ('/assets/ br', lambda name: manifest.url_for(name, None), {'Accept-Encoding': 'gzip, deflate, br'}),
+    ]
+    print(f'{args.requests:,} request ต่อกรณี (CPU ของ process ที่ส่งไฟล์)')
+    for name in manifest.by_name:
+        print(name)
+        for label, path_for, headers in cases:
+            us, size, response_headers = measure(client, path_for(name), headers, args.requests)
+            print(f"  {label:18s} {us:6.0f} µs/request {size:7,} byte"
+                  f" | Content-Encoding: {response_headers.get('Content-Encoding', '-'):8s}"
+                  f" Cache-Control: {response_headers.get('Cache-Control', '-')}")
+        path = path_for(name)
+        etag = client.get(path).headers['ETag'].strip('"')
+        us, _, _ = measure(client, path, {'If-None-Match': f'"{etag}"'}, args.requests)
+        print(f"  {'/assets/ 304':18s} {us:6.0f} µs/request (If-None-Match)")
+
+
+if __name__ == '__main__':
+    main()
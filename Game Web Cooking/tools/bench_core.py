@@ -0,0 +1,129 @@
+# bench_core.py
+# วัดต้นทุนของตรรกะเกม (game.py) โดยไม่มี Socket.IO
+#
+# 1. ต้นทุนต่อครั้งของ handle_player_action (add_to_plate / pass_item / submit_order), use_ability
+#    และ update ของห้อง (tick ของนาฬิกาเกม + สุ่มวัตถุดิบ) ในห้อง 8 คน ข้อความขาออกส่งเข้า sink ที่ไม่ทำอะไร
+# 2. จำนวนห้องที่ 1 core รับได้ จากการจำลองห้องพร้อมบอท (tools/simulate.py) ด้วยนาฬิกาจำลอง
+#
+# วิธีใช้:  python tools/bench_core.py [--players 8] [--iterations 20000] [--rooms 200] [--seconds 300] [--no-metrics]
+#          --no-metrics ปิดตัววัดของห้อง (metrics.py) เหมือน env METRICS=0 ใช้เทียบต้นทุนของการวัด
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game  # noqa: E402
+from scheduler import DeadlineScheduler  # noqa: E402
+from simulate import Simulation  # noqa: E402
+
+
+def null_sink(event, data, to, skip_sid):
+    pass
+
+
+def build_room(num_players, clock):
+    """ห้องที่เริ่มเล่นแล้ว (PLAYING) ใช้นาฬิกาจำลอง clock[0]"""
+    scheduler = DeadlineScheduler(clock=lambda: clock[0])
+    room = game.GameRoom('BNCH', 'sid-0', 'ผู้เล่น 0', scheduler, null_sink, rng=random.Random(1), wall_clock=lambda: clock[0])
+    for i in range(1, num_players):
+        room.add_player(f'sid-{i}', f'ผู้เล่น {i}')
+    room.start_game()
+    clock[0] += game.LEVEL_START_DELAY
+    scheduler.run_due()
+    room.game_state.time_left = 10 ** 9
+    return room
+
+
+def measure(iterations, clock, step, prepare, call):
+    """เวลาเฉลี่ยต่อครั้งของ call() (µs) เดินนาฬิกาจำลองครั้งละ step วินาที (ไม่ติดการจำกัดความถี่ของ action)"""
+    total = 0.0
+    for i in range(iterations):
+        clock[0] += step
+        prepare(i)
+        start = time.perf_counter()
+        call(i)
+        total += time.perf_counter() - start
+    return total / iterations * 1e6
+
+
+def bench_actions(num_players, iterations):
+    clock = [0.0]
+    room = build_room(num_players, clock)
+    sid = room.game_state.player_order_sids[0]
+    player = room.players[sid]
+    ingredient = room.game_state.spawn_pool.items()[0]
+    step = 1 / game.ACTION_RATE
+    no_prepare = lambda i: None  # noqa: E731
+    results = {}
+
+    results['handle_player_action: add_to_plate'] = measure(
+        iterations, clock, step, no_prepare,
+        lambda i: room.handle_player_action(sid, {'type': 'add_to_plate', 'new_plate_contents': [ingredient] * (i % 3)}))
+    results['handle_player_action: pass_item'] = measure(
+        iterations, clock, step, no_prepare,
+        lambda i: room.handle_player_action(sid, {'type': 'pass_item', 'direction': 'left', 'item': {'type': 'ingredient', 'name': ingredient}}))
+
+    def prepare_submit(i):
+        # สลับส่งสำเร็จ/ไม่สำเร็จ (ส่งสำเร็จจะสุ่มเป้าหมายใหม่ให้ทุกคน) คะแนนเป้าหมายสูงมากจึงไม่ผ่านด่าน
+        room.game_state.target_score = 10 ** 9
+        required = game.RECIPES[player.objective]['ingredients']
+        room._set_plate(player, list(required) if i % 2 == 0 else [])
+    results['handle_player_action: submit_order'] = measure(
+        iterations, clock, step, prepare_submit,
+        lambda i: room.handle_player_action(sid, {'type': 'submit_order'}))
+
+    ability_player = next(p for p in room.players.values() if p.ability)
+    ability_input = next(iter(game.ABILITIES_CONFIG[ability_player.ability]['transformations']))
+
+    def prepare_ability(i):
+        ability_player.ability_processing = None
+    results['use_ability'] = measure(
+        iterations, clock, step, prepare_ability,
+        lambda i: room.use_ability(ability_player.sid, ability_input))
+
+    # update: timer ของห้องใน 1 วินาที (tick ของนาฬิกาเกม + สุ่มวัตถุดิบทุก spawn_interval)
+    # เรียกผ่าน scheduler แบบเดียวกับ server จริง รวมการ flush outbox
+    room.game_state.time_left = 10 ** 9 # submit_order จำกัดเวลาไว้ที่ 999
+    room.scheduler.run_due()
+    results['update (ต่อ 1 วินาทีของเกม)'] = measure(
+        iterations, clock, game.TICK_INTERVAL, no_prepare, lambda i: room.scheduler.run_due())
+    return results
+
+
+def bench_rooms(num_rooms, players_per_room, seconds):
+    sim = Simulation(num_rooms, players_per_room)
+    sim.start()
+    cpu_start = time.process_time()
+    sim.run(seconds)
+    cpu = time.process_time() - cpu_start
+    return cpu, sum(sim.actions.values())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=300)
+    parser.add_argument('--no-metrics', action='store_true')
+    args = parser.parse_args()
+    game.server_metrics.enabled = not args.no_metrics
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # ไม่แสดง log ของห้อง
+        results = bench_actions(args.players, args.iterations)
+        cpu, actions = bench_rooms(args.rooms, 4, args.seconds)
+
+    print(f'ต้นทุนต่อครั้ง (ห้อง {args.players} คน)')
+    for name, micros in results.items():
+        print(f'  {name:<40} {micros:8.1f} µs')
+    print(f'จำลอง {args.rooms} ห้อง x 4 บอท เป็นเวลา {args.seconds:g} วินาที: CPU {cpu:.2f} วินาที, {actions:,} action')
+    print(f'  ห้องต่อ 1 core : {args.rooms * args.seconds / cpu:,.0f} ห้อง')
+
+
+if __name__ == '__main__':
+    main()
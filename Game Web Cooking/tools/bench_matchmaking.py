@@ -0,0 +1,175 @@
+# bench_matchmaking.py
+# จำลองผู้เล่นกด "เล่นด่วน" จำนวนมาก (matchmaking.py) ด้วยนาฬิกาจำลอง แล้ววัดเวลาหาห้องต่อผู้เล่นแยกตามนาที
+#
+# - ผู้เล่นมาถึงแบบสุ่ม (Poisson) ตามอัตราที่กำหนด บางคนออกก่อนเกมเริ่ม (--leave) ห้องถูกสร้าง/เข้าร่วมผ่าน
+#   RoomRegistry และ GameRoom จริงด้วยขั้นตอนเดียวกับ handle_quick_play/_quick_play_timeout ของ app.py
+# - ห้องที่เริ่มเกมแล้วถูกปิดทันที (วัดเฉพาะการจับคู่ ไม่จำลองตัวเกม) ห้องจึงหมุนเวียนและรหัสห้องถูกใช้ซ้ำเหมือน server ที่รันนาน
+# - รายงานต่อนาที: ผู้เล่น, เวลาหาห้อง (p50/p99/max ของเวลาจริง), ห้องที่รออยู่, เวลารอเกมเริ่ม (เวลาจำลอง)
+#   และจำนวนผู้เล่นต่อห้องที่เริ่มเกม เวลาหาห้องควรคงที่ไม่ว่าจะเล่นมานานหรือมีผู้เล่นมากแค่ไหน
+# - --backlog N: เริ่มด้วยห้องที่รอผู้เล่นอยู่แล้ว N ห้อง (ห้องละ 1-7 คน) เพื่อดูว่าเวลาหาห้องไม่ขึ้นกับขนาดของดัชนี
+#
+# วิธีใช้:  python tools/bench_matchmaking.py [--rate 10000] [--minutes 5] [--leave 0.05] [--backlog 0] [--seed 1]
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game  # noqa: E402
+from matchmaking import QUICK_PLAY_MAX_WAIT, Matchmaker  # noqa: E402
+from metrics import QuickPlayStats  # noqa: E402
+from room_registry import RoomRegistry  # noqa: E402
+from scheduler import DeadlineScheduler  # noqa: E402
+
+
+class QuickPlaySimulation:
+    """ผู้เล่น quick play ที่มาถึงตามอัตราคงที่ (ต่อนาที)"""
+    def __init__(self, rate_per_minute, leave_chance, seed):
+        self.now = 0.0
+        self.scheduler = DeadlineScheduler(clock=lambda: self.now)
+        self.room_scheduler = DeadlineScheduler(clock=lambda: self.now) # timer ของตัวเกม (ไม่ถูกเรียก ห้องปิดทันทีที่เริ่ม)
+        self.rooms = RoomRegistry()
+        self.stats = QuickPlayStats()
+        self.matchmaker = Matchmaker(game.MAX_PLAYERS, self.scheduler.clock, self.stats)
+        self.rng = random.Random(seed)
+        self.rate = rate_per_minute / 60
+        self.leave_chance = leave_chance
+        self.next_sid = 0
+        self.minute = None
+
+    def sink(self, event, data, to, skip_sid):
+        pass
+
+    def new_minute(self):
+        self.minute = {'players': 0, 'place': [], 'started': 0, 'started_players': 0, 'wait_sum': 0.0,
+                       'wait_count': 0, 'left': 0}
+        return self.minute
+
+    def arrive(self):
+        sid = f'p{self.next_sid}'
+        self.next_sid += 1
+        self.minute['players'] += 1
+
+        def join(room):
+            if self.rooms.get(room.id) is not room or room.phase != game.RoomPhase.LOBBY:
+                return False
+            return room.add_player(sid, 'ผู้เล่น', game.CODEC_JSON)
+
+        def create():
+            room = self.rooms.create_room(
+                lambda room_id: game.GameRoom(room_id, sid, 'ผู้เล่น', self.room_scheduler, self.sink), sid)
+            self.scheduler.call_later(QUICK_PLAY_MAX_WAIT, self.timeout, room)
+            return room
+
+        started = time.perf_counter()
+        room, full = self.matchmaker.place(sid, join, create)
+        self.rooms.bind_sid(sid, room)
+        self.minute['place'].append(time.perf_counter() - started)
+        if full:
+            self.start(room, timeout=False)
+        elif self.rng.random() < self.leave_chance:
+            self.scheduler.call_later(self.rng.uniform(0, QUICK_PLAY_MAX_WAIT), self.leave, sid)
+        self.scheduler.call_later(self.rng.expovariate(self.rate), self.arrive)
+
+    def fill_backlog(self, rooms):
+        """สร้างห้องที่รอผู้เล่นอยู่แล้ว rooms ห้อง ห้องละ 1 ถึง MAX_PLAYERS - 1 คน (เหมือนห้องที่สร้างผ่าน place)"""
+        for _ in range(rooms):
+            sids = [f'p{self.next_sid + i}' for i in range(self.rng.randrange(1, game.MAX_PLAYERS))]
+            self.next_sid += len(sids)
+            room = self.rooms.create_room(
+                lambda room_id: game.GameRoom(room_id, sids[0], 'ผู้เล่น', self.room_scheduler, self.sink), sids[0])
+            for sid in sids[1:]:
+                room.add_player(sid, 'ผู้เล่น', game.CODEC_JSON)
+                self.rooms.bind_sid(sid, room)
+            self.matchmaker.index.update(room, game.MAX_PLAYERS - len(room.players))
+            self.scheduler.call_later(QUICK_PLAY_MAX_WAIT, self.timeout, room)
+
+    def leave(self, sid):
+        room = self.rooms.pop_sid(sid)
+        if room is None or room.phase != game.RoomPhase.LOBBY:
+            return # เกมเริ่มไปแล้ว (ห้องถูกปิด)
+        self.minute['left'] += 1
+        if room.remove_player(sid) == 'delete_room':
+            self.rooms.remove_room(room.id)
+            self.matchmaker.room_closed(room)
+        else:
+            self.matchmaker.left(sid, room)
+
+    def timeout(self, room):
+        if not self.matchmaker.is_waiting(room):
+            return
+        if self.matchmaker.ready_to_start(room):
+            self.start(room, timeout=True)
+        else:
+            self.scheduler.call_later(QUICK_PLAY_MAX_WAIT, self.timeout, room)
+
+    def start(self, room, timeout):
+        wait = self.stats.wait_seconds
+        count, total = wait.count, wait.sum
+        self.matchmaker.room_started(room, timeout=timeout)
+        room.start_game()
+        self.minute['started'] += 1
+        self.minute['started_players'] += len(room.players)
+        self.minute['wait_count'] += wait.count - count
+        self.minute['wait_sum'] += wait.sum - total
+        room.close() # วัดเฉพาะการจับคู่: ปิดห้องทันที
+        self.rooms.remove_room(room.id, reason='started')
+        for sid in list(room.players):
+            self.rooms.unbind_sid(sid, room)
+
+    def run(self, seconds):
+        end = self.now + seconds
+        while True:
+            deadline = self.scheduler.next_deadline()
+            if deadline is None or deadline > end:
+                break
+            self.now = max(self.now, deadline)
+            self.scheduler.run_due(self.now)
+        self.now = end
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rate', type=float, default=10000, help='ผู้เล่นที่กดเล่นด่วนต่อนาที')
+    parser.add_argument('--minutes', type=int, default=5)
+    parser.add_argument('--leave', type=float, default=0.05, help='โอกาสที่ผู้เล่นออกก่อนเกมเริ่ม')
+    parser.add_argument('--backlog', type=int, default=0, help='ห้องที่รอผู้เล่นอยู่แล้วตอนเริ่ม')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    sim = QuickPlaySimulation(args.rate, args.leave, args.seed)
+    sim.new_minute()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        sim.fill_backlog(args.backlog)
+    sim.scheduler.call_later(0, sim.arrive)
+    print(f'quick play {args.rate:,.0f} ผู้เล่น/นาที, ออกก่อนเกมเริ่ม {args.leave:.0%}, ห้องละ {game.MAX_PLAYERS} คน, '
+          f'เริ่มเองหลังรอ {QUICK_PLAY_MAX_WAIT} วินาที, ห้องที่รออยู่ตอนเริ่ม {args.backlog:,}')
+    print(' นาที | ผู้เล่น | หาห้อง p50 | p99 | max | ห้องที่รอ | ห้องเริ่ม | คน/ห้อง | รอเฉลี่ย | ออกก่อนเริ่ม')
+    cpu_start = time.process_time()
+    for m in range(1, args.minutes + 1):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # ไม่แสดง log ของห้อง
+            sim.run(60)
+        r = sim.minute
+        sim.new_minute()
+        place = r['place']
+        print(f" {m:4d} | {r['players']:6,} | {percentile(place, 0.5) * 1e6:7.1f} µs | {percentile(place, 0.99) * 1e6:5.1f} µs"
+              f" | {max(place, default=0) * 1e6:6.0f} µs | {len(sim.matchmaker.index):8,} | {r['started']:8,}"
+              f" | {r['started_players'] / max(r['started'], 1):6.2f} | {r['wait_sum'] / max(r['wait_count'], 1):6.1f} s"
+              f" | {r['left']:,}")
+    cpu = time.process_time() - cpu_start
+    stats = sim.stats
+    print(f'CPU ทั้งหมด {cpu:.2f} วินาที ({cpu / max(stats.players, 1) * 1e6:.0f} µs/ผู้เล่น รวมสร้าง/เริ่ม/ปิดห้อง), '
+          f'ห้องเริ่มเพราะเต็ม {stats.started_full:,} / รอครบเวลา {stats.started_timeout:,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# bench_memory.py
+# วัดหน่วยความจำต่อห้องและต่อผู้เล่น เมื่อมีห้องที่กำลังเล่นอยู่จำนวนมาก (ค่าเริ่มต้น 10,000 ห้อง)
+#
+# - monkey patch ด้วย eventlet ก่อน import game แบบเดียวกับ app.py (Lock ของห้องเป็น lock ของ eventlet)
+# - ทุกห้องเริ่มเกม เดินนาฬิกาจำลอง 3 วินาที (tick + สุ่มวัตถุดิบ + ส่ง state) ผู้เล่นทุกคนใส่วัตถุดิบลงจาน
+#   และคนที่มีความสามารถเริ่มแปรรูป 1 ชิ้น ข้อมูลจากผู้เล่นผ่าน json.loads เหมือนได้รับจาก client จริง
+# - นับ byte ที่ยังถูกจองอยู่ด้วย tracemalloc (รวม timer ใน scheduler และ cache ของ state)
+#   วัดห้อง 2 คนและ 8 คน แล้วแยกเป็นต้นทุนคงที่ต่อห้อง + ต้นทุนต่อผู้เล่น
+#
+# วิธีใช้:  python tools/bench_memory.py [--rooms 10000]
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse  # noqa: E402
+import gc  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import random  # noqa: E402
+import sys  # noqa: E402
+import tracemalloc  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game  # noqa: E402
+from scheduler import DeadlineScheduler  # noqa: E402
+
+
+def null_sink(event, data, to, skip_sid):
+    pass
+
+
+def from_client(data):
+    """ข้อมูลที่ผ่านการ encode/decode JSON เหมือน event ที่ได้รับจาก client"""
+    return json.loads(json.dumps(data))
+
+
+def build_rooms(num_rooms, players_per_room):
+    clock = [0.0]
+    scheduler = DeadlineScheduler(clock=lambda: clock[0])
+    random.seed(1) # ห้องใช้ตัวสุ่มกลางของโมดูล random แบบเดียวกับ app.py
+    rooms = []
+    for r in range(num_rooms):
+        room_id = f'M{r:05d}'
+        room = game.GameRoom(room_id, f'{room_id}-sid-0', from_client('ผู้เล่น 0'), scheduler, null_sink,
+                             wall_clock=lambda: clock[0])
+        for i in range(1, players_per_room):
+            room.add_player(f'{room_id}-sid-{i}', from_client(f'ผู้เล่น {i}'))
+        room.start_game()
+        rooms.append(room)
+
+    clock[0] += game.LEVEL_START_DELAY
+    scheduler.run_due()
+    for room in rooms:
+        for sid, player in list(room.players.items()):
+            required = game.RECIPES[player.objective]['ingredients']
+            room.handle_player_action(sid, from_client({'type': 'add_to_plate', 'new_plate_contents': required[:1]}))
+            if player.ability:
+                item = next(iter(game.ABILITIES_CONFIG[player.ability]['transformations']))
+                room.use_ability(sid, from_client(item))
+    for _ in range(3):
+        clock[0] += game.TICK_INTERVAL
+        scheduler.run_due()
+    return rooms, scheduler
+
+
+def measure(num_rooms, players_per_room):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rooms, scheduler = build_rooms(num_rooms, players_per_room)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del rooms, scheduler
+    return used / num_rooms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rooms', type=int, default=10000)
+    args = parser.parse_args()
+
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull # ไม่แสดง log ของห้อง
+        try:
+            small = measure(args.rooms, 2)
+            large = measure(args.rooms, 8)
+        finally:
+            sys.stdout = stdout
+    per_player = (large - small) / 6
+    per_room = small - 2 * per_player
+    print(f'{args.rooms:,} ห้องที่กำลังเล่น (tracemalloc)')
+    print(f'  ห้อง 2 คน       : {small:10,.0f} B/ห้อง')
+    print(f'  ห้อง 8 คน       : {large:10,.0f} B/ห้อง')
+    print(f'  ต้นทุนคงที่ต่อห้อง : {per_room:10,.0f} B')
+    print(f'  ต้นทุนต่อผู้เล่น   : {per_player:10,.0f} B')
+    print(f'  {args.rooms:,} ห้อง x 8 คน : {large * args.rooms / 2**20:10,.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
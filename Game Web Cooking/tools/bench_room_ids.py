@@ -0,0 +1,59 @@
+# bench_room_ids.py
+# เปรียบเทียบเวลาสร้างรหัสห้องใหม่ 1 รหัส เมื่อรหัสถูกใช้ไปแล้วตามสัดส่วนต่างๆ
+# - เดิม: สุ่ม 4 ตัวอักษรแล้ววนสุ่มใหม่จนกว่าจะไม่ชนกับห้องที่มีอยู่ (ช้าลงเรื่อยๆ เมื่อรหัสใกล้เต็ม)
+# - ใหม่: RoomIdAllocator (permutation แบบ affine + free list) คงที่ไม่ว่าจะใช้ไปแล้วเท่าไร
+#
+# วิธีใช้:  python tools/bench_room_ids.py [--length 3] [--samples 2000]
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from room_ids import RoomIdAllocator  # noqa: E402
+
+
+def random_retry(used, length):
+    """วิธีเดิมใน handle_create_room คืนค่ารหัสและจำนวนครั้งที่สุ่ม"""
+    attempts = 0
+    while True:
+        attempts += 1
+        room_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
+        if room_id not in used:
+            return room_id, attempts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--length', type=int, default=3) # 36^3 = 46,656 รหัส (เติมให้เต็มได้เร็ว ผลเหมือนรหัส 4 ตัวที่สัดส่วนเดียวกัน)
+    parser.add_argument('--samples', type=int, default=2000)
+    args = parser.parse_args()
+
+    allocator = RoomIdAllocator(args.length)
+    used = set()
+    print(f'รหัสยาว {args.length} ตัว ({allocator.capacity:,} รหัส), วัด {args.samples} ครั้งต่อระดับ')
+    print(f'{"ใช้ไปแล้ว":>10} {"สุ่มซ้ำ: µs":>12} {"ครั้งที่สุ่ม":>12} {"allocator: µs":>14}')
+    for fill in (0.5, 0.9, 0.99, 0.999):
+        while len(used) < int(allocator.capacity * fill):
+            used.add(allocator.allocate())
+
+        attempts = 0
+        start = time.perf_counter()
+        for _ in range(args.samples):
+            _, tries = random_retry(used, args.length)
+            attempts += tries
+        retry_us = (time.perf_counter() - start) / args.samples * 1e6
+
+        start = time.perf_counter()
+        for _ in range(args.samples):
+            allocator.release(allocator.allocate()) # คืนทันที เพื่อให้สัดส่วนที่ใช้ไปคงเดิม
+        allocator_us = (time.perf_counter() - start) / args.samples * 1e6 / 2
+        print(f'{fill:>10.1%} {retry_us:>12.1f} {attempts / args.samples:>12.1f} {allocator_us:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# bench_scheduler.py
+# วัดความแม่นยำของเวลา (event ถูกเรียกช้ากว่ากำหนดเท่าไร) และการใช้ CPU ของ game_scheduler
+# เมื่อมีห้องเล่นอยู่จำนวนมาก (ค่าเริ่มต้น 1,000 ห้อง ห้องละ 4 คน ไม่มี client เชื่อมต่อจริง)
+# และห้องที่รออยู่ใน Lobby อีกจำนวนหนึ่ง (ไม่มี timer จึงไม่มีต้นทุนใน loop)
+#
+# วิธีใช้:  python tools/bench_scheduler.py [--rooms 1000] [--lobbies 1000] [--seconds 10]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+import game  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def build_rooms(num_rooms, num_lobbies, players_per_room):
+    rooms = []
+    for r in range(num_rooms + num_lobbies):
+        room = game.GameRoom(f'R{r:05d}', f'{r}-0', 'ผู้เล่น 0', app.game_scheduler, app._socketio_send)
+        for i in range(1, players_per_room):
+            room.add_player(f'{r}-{i}', f'ผู้เล่น {i}')
+        if r < num_rooms:
+            # ห้องจริงเริ่มเกมไม่พร้อมกัน กระจายเวลาเริ่มของแต่ละห้องให้อยู่ภายใน 1 tick
+            app.socketio.sleep(game.TICK_INTERVAL / num_rooms)
+            with room.lock:
+                room.game_state = game.GameState(list(room.players), room.players)
+                room._assign_abilities()
+                room._assign_all_objectives()
+                room._mark_state_changed()
+                room._start_timers()
+        rooms.append(room)
+    return rooms
+
+
+def run(num_rooms, num_lobbies, players_per_room, seconds):
+    scheduler = app.game_scheduler
+    lateness = []
+    original_call_at = scheduler.call_at
+
+    def timed_call_at(deadline, callback, *args):
+        def wrapper(*inner_args):
+            lateness.append(scheduler.clock() - deadline)
+            callback(*inner_args)
+        return original_call_at(deadline, wrapper, *args)
+
+    scheduler.call_at = timed_call_at
+    app.socketio.start_background_task(app.master_game_loop)
+    rooms = build_rooms(num_rooms, num_lobbies, players_per_room)
+    # ให้เวลาในเกมเพียงพอตลอดการวัด
+    for room in rooms[:num_rooms]:
+        room.game_state.time_left = 10 ** 6
+    lateness.clear()
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    app.socketio.sleep(seconds)
+    cpu_used = time.process_time() - cpu_start
+    wall = time.monotonic() - wall_start
+
+    late_ms = [v * 1000 for v in lateness]
+    print(f'ห้องที่เล่นอยู่ {num_rooms} ห้อง + Lobby {num_lobbies} ห้อง, ห้องละ {players_per_room} คน, {wall:.1f} วินาที')
+    print(f'  events      : {len(lateness)} ({len(lateness) / wall:.0f}/s)')
+    print(f'  CPU         : {cpu_used / wall * 100:.1f}% ของ 1 core')
+    print(f'  ความล่าช้า   : p50 {percentile(late_ms, 50):.2f} ms  p99 {percentile(late_ms, 99):.2f} ms  max {max(late_ms, default=0):.2f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rooms', type=int, default=1000)
+    parser.add_argument('--lobbies', type=int, default=1000)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+    run(args.rooms, args.lobbies, args.players, args.seconds)
@@ -0,0 +1,96 @@
+# bench_snapshot.py
+# วัดเวลาย้ายห้องไป process ใหม่ (room_snapshot.py) ด้วยห้องจำลองของ tools/simulate.py
+#
+# - เล่นห้องจำลองไปช่วงหนึ่งให้อยู่กลางเกม แล้ววัดแต่ละขั้น: GameRoom.snapshot ทุกห้อง, เขียนไฟล์, อ่านไฟล์,
+#   GameRoom.restore ทุกห้อง และ rebind_player ของผู้เล่นทุกคน (ผู้เล่นกลับเข้าห้องด้วย sid ใหม่)
+# - หลัง restore บอทชุดใหม่เล่นต่ออีกช่วงหนึ่ง ตรวจว่านาฬิกาเกมเดินต่อจากเดิมและผู้เล่นยังทำคะแนนได้
+#
+# วิธีใช้:  python tools/bench_snapshot.py [--rooms 1000 5000] [--players 4] [--warmup 30]
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game  # noqa: E402
+from room_snapshot import read_snapshot, write_snapshot  # noqa: E402
+from simulate import Bot, Simulation  # noqa: E402
+
+
+def bench(num_rooms, players, warmup, resume_seconds, path):
+    sim = Simulation(num_rooms, players, seed=num_rooms)
+    sim.start()
+    sim.run(warmup)
+    before = {room.id: (room.phase, room.game_state and room.game_state.time_left) for room in sim.rooms.values()}
+
+    started = time.perf_counter()
+    snapshots = [room.snapshot(sim.now) for room in sim.rooms.values()]
+    snapshot_s = time.perf_counter() - started
+    started = time.perf_counter()
+    size = write_snapshot(path, snapshots, time.time())
+    write_s = time.perf_counter() - started
+
+    # process ใหม่: scheduler และนาฬิกาใหม่ ห้องและบอทสร้างจากไฟล์เท่านั้น
+    fresh = Simulation(0, players)
+    fresh.now = 1000.0
+    started = time.perf_counter()
+    _, loaded = read_snapshot(path)
+    read_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for data in loaded:
+        room = game.GameRoom.restore(data, fresh.scheduler, fresh.send, wall_clock=lambda: fresh.now)
+        fresh.rooms[room.id] = room
+    restore_s = time.perf_counter() - started
+
+    rng = random.Random(num_rooms)
+    started = time.perf_counter()
+    for room in fresh.rooms.values():
+        for player in list(room.players.values()):
+            sid = f'{player.sid}-r'
+            fresh.bots[sid] = Bot(fresh, room, sid, random.Random(rng.random()))
+            room.rebind_player(player.token, sid)
+    rebind_s = time.perf_counter() - started
+
+    resumed = sum(
+        1 for room in fresh.rooms.values()
+        if (room.phase, room.game_state and room.game_state.time_left) == before[room.id]
+    )
+    actions = sum(sim.actions.values())
+    fresh.run(resume_seconds)
+    return {
+        'rooms': num_rooms, 'size': size, 'snapshot': snapshot_s, 'write': write_s, 'read': read_s,
+        'restore': restore_s, 'rebind': rebind_s, 'resumed': resumed,
+        'ticking': sum(1 for room in fresh.rooms.values() if 'tick' in room._timers or room.phase != game.RoomPhase.PLAYING),
+        'actions_after': sum(fresh.actions.values()), 'actions_before': actions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rooms', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--warmup', type=float, default=30, help='วินาที (จำลอง) ที่เล่นก่อน snapshot')
+    parser.add_argument('--resume', type=float, default=30, help='วินาที (จำลอง) ที่เล่นต่อหลัง restore')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_rooms in args.rooms:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # ไม่แสดง log ของห้อง
+                r = bench(num_rooms, args.players, args.warmup, args.resume, os.path.join(tmp, 'rooms.snapshot'))
+            total = r['snapshot'] + r['write'] + r['read'] + r['restore']
+            print(f"{r['rooms']:,} ห้อง x {args.players} ผู้เล่น: ไฟล์ {r['size'] / 1024:,.1f} KB "
+                  f"({r['size'] / r['rooms']:.0f} byte/ห้อง)")
+            print(f"  snapshot {r['snapshot'] * 1000:7.1f} ms | เขียน {r['write'] * 1000:6.1f} ms | อ่าน {r['read'] * 1000:6.1f} ms"
+                  f" | restore {r['restore'] * 1000:7.1f} ms | รวม {total * 1000:7.1f} ms ({total / r['rooms'] * 1e6:.0f} µs/ห้อง)")
+            print(f"  rebind ผู้เล่นทุกคน {r['rebind'] * 1000:.1f} ms ({r['rebind'] / (r['rooms'] * args.players) * 1e6:.0f} µs/คน)")
+            print(f"  สถานะ/เวลาเกมตรงกับก่อน snapshot {r['resumed']:,}/{r['rooms']:,} ห้อง, เล่นต่อได้ {r['ticking']:,}/{r['rooms']:,} ห้อง"
+                  f" (action หลัง restore {args.resume:g} วินาที: {r['actions_after']:,})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# bench_spammy_client.py
+# วัดจำนวนครั้งที่ server ส่ง state ให้ผู้เล่นคนอื่นในห้อง เมื่อมีผู้เล่น 1 คนส่ง add_to_plate ถี่ๆ
+# (จำลอง client ที่ลากวัตถุดิบเข้า-ออกจานรัวๆ หรือ client ที่ตั้งใจ spam)
+#
+# เปรียบเทียบ "ก่อน" (ส่ง state ทุก action, ไม่จำกัดความถี่), เฉพาะ BROADCAST_DEBOUNCE
+# และ "หลัง" (BROADCAST_DEBOUNCE + ACTION_RATE/ACTION_BURST)
+# ใช้นาฬิกาจำลองของ game_scheduler จึงรันเสร็จเร็วและได้ผลเท่ากันทุกครั้ง
+#
+# วิธีใช้:  python tools/bench_spammy_client.py [--rate 100] [--seconds 10] [--players 4]
+
+import argparse
+import os
+import sys
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+import game  # noqa: E402
+
+STATE_EVENTS = ('state_patch', 'update_game_state')
+
+
+def count_state_messages(client):
+    """จำนวนข้อความ state ที่ client ได้รับ (นับข้อความที่อยู่ใน bundle ด้วย) และจำนวน packet"""
+    messages = 0
+    received = client.get_received()
+    for packet in received:
+        if packet['name'] == 'bundle':
+            messages += sum(1 for event, _ in packet['args'][0] if event in STATE_EVENTS)
+        elif packet['name'] in STATE_EVENTS:
+            messages += 1
+    return messages, len(received)
+
+
+def run(label, rate, seconds, num_players, clock):
+    clients = [app.socketio.test_client(app.app) for _ in range(num_players)]
+    spammer, observer = clients[0], clients[1]
+    spammer.emit('create_room', {'name': 'Spammer'})
+    room_id = next(m for m in spammer.get_received() if m['name'] == 'room_created')['args'][0]['room_id']
+    for i, client in enumerate(clients[1:], start=1):
+        client.emit('join_room', {'name': f'ผู้เล่น {i}', 'room_id': room_id})
+    spammer.emit('start_game', {'room_id': room_id})
+    clock[0] += game.LEVEL_START_DELAY
+    app.game_scheduler.run_due()
+    app.rooms.get(room_id).game_state.time_left = 10 ** 6
+    for client in clients:
+        client.get_received()
+
+    sent = 0
+    steps = int(rate * seconds)
+    for i in range(steps):
+        clock[0] += 1 / rate
+        app.game_scheduler.run_due()
+        plate = ['🍅'] * (i % 7) # จานเปลี่ยนทุก action (คาบ 7 ไม่ตรงกับจังหวะที่ action ผ่านการจำกัดความถี่)
+        spammer.emit('player_action', {'room_id': room_id, 'type': 'add_to_plate', 'new_plate_contents': plate})
+        sent += 1
+    clock[0] += 1
+    app.game_scheduler.run_due()
+
+    state_messages, packets = count_state_messages(observer)
+    room = app.rooms.get(room_id)
+    with room.lock:
+        is_latest_sent = room._last_sent_state == room.get_augmented_state_for_ui()
+    print(f'{label}: spam {sent} action ({rate}/s, {seconds:g} วินาที)')
+    print(f'  state ที่ผู้เล่นอื่นได้รับ : {state_messages} ครั้ง ({state_messages / seconds:.1f}/s, รวม tick), {packets} packet')
+    print(f'  ส่ง state ล่าสุดแล้ว      : {is_latest_sent}')
+    for client in clients:
+        client.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rate', type=float, default=100)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--players', type=int, default=4)
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    clock = [1000.0]
+    app.game_scheduler.clock = lambda: clock[0]
+
+    debounce, action_rate, action_burst = game.BROADCAST_DEBOUNCE, game.ACTION_RATE, game.ACTION_BURST
+    game.BROADCAST_DEBOUNCE, game.ACTION_RATE, game.ACTION_BURST = 0, float('inf'), float('inf')
+    run('ก่อน (ส่งทุก action)', args.rate, args.seconds, args.players, clock)
+    game.BROADCAST_DEBOUNCE = debounce
+    run(f'debounce {debounce * 1000:g} ms อย่างเดียว', args.rate, args.seconds, args.players, clock)
+    game.ACTION_RATE, game.ACTION_BURST = action_rate, action_burst
+    run(f'หลัง (debounce {debounce * 1000:g} ms, {action_rate}/s burst {action_burst})', args.rate, args.seconds, args.players, clock)
+
+
+if __name__ == '__main__':
+    main()
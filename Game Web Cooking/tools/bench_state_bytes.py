@@ -0,0 +1,77 @@
+# bench_state_bytes.py
+# วัดจำนวน byte ที่ส่งออกต่อ 1 tick ต่อห้อง (ห้อง 8 คน)
+# เปรียบเทียบระหว่างการส่ง state เต็มทุกครั้ง (แบบเดิม) กับการส่ง patch เฉพาะส่วนที่เปลี่ยน
+#
+# วิธีใช้:  python tools/bench_state_bytes.py [--players 8] [--ticks 60]
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socketio import packet  # noqa: E402
+
+import game  # noqa: E402
+from scheduler import DeadlineScheduler  # noqa: E402
+
+
+def packet_size(event, data):
+    """ขนาด Socket.IO packet จริงที่ python-socketio เข้ารหัสก่อนส่ง (byte)"""
+    encoded = packet.Packet(packet.EVENT, data=[event, data], namespace='/').encode()
+    return len(encoded.encode('utf-8'))
+
+
+def build_room(num_players):
+    room = game.GameRoom('BNCH', 'sid-0', 'ผู้เล่น 0', DeadlineScheduler(), lambda *message: None)
+    for i in range(1, num_players):
+        room.add_player(f'sid-{i}', f'ผู้เล่น {i}')
+    player_sids = list(room.players.keys())
+    room.game_state = game.GameState(player_sids, room.players)
+    room._assign_abilities()
+    room._assign_all_objectives()
+    room.game_state.start_clock(0.0)
+    return room
+
+
+def run(num_players, ticks):
+    room = build_room(num_players)
+    full_bytes = 0
+    patch_bytes = 0
+    last_state = room.get_augmented_state_for_ui()
+    for t in range(1, ticks + 1):
+        room.game_state.advance_clock(t * game.TICK_INTERVAL)
+        room._mark_state_changed()
+        ui_state = room.get_augmented_state_for_ui()
+        full_bytes += packet_size('update_game_state', game.wire_state(ui_state))
+        patch = game.diff_ui_state(last_state, ui_state)
+        if patch:
+            patch_bytes += packet_size('state_patch', dict(game.wire_patch(patch), base_version=0, version=1))
+        last_state = ui_state
+
+    # action ที่พบบ่อย: ใส่วัตถุดิบลงจาน
+    player = next(iter(room.players.values()))
+    player.plate = ('🥬',)
+    room._mark_state_changed()
+    ui_state = room.get_augmented_state_for_ui()
+    action_full = packet_size('update_game_state', game.wire_state(ui_state))
+    action_patch = packet_size('state_patch', dict(game.wire_patch(game.diff_ui_state(last_state, ui_state)), base_version=0, version=1))
+
+    print(f'ห้อง {num_players} คน, {ticks} ticks')
+    print(f'  tick   : full state {full_bytes / ticks:8.1f} B/tick   patch {patch_bytes / ticks:8.1f} B/tick')
+    print(f'  action : full state {action_full:8d} B          patch {action_patch:8d} B')
+
+    # เวลาที่ใช้สร้าง state: สร้างใหม่ทุกครั้ง vs ใช้ cache ของเวอร์ชันเดิม
+    number = 2000
+    build_us = timeit.timeit(room._build_ui_state, number=number) / number * 1e6
+    cached_us = timeit.timeit(room.get_augmented_state_for_ui, number=number) / number * 1e6
+    print(f'  state  : build {build_us:8.1f} us/call     cached {cached_us:8.2f} us/call')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=8)
+    parser.add_argument('--ticks', type=int, default=60)
+    args = parser.parse_args()
+    run(args.players, args.ticks)
@@ -0,0 +1,117 @@
+# bench_wire_bytes.py
+# เปรียบเทียบจำนวน byte ที่ส่งถึง client ต่อ tick ต่อห้อง ระหว่าง JSON (แบบเดิม) กับแบบย่อ (msgpack + เลข ID)
+#
+# จำลองห้องพร้อมบอท (tools/simulate.py) แล้วเข้ารหัสทุก packet ที่ห้องส่งออกทั้ง 2 แบบ:
+# - JSON: Socket.IO packet ที่ python-socketio สร้างจริง (json_cache)
+# - แบบย่อ: ข้อความชุดเดียวกันผ่าน CompactEncoder เป็น binary event `packed` (header ข้อความ + ข้อมูล binary)
+# นับ byte ต่อผู้รับ (packet ที่ส่งทั้งห้องนับตามจำนวนผู้เล่นที่ได้รับ) รวม header ของ engine.io และ websocket frame
+# พจนานุกรมที่ส่งไปกับ game_started ถูกนับรวมไว้ด้วย
+#
+# วิธีใช้:  python tools/bench_wire_bytes.py [--players 4 8] [--rooms 50] [--seconds 300]
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socketio import packet  # noqa: E402
+
+import game  # noqa: E402
+import json_cache  # noqa: E402
+from compact_codec import PACKED_EVENT, CompactEncoder, pack_batch  # noqa: E402
+from simulate import Simulation  # noqa: E402
+
+packet.Packet.json = json_cache # เข้ารหัสแบบเดียวกับ SocketIO(json=json_cache) ใน app.py
+
+
+def frame_size(payload):
+    """ขนาด websocket frame (server -> client ไม่มี mask) ของ payload"""
+    size = len(payload)
+    return size + (2 if size < 126 else 4 if size < 65536 else 10)
+
+
+def json_packet_bytes(event, data):
+    encoded = packet.Packet(packet.EVENT, data=[event, data], namespace='/').encode()
+    return frame_size(b'4' + encoded.encode('utf-8'))
+
+
+def compact_packet_bytes(payload):
+    header, *attachments = packet.Packet(packet.EVENT, data=[PACKED_EVENT, payload], namespace='/').encode()
+    return frame_size(b'4' + header.encode('utf-8')) + sum(frame_size(attachment) for attachment in attachments)
+
+
+class WireMeter:
+    """sink ของ Simulation ที่วัดขนาด packet ทั้ง 2 แบบก่อนส่งต่อให้บอท"""
+    def __init__(self):
+        self.sim = None
+        self.encoders = {}
+        self.bytes = Counter()
+        self.packets = 0
+        self.encode_seconds = Counter()
+
+    def encoder_for(self, room):
+        encoder = self.encoders.get(room.id)
+        if encoder is None:
+            encoder = CompactEncoder(game.COMPACT_TABLES, [(sid, p.name) for sid, p in room.players.items()])
+            self.encoders[room.id] = encoder
+        return encoder
+
+    def send(self, event, data, to, skip_sid):
+        room = self.sim.rooms.get(to)
+        if room:
+            recipients = sum(1 for sid in room.players if not skip_sid or sid not in skip_sid)
+        else:
+            room = self.sim.rooms[to.rsplit('-', 1)[0]]
+            recipients = 1
+        messages = data if event == 'bundle' else [[event, data]]
+
+        start = time.perf_counter()
+        json_bytes = json_packet_bytes(event, data)
+        middle = time.perf_counter()
+        encode = self.encoder_for(room).encode
+        compact_bytes = compact_packet_bytes(pack_batch([encode(*message) for message in messages]))
+        end = time.perf_counter()
+
+        self.packets += 1
+        self.bytes['json'] += json_bytes * recipients
+        self.bytes['compact'] += compact_bytes * recipients
+        self.encode_seconds['json'] += middle - start
+        self.encode_seconds['compact'] += end - middle
+        self.sim.send(event, data, to, skip_sid)
+
+
+def run(num_rooms, players, seconds):
+    meter = WireMeter()
+    sim = Simulation(num_rooms, players)
+    meter.sim = sim
+    for room in sim.rooms.values():
+        room.sink = meter.send
+    sim.start()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # ไม่แสดง log ของห้อง
+        sim.run(seconds)
+
+    ticks = num_rooms * seconds / game.TICK_INTERVAL
+    json_per_tick = meter.bytes['json'] / ticks
+    compact_per_tick = meter.bytes['compact'] / ticks
+    print(f'ห้อง {players} คน ({num_rooms} ห้อง, จำลอง {seconds:g} วินาที, {meter.packets:,} packet)')
+    print(f'  JSON     : {json_per_tick:8.0f} B/tick ต่อห้อง   เข้ารหัส {meter.encode_seconds["json"] / meter.packets * 1e6:6.1f} µs/packet')
+    print(f'  msgpack  : {compact_per_tick:8.0f} B/tick ต่อห้อง   เข้ารหัส {meter.encode_seconds["compact"] / meter.packets * 1e6:6.1f} µs/packet')
+    print(f'  ลดลง     : {(1 - compact_per_tick / json_per_tick) * 100:.0f}%')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, nargs='+', default=[4, 8])
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=300)
+    args = parser.parse_args()
+    for players in args.players:
+        run(args.rooms, players, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# build_assets.py
+# build ไฟล์หน้าเว็บ (assets.py): ชื่อไฟล์มี hash ของเนื้อหา บีบอัด gzip/brotli ไว้ล่วงหน้า แล้วเขียน static/dist/manifest.json
+# รันทุกครั้งที่ deploy (ก่อนเปิด app.py) ไฟล์ของ build ก่อนหน้ายังอยู่ หน้าเว็บที่เปิดค้างไว้จึงโหลดไฟล์เดิมได้
+#
+# วิธีใช้:  python tools/build_assets.py   (brotli: pip install brotli ไม่มี = มีเฉพาะ .gz)
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import assets  # noqa: E402
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+def main():
+    started = time.perf_counter()
+    manifest = assets.build_assets(STATIC_DIR)
+    elapsed = time.perf_counter() - started
+    for name, entry in manifest['assets'].items():
+        sizes = entry['bytes']
+        compressed = ', '.join(f'{encoding} {size:,} ({size / sizes["identity"]:.0%})'
+                               for encoding, size in sizes.items() if encoding != 'identity')
+        print(f"{name} -> {assets.DIST_DIR}/{entry['file']}: {sizes['identity']:,} byte, {compressed}")
+    if assets.brotli is None:
+        print('ไม่มีโมดูล brotli: ข้าม .br (pip install brotli)')
+    print(f'build {len(manifest["assets"])} ไฟล์ใน {elapsed * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# check_level_transition.py
+# ตรวจว่าการผ่านด่านไม่ทำให้ห้องค้าง: ห้อง A ผ่านด่านขณะที่ห้อง B กำลังเล่นอยู่ (scheduler ตัวเดียวกัน นาฬิกาจำลอง)
+#
+# - submit_order ที่ทำให้ผ่านด่านต้องคืนค่าทันที (ไม่ sleep รอ LEVEL_COMPLETE_DELAY) และไม่ค้าง lock ของห้อง
+# - ระหว่างหน้าผ่านด่าน action อื่นของห้อง A ต้องทำงานทันที และห้อง B ต้องเดินนาฬิกาทุก 1 วินาทีตามปกติ
+# - ห้อง A เริ่มด่านถัดไปหลัง LEVEL_COMPLETE_DELAY และนาฬิกาเริ่มเดินหลัง LEVEL_START_DELAY
+# ไม่ผ่านข้อใดข้อหนึ่ง: exit code 1
+#
+# วิธีใช้:  python tools/check_level_transition.py [--players 4] [--max-ms 10]
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game  # noqa: E402
+from scheduler import DeadlineScheduler  # noqa: E402
+
+
+class Check:
+    """ห้อง 2 ห้องบน DeadlineScheduler เดียวกันที่เดินด้วยนาฬิกาจำลอง"""
+    def __init__(self, num_players):
+        self.now = 0.0
+        self.scheduler = DeadlineScheduler(clock=lambda: self.now)
+        self.received = {} # {room_id: Counter(event)} ข้อความที่ห้องส่งถึงผู้เล่นทุกคนในห้อง
+        self.rooms = []
+        for room_id in ('TA', 'TB'):
+            sids = [f'{room_id}-{i}' for i in range(num_players)]
+            room = game.GameRoom(room_id, sids[0], 'ผู้เล่น 0', self.scheduler, self.send,
+                                 rng=random.Random(room_id), wall_clock=lambda: self.now)
+            for i, sid in enumerate(sids[1:], start=1):
+                room.add_player(sid, f'ผู้เล่น {i}')
+            self.received[room_id] = Counter()
+            self.rooms.append(room)
+        self.failures = []
+
+    def send(self, event, data, to, skip_sid):
+        if to not in self.received: # ข้อความถึงผู้เล่นรายคน ไม่ต้องนับ
+            return
+        messages = data if event == 'bundle' else [[event, data]]
+        for message_event, _ in messages:
+            self.received[to][message_event] += 1
+
+    def advance(self, seconds):
+        """เดินนาฬิกาจำลองไป `seconds` วินาที ทำทุก event ที่ถึงกำหนดระหว่างทาง"""
+        end = self.now + seconds
+        while True:
+            deadline = self.scheduler.next_deadline()
+            if deadline is None or deadline > end:
+                break
+            self.now = max(self.now, deadline)
+            self.scheduler.run_due()
+        self.now = end
+
+    def expect(self, ok, message):
+        print(f"{'✓' if ok else '✗'} {message}")
+        if not ok:
+            self.failures.append(message)
+
+
+def timed(callback, *args):
+    """เวลาที่ callback ใช้ (ms)"""
+    started = time.perf_counter()
+    callback(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def lock_is_free(room):
+    if not room.lock.acquire(blocking=False):
+        return False
+    room.lock.release()
+    return True
+
+
+def run(num_players, max_ms):
+    check = Check(num_players)
+    room_a, room_b = check.rooms
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # ไม่แสดง log ของห้อง
+        for room in check.rooms:
+            room.start_game()
+        check.advance(game.LEVEL_START_DELAY + 2)
+    check.expect(room_a.phase == room_b.phase == game.RoomPhase.PLAYING, 'ทั้งสองห้องเริ่มเล่นแล้ว')
+
+    # ห้อง A: ให้ขาดอีก 1 คะแนนถึงเป้า แล้วผู้เล่นคนแรกใส่จานครบตามเมนูและส่งอาหาร
+    sid = room_a.game_state.player_order_sids[0]
+    player = room_a.players[sid]
+    room_a.game_state.score = room_a.game_state.target_score - 1
+    room_a.handle_player_action(sid, {'type': 'add_to_plate',
+                                      'new_plate_contents': list(game.RECIPES[player.objective]['ingredients'])})
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        elapsed = timed(room_a.handle_player_action, sid, {'type': 'submit_order'})
+    check.expect(room_a.phase == game.RoomPhase.LEVEL_COMPLETE and check.received['TA']['level_complete'] == 1,
+                 f'ห้อง A ผ่านด่าน 1 (สถานะ {room_a.phase})')
+    check.expect(elapsed < max_ms, f'submit_order ที่ผ่านด่านคืนค่าใน {elapsed:.3f} ms (เกณฑ์ < {max_ms} ms)')
+    check.expect(lock_is_free(room_a), 'lock ของห้อง A ว่างหลัง submit_order')
+
+    # ระหว่างหน้าผ่านด่าน: เดินทีละ 1 วินาที
+    other_sid = room_a.game_state.player_order_sids[-1]
+    b_time_left = room_b.game_state.time_left
+    b_ticks_ok = True
+    action_ms = 0.0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(game.LEVEL_COMPLETE_DELAY - 1):
+            action_ms = max(action_ms, timed(room_a.handle_player_action, other_sid,
+                                             {'type': 'pass_item', 'direction': 'left', 'item': {'type': 'ingredient', 'name': '🍅'}}))
+            check.advance(1)
+            b_ticks_ok &= room_b.game_state is not None and room_b.game_state.time_left == b_time_left - 1
+            b_time_left = room_b.game_state.time_left if room_b.game_state else b_time_left
+    check.expect(room_a.phase == game.RoomPhase.LEVEL_COMPLETE, 'ห้อง A ยังอยู่ที่หน้าผ่านด่านก่อนครบ LEVEL_COMPLETE_DELAY')
+    check.expect(action_ms < max_ms, f'action อื่นของห้อง A ระหว่างผ่านด่านใช้เวลาสูงสุด {action_ms:.3f} ms')
+    check.expect(lock_is_free(room_a), 'lock ของห้อง A ว่างระหว่างผ่านด่าน')
+    check.expect(b_ticks_ok, f'ห้อง B เดินนาฬิกาทุก 1 วินาทีระหว่างที่ห้อง A ผ่านด่าน (เหลือ {b_time_left} วินาที)')
+
+    # ครบ LEVEL_COMPLETE_DELAY: ด่าน 2 เริ่ม (STARTING) แล้วเล่นได้หลัง LEVEL_START_DELAY
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        check.advance(1)
+        starting = room_a.phase
+        check.advance(game.LEVEL_START_DELAY)
+    check.expect(starting == game.RoomPhase.STARTING and check.received['TA']['start_next_level'] == 1,
+                 f'ห้อง A เริ่มด่านถัดไปหลัง {game.LEVEL_COMPLETE_DELAY} วินาที (สถานะ {starting})')
+    check.expect(room_a.phase == game.RoomPhase.PLAYING and room_a.game_state.level == 2,
+                 f'ห้อง A เล่นด่าน 2 หลังอีก {game.LEVEL_START_DELAY} วินาที (สถานะ {room_a.phase})')
+    return check.failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ตรวจว่าการผ่านด่านไม่ทำให้ห้องตัวเองและห้องอื่นค้าง')
+    parser.add_argument('--players', type=int, default=4, help='ผู้เล่นต่อห้อง')
+    parser.add_argument('--max-ms', type=float, default=10.0, help='เวลาสูงสุด (ms) ที่ action หนึ่งครั้งใช้ได้')
+    args = parser.parse_args()
+
+    failures = run(args.players, args.max_ms)
+    if failures:
+        print(f'ไม่ผ่าน {len(failures)} ข้อ')
+        sys.exit(1)
+    print('ผ่านทุกข้อ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,518 @@
+# loadtest.py
+# ทดสอบโหลดของ server จริงด้วยบอทที่เชื่อมต่อผ่าน Socket.IO (python-socketio client)
+#
+# - สร้าง N ห้อง ห้องละไม่เกิน 8 บอท ผ่านขั้นตอนเดียวกับผู้เล่นจริง: create_room -> join_room -> start_game
+# - บอทเล่นเหมือนคน: ใส่จานถ้าเป็นวัตถุดิบที่เมนูต้องใช้, แปรรูปด้วยความสามารถของตัวเอง,
+#   ทิ้งหรือส่งต่อของที่ไม่ใช้ และส่งอาหารเมื่อจานครบ (เมื่อเกมจบ host จะเริ่มเกมใหม่)
+# - วัด: เวลาตอบกลับของ action (submit_order/use_ability -> action_success/action_fail),
+#   ความคลาดเคลื่อนของ tick ที่ client เห็น, อัตราข้อความ/packet, tick ของ server จาก /stats
+#   และ CPU/RSS ของ process server (ใช้ psutil ถ้ามี ไม่เช่นนั้นอ่านจาก /proc)
+# - บันทึกผลเป็น JSON (--report) เพื่อนำไปเทียบกับรอบก่อน (--compare)
+# - หลาย worker (sharding.py): --workers N เปิด worker N ตัวด้วย tools/run_workers.py (หรือ --url หลายค่า)
+#   host ของแต่ละห้องกระจายไปทุก worker ส่วนบอทที่ join ต่อ worker แบบสุ่มแล้วตาม redirect ไปยังเจ้าของห้อง
+#   รายงานจำนวนห้องและ CPU แยกต่อ worker และประมาณจำนวนห้องที่รับได้ถ้าแต่ละ worker มี 1 core
+# - ผู้ชม: --spectators N เพิ่มผู้ชม N คนต่อห้องหลังเริ่มเกม (spectate_room) ผู้ชมประกอบ state จาก snapshot + patch
+#   เหมือนผู้เล่นแต่ไม่ส่ง action รายงานอัตราข้อความและ resync ของผู้ชมแยกจากผู้เล่น
+#   เทียบ CPU ของ server ที่จำนวนผู้ชมต่างกันได้ด้วย --report/--compare
+#
+# ต้องติดตั้งเพิ่ม:  pip install "python-socketio[client]"  (psutil ไม่บังคับ)
+# วิธีใช้:
+#   python tools/loadtest.py --spawn-server --rooms 50 --players 4 --seconds 60 --report after.json --compare before.json
+#   python tools/loadtest.py --url http://127.0.0.1:5001 --server-pid 12345 --rooms 50
+#   python tools/loadtest.py --spawn-server --workers 2 --local-broker --rooms 40 --report workers2.json
+#   python tools/loadtest.py --spawn-server --rooms 4 --spectators 250 --report spectators250.json
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import random  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+import urllib.request  # noqa: E402
+from collections import Counter, deque  # noqa: E402
+
+import socketio  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game  # noqa: E402
+from run_workers import fetch_stats, start_local_broker, start_workers, stop_workers  # noqa: E402
+
+THINK_TIME = (0.3, 1.5) # วินาทีที่บอทใช้ตัดสินใจหลังได้รับวัตถุดิบ
+TRASH_CHANCE = 0.5 # โอกาสที่บอททิ้งวัตถุดิบที่ตัวเองไม่ใช้ แทนการส่งต่อ
+RESTART_DELAY = 3 # วินาทีที่ host รอก่อนเริ่มเกมใหม่หลังเกมจบ
+
+
+def percentiles(values):
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+    pick = lambda pct: round(values[min(len(values) - 1, int(len(values) * pct / 100))], 2)  # noqa: E731
+    return {'count': len(values), 'p50': pick(50), 'p90': pick(90), 'p99': pick(99), 'max': round(values[-1], 2)}
+
+
+class Stats:
+    """ตัวนับที่บอททุกตัวใช้ร่วมกัน (ทำงานใน green thread เดียวกัน จึงไม่ต้องใช้ lock)"""
+    def __init__(self):
+        self.actions = Counter()
+        self.messages = Counter()
+        self.packets = 0
+        self.rtt_ms = []
+        self.tick_jitter_ms = []
+        self.errors = Counter()
+        self.redirects = 0
+
+
+class BotClient:
+    """ผู้เล่นบอท 1 คน เชื่อมต่อด้วย socketio.Client และประกอบ state จาก snapshot + patch แบบเดียวกับ main.js"""
+    join_event = 'join_room'
+
+    def __init__(self, url, name, stats, rng):
+        self.url = url
+        self.name = name
+        self.stats = stats
+        self.rng = rng
+        self.room_id = None
+        self.is_host = False
+        self.my_sid = None
+        self.state = None
+        self.version = None
+        self.resync_pending = False
+        self.pending_replies = deque() # เวลาที่ส่ง action ที่รอ action_success/action_fail ตอบกลับ
+        self.last_tick_at = None
+        self.on_game_end = None
+        self.join_request = None
+        self.joined = eventlet.event.Event()
+        self.sio = socketio.Client(reconnection=False)
+        for event in ('room_created', 'join_success', 'spectate_success', 'error_message', 'game_started', 'update_game_state',
+                      'state_patch', 'receive_item', 'action_success', 'action_fail', 'start_next_level',
+                      'game_over', 'game_won', 'bundle', 'redirect'):
+            self.sio.on(event, self._make_handler(event))
+
+    def _make_handler(self, event):
+        def handler(data=None):
+            self.stats.packets += 1
+            if event == 'bundle':
+                for message_event, message_data in data:
+                    self.dispatch(message_event, message_data)
+            else:
+                self.dispatch(event, data)
+        return handler
+
+    def connect(self):
+        self.sio.connect(self.url, transports=['websocket'])
+
+    def join(self, room_id):
+        self.join_request = {'name': self.name, 'room_id': room_id}
+        self.emit(self.join_event, self.join_request)
+
+    def follow_redirect(self, url):
+        """ห้องอยู่ที่ worker อื่น: ต่อใหม่ที่ worker เจ้าของแล้ว join อีกครั้ง (เหมือน main.js)"""
+        self.stats.redirects += 1
+        self.disconnect()
+        self.url = url
+        self.connect()
+        self.emit(self.join_event, self.join_request)
+
+    def emit(self, event, data):
+        try:
+            self.sio.emit(event, data)
+        except socketio.exceptions.SocketIOError:
+            self.stats.errors['emit'] += 1
+
+    def action(self, data):
+        self.stats.actions[data['type']] += 1
+        if data['type'] == 'submit_order':
+            self.pending_replies.append(time.monotonic())
+        self.emit('player_action', dict(data, room_id=self.room_id))
+
+    # --- ข้อความจาก server ---
+    def dispatch(self, event, data):
+        self.stats.messages[event] += 1
+        if event in ('room_created', 'join_success'):
+            self.room_id, self.is_host = data['room_id'], data['is_host']
+            self.joined.send(True)
+        elif event == 'spectate_success':
+            self.room_id = data['room_id']
+            if data['state']:
+                self.apply_snapshot(data['state'])
+            self.joined.send(True)
+        elif event == 'redirect':
+            eventlet.spawn(self.follow_redirect, data['url']) # ไม่ตัดการเชื่อมต่อจากใน handler ของ socket เดิม
+        elif event == 'error_message':
+            self.stats.errors['error_message'] += 1
+            if not self.joined.ready():
+                self.joined.send(False)
+        elif event == 'game_started':
+            self.my_sid = data['your_sid']
+            self.apply_snapshot(data['initial_state'])
+        elif event in ('update_game_state', 'start_next_level'):
+            self.apply_snapshot(data)
+        elif event == 'state_patch':
+            self.apply_patch(data)
+        elif event == 'receive_item':
+            eventlet.spawn_after(self.rng.uniform(*THINK_TIME), self.handle_item, data['item']['name'])
+        elif event in ('action_success', 'action_fail'):
+            if self.pending_replies:
+                self.stats.rtt_ms.append((time.monotonic() - self.pending_replies.popleft()) * 1000)
+        elif event in ('game_over', 'game_won'):
+            self.state = None
+            if self.is_host and self.on_game_end:
+                eventlet.spawn_after(RESTART_DELAY, self.on_game_end, self)
+
+    def apply_snapshot(self, snapshot):
+        self.state = snapshot
+        self.version = snapshot.get('version')
+        self.resync_pending = False
+        self.last_tick_at = None # ช่วงรอเริ่มด่าน/เกมใหม่ไม่นับเป็นความคลาดเคลื่อนของ tick
+
+    def apply_patch(self, patch):
+        if self.state is None or patch['base_version'] != self.version:
+            if not self.resync_pending:
+                self.resync_pending = True
+                self.stats.errors['resync'] += 1
+                self.emit('request_state_sync', {'room_id': self.room_id})
+            return
+        fields = patch.get('fields', {})
+        if 'time_left' in fields and fields['time_left'] < self.state['time_left']: # tick (ส่งอาหารสำเร็จจะเพิ่มเวลา ไม่นับ)
+            now = time.monotonic()
+            if self.last_tick_at is not None:
+                self.stats.tick_jitter_ms.append(abs(now - self.last_tick_at - game.TICK_INTERVAL) * 1000)
+            self.last_tick_at = now
+        self.state.update(fields)
+        if 'players' in patch or 'removed_players' in patch:
+            players_state = dict(self.state['players_state'], **patch.get('players', {}))
+            for sid in patch.get('removed_players', []):
+                players_state.pop(sid, None)
+            self.state['players_state'] = players_state
+        self.version = patch['version']
+
+    # --- การตัดสินใจของบอท ---
+    def handle_item(self, item):
+        me = self.state and self.state['players_state'].get(self.my_sid)
+        if not me or not me['objective'] or not self.state.get('is_active'):
+            return
+        missing = list(game.RECIPES[me['objective']['name']]['ingredients'])
+        kept = []
+        for ingredient in me['plate']:
+            if ingredient in missing:
+                missing.remove(ingredient)
+                kept.append(ingredient)
+
+        transformations = game.ABILITIES_CONFIG.get(me['ability'], {}).get('transformations', {})
+        if item in missing:
+            self.action({'type': 'add_to_plate', 'new_plate_contents': kept + [item]})
+            if len(missing) == 1:
+                eventlet.spawn_after(self.rng.uniform(*THINK_TIME), self.action, {'type': 'submit_order'})
+        elif transformations.get(item) in missing and not me['ability_processing']:
+            self.stats.actions['use_ability'] += 1
+            self.pending_replies.append(time.monotonic())
+            self.emit('use_ability', {'room_id': self.room_id, 'item_name': item})
+        elif self.rng.random() >= TRASH_CHANCE:
+            direction = 'left' if self.rng.random() < 0.5 else 'right'
+            self.action({'type': 'pass_item', 'direction': direction, 'item': {'type': 'ingredient', 'name': item}})
+
+    def disconnect(self):
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+
+class SpectatorClient(BotClient):
+    """ผู้ชม 1 คน: เข้าห้องด้วย spectate_room และประกอบ state จาก snapshot + patch (ไม่ส่ง action)"""
+    join_event = 'spectate_room'
+
+    def join(self, room_id):
+        self.join_request = {'room_id': room_id}
+        self.emit(self.join_event, self.join_request)
+
+
+def start_spectator(url, room_id, name, stats, rng):
+    spectator = SpectatorClient(url, name, stats, rng)
+    spectator.connect()
+    spectator.join(room_id)
+    spectator.joined.wait()
+    return spectator
+
+
+class ServerProbe:
+    """อ่าน CPU/RSS ของ process server ทุก 1 วินาที (psutil ถ้ามี ไม่เช่นนั้น /proc)"""
+    def __init__(self, pid):
+        self.pid = pid
+        self.cpu_percent = []
+        self.rss_mb = []
+        try:
+            import psutil
+            self._process = psutil.Process(pid)
+        except ImportError:
+            self._process = None
+        self._last = None
+
+    def _read(self):
+        if self._process:
+            times = self._process.cpu_times()
+            return times.user + times.system, self._process.memory_info().rss
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        with open(f'/proc/{self.pid}/status') as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+        return cpu, rss
+
+    def sample(self):
+        cpu, rss = self._read()
+        now = time.monotonic()
+        if self._last:
+            last_cpu, last_at = self._last
+            self.cpu_percent.append((cpu - last_cpu) / (now - last_at) * 100)
+        self._last = (cpu, now)
+        self.rss_mb.append(rss / 1024 / 1024)
+
+    def run(self, stop):
+        while not stop.ready():
+            try:
+                self.sample()
+            except (OSError, StopIteration):
+                return
+            eventlet.sleep(1)
+
+    def report(self):
+        if not self.rss_mb:
+            return None
+        return {
+            'cpu_percent_avg': round(sum(self.cpu_percent) / max(1, len(self.cpu_percent)), 1),
+            'cpu_percent_max': round(max(self.cpu_percent, default=0), 1),
+            'rss_mb_max': round(max(self.rss_mb), 1),
+        }
+
+
+def start_room(urls, room_index, num_players, stats, rng):
+    """สร้างห้อง 1 ห้องตามขั้นตอนจริง แล้วเริ่มเกม คืนค่ารายชื่อบอทในห้อง
+    host ต่อ worker ตามลำดับห้อง บอทที่ join ต่อ worker แบบสุ่ม (ถ้าไม่ใช่เจ้าของห้องจะถูก redirect)"""
+    host = BotClient(urls[room_index % len(urls)], f'บอท {room_index}-0', stats, random.Random(rng.random()))
+    host.on_game_end = lambda bot: bot.emit('start_game', {'room_id': bot.room_id})
+    host.connect()
+    host.emit('create_room', {'name': host.name})
+    if not host.joined.wait() or not host.room_id:
+        return [host]
+    bots = [host]
+    for i in range(1, num_players):
+        bot = BotClient(rng.choice(urls), f'บอท {room_index}-{i}', stats, random.Random(rng.random()))
+        bot.connect()
+        bot.join(host.room_id)
+        bot.joined.wait()
+        bots.append(bot)
+    host.emit('start_game', {'room_id': host.room_id})
+    return bots
+
+
+def fetch_room_metrics(url):
+    """เวลาที่ห้องถือ lock ทำงาน (รวมทุก op) และขนาด payload ที่ห้องส่ง จาก /metrics (None ถ้าอ่านไม่ได้)"""
+    try:
+        with urllib.request.urlopen(f'{url}/metrics', timeout=5) as response:
+            lines = response.read().decode().splitlines()
+    except OSError:
+        return None
+    totals = {'room_busy_s': 0.0, 'payload_bytes': 0, 'emits': 0}
+    for line in lines:
+        name, _, value = line.rpartition(' ')
+        if name.startswith('cooking_room_op_seconds_sum{'):
+            totals['room_busy_s'] += float(value)
+        elif name == 'cooking_emit_payload_bytes_total':
+            totals['payload_bytes'] = int(value)
+        elif name == 'cooking_emits_total':
+            totals['emits'] = int(value)
+    return totals
+
+
+def room_work(before, after, duration):
+    """งานของห้องต่อวินาทีระหว่างช่วงวัด รวมทุก worker: เวลาที่ถือ lock (สัดส่วน CPU), packet และ byte ที่ serialize"""
+    if not all(before) or not all(after):
+        return None
+    delta = lambda key: sum(a[key] - b[key] for b, a in zip(before, after))  # noqa: E731
+    return {
+        'busy_percent': round(delta('room_busy_s') / duration * 100, 2),
+        'emits_per_s': round(delta('emits') / duration, 1),
+        'payload_bytes_per_s': round(delta('payload_bytes') / duration),
+    }
+
+
+def tick_delta(before, after):
+    """tick ของ server ระหว่างช่วงวัด รวมทุก worker (before/after คือผล /stats ของแต่ละ worker)"""
+    if not all(before) or not all(after):
+        return None
+    pairs = [(b['tick'], a['tick']) for b, a in zip(before, after)]
+    return {
+        'ticks': sum(a['ticks'] - b['ticks'] for b, a in pairs),
+        'overruns': sum(a['overruns'] - b['overruns'] for b, a in pairs),
+        'catch_up_steps': sum(a['catch_up_steps'] - b['catch_up_steps'] for b, a in pairs),
+        'lateness_ewma_ms': max(a['lateness_ewma_ms'] for b, a in pairs),
+        'max_lateness_ms': max(a['max_lateness_ms'] for b, a in pairs),
+    }
+
+
+def worker_report(urls, stats_after, probes):
+    """ห้องและ CPU ของแต่ละ worker และจำนวนห้องที่ประมาณว่ารับได้ถ้าแต่ละ worker มี 1 core ของตัวเอง"""
+    workers = []
+    for i, url in enumerate(urls):
+        worker = {'rooms': (stats_after[i] or {}).get('rooms')}
+        process = probes[i].report() if i < len(probes) else None
+        if process:
+            worker.update(process)
+            if worker['rooms'] and process['cpu_percent_avg'] > 0:
+                worker['capacity_rooms_per_core'] = round(worker['rooms'] / process['cpu_percent_avg'] * 100)
+        workers.append(worker)
+    capacities = [worker.get('capacity_rooms_per_core') for worker in workers]
+    return workers, (sum(capacities) if all(capacities) else None)
+
+
+def run(args):
+    processes = []
+    urls = args.url
+    pids = [args.server_pid] if args.server_pid else []
+    if args.spawn_server:
+        message_queue = start_local_broker(args.broker_port) if args.local_broker else args.message_queue
+        processes, urls = start_workers(args.workers, base_port=args.port, message_queue=message_queue, quiet=True)
+        pids = [process.pid for process in processes]
+
+    rng = random.Random(args.seed)
+    stats = Stats()
+    players = max(1, min(8, args.players))
+    pool = eventlet.GreenPool(args.connect_concurrency)
+    bots = []
+    for room_bots in pool.imap(lambda i: start_room(urls, i, players, stats, rng), range(args.rooms)):
+        bots.extend(room_bots)
+    rooms_started = sum(1 for bot in bots if bot.is_host and bot.room_id)
+
+    spectator_stats = Stats()
+    room_ids = [bot.room_id for bot in bots if bot.is_host and bot.room_id]
+    jobs = [(room_id, i) for room_id in room_ids for i in range(args.spectators)]
+    spectators = list(pool.imap(
+        lambda job: start_spectator(rng.choice(urls), job[0], f'ผู้ชม {job[0]}-{job[1]}', spectator_stats, random.Random(rng.random())),
+        jobs))
+
+    stop = eventlet.event.Event()
+    probes = [ServerProbe(pid) for pid in pids]
+    for probe in probes:
+        eventlet.spawn(probe.run, stop)
+    stats_before = [fetch_stats(url) for url in urls]
+    metrics_before = [fetch_room_metrics(url) for url in urls]
+    # นับเฉพาะช่วงที่เล่น ไม่รวมช่วงเชื่อมต่อ/สร้างห้อง
+    stats.actions.clear()
+    for counters in (stats, spectator_stats):
+        counters.messages.clear()
+        counters.packets = 0
+        counters.tick_jitter_ms.clear()
+    stats.rtt_ms.clear()
+    started = time.monotonic()
+    cpu_started = time.process_time()
+    eventlet.sleep(args.seconds)
+    duration = time.monotonic() - started
+    loadgen_cpu_percent = (time.process_time() - cpu_started) / duration * 100
+    stats_after = [fetch_stats(url) for url in urls]
+    metrics_after = [fetch_room_metrics(url) for url in urls]
+    stop.send(True)
+    errors = dict(stats.errors) # ไม่นับ emit ที่ล้มเหลวระหว่างปิดการเชื่อมต่อ
+    workers, capacity = worker_report(urls, stats_after, probes)
+
+    for bot in bots + spectators:
+        bot.disconnect()
+    stop_workers(processes)
+
+    return {
+        'config': {
+            'rooms': args.rooms, 'players': players, 'spectators': args.spectators, 'seconds': args.seconds,
+            'seed': args.seed, 'workers': len(urls),
+        },
+        'rooms_started': rooms_started,
+        'clients': len(bots),
+        'redirects': stats.redirects,
+        'duration_s': round(duration, 1),
+        'actions_per_s': round(sum(stats.actions.values()) / duration, 1),
+        'actions': dict(stats.actions),
+        'messages_per_s': round(sum(stats.messages.values()) / duration, 1),
+        'packets_per_s': round(stats.packets / duration, 1),
+        'action_rtt_ms': percentiles(stats.rtt_ms),
+        'client_tick_jitter_ms': percentiles(stats.tick_jitter_ms),
+        'server_tick': tick_delta(stats_before, stats_after),
+        # งานในห้อง (สร้าง/serialize state และ emit) แยกจาก CPU ของ process ที่รวมการเขียน socket ให้ทุก client
+        'room_work': room_work(metrics_before, metrics_after, duration),
+        'server_process': probes[0].report() if len(probes) == 1 else None,
+        'workers': {str(i): worker for i, worker in enumerate(workers)},
+        # ถ้าแต่ละ worker ได้ 1 core: ห้องที่รับได้ = รวมของ (ห้อง / สัดส่วน CPU ที่ใช้) ทุก worker
+        'capacity_rooms_if_core_per_worker': capacity,
+        # บอททุกตัวอยู่ใน process เดียว ถ้าค่านี้ใกล้ 100% ตัวทดสอบเองเป็นคอขวด (เวลาตอบกลับ/tick ที่วัดได้จะสูงเกินจริง)
+        'loadgen_cpu_percent': round(loadgen_cpu_percent, 1),
+        'errors': errors,
+        'spectators': {
+            'clients': len(spectators),
+            'messages_per_s': round(sum(spectator_stats.messages.values()) / duration, 1),
+            'packets_per_s': round(spectator_stats.packets / duration, 1),
+            'client_tick_jitter_ms': percentiles(spectator_stats.tick_jitter_ms),
+            'errors': dict(spectator_stats.errors),
+        },
+    }
+
+
+def flatten(report, prefix=''):
+    items = {}
+    for key, value in (report or {}).items():
+        if isinstance(value, dict):
+            items.update(flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)):
+            items[f'{prefix}{key}'] = value
+    return items
+
+
+def print_report(report, previous=None):
+    current = flatten(report)
+    before = flatten(previous) if previous else {}
+    print(f'{"metric":<36} {"ค่านี้":>12}' + (f' {"ครั้งก่อน":>12} {"เปลี่ยน":>9}' if previous else ''))
+    for key, value in current.items():
+        line = f'{key:<36} {value:>12,}'
+        if key in before:
+            old = before[key]
+            change = f'{(value - old) / old * 100:+.1f}%' if old else '-'
+            line += f' {old:>12,} {change:>9}'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', nargs='+', default=['http://127.0.0.1:5001'], help='URL ของทุก worker (เรียงตาม WORKER_INDEX)')
+    parser.add_argument('--spawn-server', action='store_true', help='เปิด app.py เป็น process ลูกและวัด CPU/RSS ของมัน')
+    parser.add_argument('--port', type=int, default=5099, help='port ของ server (worker แรก) ที่เปิดด้วย --spawn-server')
+    parser.add_argument('--workers', type=int, default=1, help='จำนวน worker ที่เปิดด้วย --spawn-server')
+    parser.add_argument('--message-queue', help='message queue ของ worker ที่เปิดด้วย --spawn-server')
+    parser.add_argument('--local-broker', action='store_true', help='ใช้ Redis จำลอง (fakeredis) เป็น message queue')
+    parser.add_argument('--broker-port', type=int, default=6390)
+    parser.add_argument('--server-pid', type=int, help='pid ของ server ที่รันอยู่แล้ว (สำหรับวัด CPU/RSS)')
+    parser.add_argument('--rooms', type=int, default=20)
+    parser.add_argument('--players', type=int, default=4, help='บอทต่อห้อง (1-8)')
+    parser.add_argument('--spectators', type=int, default=0, help='ผู้ชมต่อห้อง')
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--connect-concurrency', type=int, default=20, help='จำนวนห้องที่สร้างพร้อมกัน')
+    parser.add_argument('--report', help='บันทึกผลเป็น JSON')
+    parser.add_argument('--compare', help='JSON ของรอบก่อนสำหรับเปรียบเทียบ')
+    args = parser.parse_args()
+
+    report = run(args)
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+    print_report(report, previous)
+    if report['loadgen_cpu_percent'] > 90:
+        print('คำเตือน: ตัวทดสอบใช้ CPU เต็ม 1 core ผลเวลาตอบกลับไม่น่าเชื่อถือ ให้ลดจำนวนห้อง หรือรันหลาย process พร้อมกัน')
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+# replay.py
+# เล่น event log ของห้อง (event_log.py) ซ้ำผ่าน GameRoom ด้วยความเร็วเต็มที่ แล้วตรวจว่าได้ผลเหมือนตอนบันทึก
+#
+# - นาฬิกาของห้องถูกตั้งเป็นเวลาของแต่ละ record (ไม่ต้องรอจริง) และห้องใช้ seed ของตัวสุ่มจาก log
+# - timer ทำงานตามลำดับที่บันทึกไว้ (ไม่ได้ให้ scheduler ตัดสิน) จึงได้ลำดับเดียวกับ production ทุกประการ
+# - เทียบ checksum ของ state หลังทุก tick และผลของเกม (ผ่านด่าน/ชนะ/หมดเวลา + คะแนน) กับที่บันทึกไว้
+#   รายงาน record แรกที่ไม่ตรงกันและจบด้วย exit code 1
+# - log จาก production จึงใช้เป็นภาระงานจริงสำหรับ benchmark ได้ (--repeat, --encode)
+#
+# บันทึก log: ตั้ง env EVENT_LOG_DIR ตอนเปิด app.py หรือใช้ python tools/simulate.py --event-log DIR
+# วิธีใช้:  python tools/replay.py logs/ [--repeat 5] [--encode] [-v]
+
+import argparse
+import contextlib
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import event_log  # noqa: E402
+import game  # noqa: E402
+import json_cache  # noqa: E402
+from scheduler import DeadlineScheduler  # noqa: E402
+
+
+class LogVerifier:
+    """แทน EventLogWriter ตอนเล่นซ้ำ: ให้ seed และนาฬิกาของ log กับห้อง แล้วเก็บผลที่ห้องคำนวณได้ไว้เทียบ"""
+    def __init__(self, seed, clock):
+        self.seed = seed
+        self.clock = clock
+        self.checkpoints = []
+        self.outcomes = []
+
+    def _ignore(self, *args):
+        pass
+
+    # input ถูกป้อนจาก log อยู่แล้ว ไม่ต้องบันทึกซ้ำ
+    created = joined = rebound = left = started = action = ability = timer = broadcast = close = _ignore
+
+    def checkpoint(self, checksum):
+        self.checkpoints.append(checksum)
+
+    def outcome(self, event, total_score):
+        self.outcomes.append((event, total_score))
+
+
+class ReplayResult:
+    def __init__(self, records, game_seconds):
+        self.records = records
+        self.game_seconds = game_seconds
+        self.cpu = 0.0
+        self.packets = 0
+        self.divergence = None # (ลำดับ record, คำอธิบาย) ของจุดแรกที่ไม่ตรงกัน
+
+
+def replay(header, records, encode=False):
+    """เล่น record ทั้งหมดของห้องเดียวซ้ำ คืนค่า ReplayResult (หยุดที่จุดแรกที่ผลไม่ตรงกัน)"""
+    origin = header.origin
+    now = origin
+    clock = lambda: now  # noqa: E731
+    scheduler = DeadlineScheduler(clock=clock) # ใช้นัด timer เท่านั้น ไม่มีการเรียก run_due
+    verifier = LogVerifier(header.seed, clock)
+    result = ReplayResult(len(records), records[-1][1] / 1e6 if records else 0.0)
+
+    def sink(event, data, to, skip_sid):
+        result.packets += 1
+        if encode and not isinstance(data, (bytes, bytearray)):
+            json_cache.dumps(data) # ต้นทุน serialize เหมือนตอนส่งจริง (ข้อมูล binary เข้ารหัสแล้ว)
+
+    room = None
+    checked_checkpoints = checked_outcomes = 0
+    started = time.process_time()
+    for index, (record_type, us, fields) in enumerate(records):
+        now = origin + us / 1e6 # สูตรเดียวกับ EventLogWriter จึงได้ค่าเวลาเดียวกันทุก bit
+        if record_type == event_log.CREATE:
+            sid, name, codec = fields
+            room = game.GameRoom(header.room_id, sid, name, scheduler, sink, host_codec=codec, event_log=verifier,
+                                 wall_clock=lambda: header.wall_origin + (now - origin))
+            continue
+        if room is None:
+            result.divergence = (index, 'log ไม่ได้เริ่มด้วย record create')
+            break
+        if record_type == event_log.JOIN:
+            room.add_player(*fields)
+        elif record_type == event_log.REBIND:
+            old_sid, sid = fields
+            room.rebind_player(room.players[old_sid].token, sid)
+        elif record_type == event_log.LEAVE:
+            if room.remove_player(fields[0]) == 'game_over_disconnect':
+                room.game_state = None # เหมือน _remove_from_room ของ app.py
+        elif record_type == event_log.START:
+            room.start_game()
+        elif record_type == event_log.ACTION:
+            room.handle_player_action(*fields)
+        elif record_type == event_log.ABILITY:
+            room.use_ability(*fields)
+        elif record_type == event_log.TIMER:
+            if not room.run_timer(fields[0]):
+                result.divergence = (index, f'ห้องไม่ได้นัด timer {fields[0]} ไว้')
+                break
+        elif record_type == event_log.BROADCAST:
+            room.broadcast_state()
+        elif record_type == event_log.CLOSE:
+            room.close()
+        elif record_type == event_log.CHECKPOINT:
+            got = verifier.checkpoints[checked_checkpoints] if checked_checkpoints < len(verifier.checkpoints) else None
+            checked_checkpoints += 1
+            if got != fields[0]:
+                result.divergence = (index, f'checksum ของ state หลัง tick ไม่ตรง (บันทึก {fields[0]:08x}, ได้ {got and f"{got:08x}"})')
+                break
+        elif record_type == event_log.OUTCOME:
+            got = verifier.outcomes[checked_outcomes] if checked_outcomes < len(verifier.outcomes) else None
+            checked_outcomes += 1
+            if got != fields:
+                result.divergence = (index, f'ผลของเกมไม่ตรง (บันทึก {fields}, ได้ {got})')
+                break
+    else:
+        if len(verifier.checkpoints) != checked_checkpoints or len(verifier.outcomes) != checked_outcomes:
+            result.divergence = (len(records), f'ห้องสร้าง checkpoint {len(verifier.checkpoints)}/ผลของเกม {len(verifier.outcomes)} '
+                                               f'แต่ log มี {checked_checkpoints}/{checked_outcomes}')
+    result.cpu = time.process_time() - started
+    return result
+
+
+def log_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, '*.cklog')))
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+', help='ไฟล์ .cklog หรือโฟลเดอร์ที่มีไฟล์ .cklog')
+    parser.add_argument('--repeat', type=int, default=1, help='เล่นซ้ำกี่รอบ (ใช้เป็น benchmark)')
+    parser.add_argument('--encode', action='store_true', help='serialize ข้อความขาออกเป็น JSON เหมือนตอนส่งจริง')
+    parser.add_argument('-v', '--verbose', action='store_true', help='แสดงผลของทุกไฟล์')
+    args = parser.parse_args()
+
+    logs = []
+    log_bytes = 0
+    for path in log_paths(args.paths):
+        with open(path, 'rb') as f:
+            data = f.read()
+        log_bytes += len(data)
+        header, records = event_log.read_log(data)
+        logs.append((path, header, records))
+    if not logs:
+        raise SystemExit('ไม่พบไฟล์ log')
+
+    total_records = sum(len(records) for _, _, records in logs)
+    game_seconds = cpu = 0.0
+    packets = 0
+    failed = 0
+    for round_index in range(args.repeat):
+        for path, header, records in logs:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # ไม่แสดง log ของห้อง
+                result = replay(header, records, args.encode)
+            game_seconds += result.game_seconds
+            cpu += result.cpu
+            packets += result.packets
+            if round_index:
+                continue
+            if result.divergence:
+                failed += 1
+                index, message = result.divergence
+                print(f'✗ {path}: record {index} ({_record_name(records, index)}): {message}')
+            elif args.verbose:
+                print(f'✓ {path}: {result.records:,} record, เกม {result.game_seconds:,.1f} วินาที, CPU {result.cpu * 1000:.1f} ms')
+
+    counts = {}
+    for _, _, records in logs:
+        for record_type, _, _ in records:
+            name = event_log.RECORD_NAMES[record_type]
+            counts[name] = counts.get(name, 0) + 1
+    print(f'{len(logs)} log ({log_bytes / 1024:,.1f} KB, {log_bytes / max(total_records, 1):.1f} byte/record) x {args.repeat} รอบ'
+          + (' (serialize JSON)' if args.encode else ''))
+    print(f'  record        : {total_records:,} {counts}')
+    print(f'  เวลาในเกม      : {game_seconds:,.0f} วินาที เล่นซ้ำใช้ CPU {cpu:.2f} วินาที (เร็วกว่าเวลาจริง {game_seconds / max(cpu, 1e-9):,.0f} เท่า)')
+    print(f'  ต่อ record     : {cpu / (total_records * args.repeat) * 1e6:.1f} µs, ข้อความขาออก {packets:,} packet')
+    print(f'  ผลตรงกับ log  : {len(logs) - failed}/{len(logs)} ห้อง')
+    if failed:
+        sys.exit(1)
+
+
+def _record_name(records, index):
+    return event_log.RECORD_NAMES[records[index][0]] if index < len(records) else 'จบ log'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# run_workers.py
+# เปิด server หลาย worker (app.py หลาย process) ที่แบ่งห้องกันตามรหัสห้อง (ดู sharding.py)
+#
+# - worker i ฟังที่ port base_port + i และได้ env WORKER_INDEX=i, WORKER_URLS=<URL ของทุก worker>
+# - ถ้าระบุ message queue ทุก worker ใช้ queue เดียวกัน (socketio.emit จาก worker ใดก็ถึง client ทุก worker)
+#   --local-broker เปิด Redis จำลองใน process นี้ (fakeredis) แทน Redis จริง สำหรับทดสอบบนเครื่องตัวเอง
+# - ผู้เล่นเปิดหน้าเว็บจาก worker ใดก็ได้ (เช่นหลัง load balancer แบบ round-robin)
+#   ห้องที่สร้างจะอยู่ที่ worker นั้น และการ join ห้องของ worker อื่นจะถูก redirect ไปยังเจ้าของ
+#
+# ต้องติดตั้งเพิ่มเมื่อใช้ message queue:  pip install redis  (--local-broker: pip install fakeredis)
+# วิธีใช้:
+#   python tools/run_workers.py --workers 4 --local-broker
+#   python tools/run_workers.py --workers 4 --message-queue redis://127.0.0.1:6379/0
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fetch_stats(url):
+    try:
+        with urllib.request.urlopen(f'{url}/stats', timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return None
+
+
+def start_local_broker(port):
+    """Redis จำลอง (fakeredis) ใน thread ของ process นี้ คืนค่า URL สำหรับ MESSAGE_QUEUE"""
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        raise SystemExit('--local-broker ต้องติดตั้ง fakeredis และ redis ก่อน (pip install fakeredis redis)')
+    server = TcpFakeServer(('127.0.0.1', port), server_type='redis')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'redis://127.0.0.1:{port}/0'
+
+
+def start_workers(count, host='127.0.0.1', base_port=5101, message_queue=None, quiet=False):
+    """เปิด worker count ตัว รอจนทุกตัวตอบ /stats คืนค่า (รายการ process, รายการ URL)"""
+    urls = [f'http://{host}:{base_port + i}' for i in range(count)]
+    processes = []
+    for i in range(count):
+        env = dict(os.environ, PORT=str(base_port + i), WORKER_INDEX=str(i), WORKER_URLS=','.join(urls))
+        if message_queue:
+            env['MESSAGE_QUEUE'] = message_queue
+        output = subprocess.DEVNULL if quiet else None
+        processes.append(subprocess.Popen([sys.executable, 'app.py'], cwd=APP_DIR, env=env, stdout=output, stderr=output))
+
+    deadline = time.monotonic() + 15
+    for url in urls:
+        while fetch_stats(url) is None:
+            if time.monotonic() > deadline:
+                stop_workers(processes)
+                raise SystemExit(f'worker {url} ไม่ตอบสนองภายใน 15 วินาที')
+            time.sleep(0.1)
+    return processes, urls
+
+
+def stop_workers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--host', default='127.0.0.1', help='host ใน URL ที่ client ใช้ต่อแต่ละ worker')
+    parser.add_argument('--base-port', type=int, default=5101)
+    parser.add_argument('--message-queue', help='URL ของ message queue เช่น redis://127.0.0.1:6379/0')
+    parser.add_argument('--local-broker', action='store_true', help='ใช้ Redis จำลองใน process นี้เป็น message queue')
+    parser.add_argument('--broker-port', type=int, default=6390)
+    args = parser.parse_args()
+
+    message_queue = args.message_queue
+    if args.local_broker:
+        message_queue = start_local_broker(args.broker_port)
+    processes, urls = start_workers(args.workers, args.host, args.base_port, message_queue)
+    print(f'เปิด {len(urls)} worker แล้ว' + (f' (message queue: {message_queue})' if message_queue else ''))
+    for i, url in enumerate(urls):
+        print(f'  worker {i}: {url}')
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_workers(processes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+# simulate.py
+# จำลองห้องเกมจำนวนมากแบบ headless (ไม่มี Flask/Socket.IO) ด้วยผู้เล่นบอท
+#
+# - ทุกห้องใช้ DeadlineScheduler ตัวเดียวกันที่เดินด้วยนาฬิกาจำลอง: กระโดดไปยัง deadline ถัดไปทันที
+#   จึงรันได้เร็วเท่าที่ CPU ทำได้ และได้ผลเหมือนเดิมทุกครั้งเมื่อใช้ seed เดิม
+# - บอทรับข้อความผ่าน sink ของห้อง แล้วตอบสนองหลัง "เวลาคิด" สุ่ม: ใส่จานถ้าเป็นวัตถุดิบที่เมนูต้องใช้,
+#   แปรรูปถ้าความสามารถของตัวเองแปรรูปได้, ทิ้งหรือส่งต่อให้เพื่อนบ้านถ้าไม่ใช้, ส่งอาหารเมื่อจานครบ
+# - เมื่อเกมจบ host จะเริ่มเกมใหม่ ห้องจึงเล่นอยู่ตลอดการจำลอง
+# - --event-log DIR: บันทึก event log ของทุกห้อง (ไฟล์ละห้อง) สำหรับตรวจ/benchmark ด้วย tools/replay.py
+#
+# วิธีใช้:  python tools/simulate.py [--rooms 200] [--players 4] [--seconds 300] [--seed 1] [--event-log DIR]
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game  # noqa: E402
+from event_log import EventLogWriter  # noqa: E402
+from scheduler import DeadlineScheduler  # noqa: E402
+
+RESTART_DELAY = 3 # วินาที (จำลอง) ที่ host รอก่อนเริ่มเกมใหม่หลังเกมจบ
+TRASH_CHANCE = 0.5 # โอกาสที่บอททิ้งวัตถุดิบที่ตัวเองไม่ใช้ แทนการส่งต่อ (ทิ้งของไม่ต้องแจ้ง server)
+
+
+class Bot:
+    """ผู้เล่นจำลอง 1 คน ตัดสินใจจากข้อมูลในห้องโดยตรง (ไม่ต้องประกอบ state จาก patch)"""
+    def __init__(self, sim, room, sid, rng):
+        self.sim = sim
+        self.room = room
+        self.sid = sid
+        self.rng = rng
+
+    def on_event(self, event, data):
+        if event == 'receive_item':
+            self.sim.scheduler.call_later(self.think_time(), self.handle_item, data['item']['name'])
+        elif event in ('game_over', 'game_won') and self.room.host_sid == self.sid:
+            self.sim.scheduler.call_later(RESTART_DELAY, self.sim.start_game, self.room)
+
+    def think_time(self):
+        return self.rng.uniform(*self.sim.think_time)
+
+    def action(self, data):
+        self.sim.actions[data['type']] += 1
+        self.room.handle_player_action(self.sid, data)
+
+    def handle_item(self, item):
+        player = self.room.players.get(self.sid)
+        if not player or not player.objective or not self.room.game_state:
+            return
+        required = game.RECIPES[player.objective]['ingredients']
+        # เก็บเฉพาะของในจานที่ยังใช้กับเมนูปัจจุบันได้ (เมนูอาจเปลี่ยนเมื่อมีคนส่งอาหารสำเร็จ)
+        missing = list(required)
+        kept = []
+        for ingredient in player.plate:
+            if ingredient in missing:
+                missing.remove(ingredient)
+                kept.append(ingredient)
+
+        transformations = game.ABILITIES_CONFIG.get(player.ability, {}).get('transformations', {})
+        if item in missing:
+            self.action({'type': 'add_to_plate', 'new_plate_contents': kept + [item]})
+            if len(missing) == 1:
+                self.sim.scheduler.call_later(self.think_time(), self.action, {'type': 'submit_order'})
+        elif transformations.get(item) in missing:
+            self.sim.actions['use_ability'] += 1
+            self.room.use_ability(self.sid, item)
+        elif self.rng.random() >= TRASH_CHANCE:
+            direction = 'left' if self.rng.random() < 0.5 else 'right'
+            self.action({'type': 'pass_item', 'direction': direction, 'item': {'type': 'ingredient', 'name': item}})
+
+
+class Simulation:
+    """ห้องเกมหลายห้องที่ใช้ scheduler และนาฬิกาจำลองร่วมกัน"""
+    def __init__(self, num_rooms, players_per_room, seed=1, think_time=(0.3, 1.5), event_log_dir=None):
+        self.now = 0.0
+        self.scheduler = DeadlineScheduler(clock=lambda: self.now)
+        self.think_time = think_time
+        self.rooms = {}
+        self.bots = {}
+        self.packets = 0
+        self.messages = Counter()
+        self.actions = Counter()
+        rng = random.Random(seed)
+        for r in range(num_rooms):
+            room_id = f'S{r:05d}'
+            sids = [f'{room_id}-{i}' for i in range(players_per_room)]
+            room_seed = rng.random()
+            event_log = None
+            if event_log_dir:
+                event_log = EventLogWriter(os.path.join(event_log_dir, f'{room_id}.cklog'), room_id, int(room_seed * 2**53),
+                                           self.scheduler.clock, lambda: self.now)
+            room = game.GameRoom(room_id, sids[0], 'บอท 0', self.scheduler, self.send,
+                                 rng=random.Random(room_seed), wall_clock=lambda: self.now, event_log=event_log)
+            for i, sid in enumerate(sids[1:], start=1):
+                room.add_player(sid, f'บอท {i}')
+            self.rooms[room_id] = room
+            for sid in sids:
+                self.bots[sid] = Bot(self, room, sid, random.Random(rng.random()))
+
+    def send(self, event, data, to, skip_sid):
+        """sink ของทุกห้อง: ส่งข้อความให้บอทปลายทาง"""
+        self.packets += 1
+        room = self.rooms.get(to)
+        if room:
+            recipients = [sid for sid in room.players if not skip_sid or sid not in skip_sid]
+        else:
+            recipients = [to]
+        messages = data if event == 'bundle' else [[event, data]]
+        for sid in recipients:
+            bot = self.bots.get(sid)
+            if not bot:
+                continue
+            for message_event, message_data in messages:
+                self.messages[message_event] += 1
+                bot.on_event(message_event, message_data)
+
+    def start_game(self, room):
+        room.start_game()
+
+    def start(self, stagger=1.0):
+        """เริ่มเกมทุกห้อง โดยกระจายเวลาเริ่มให้อยู่ภายใน `stagger` วินาที (ห้องจริงไม่ได้เริ่มพร้อมกัน)"""
+        for i, room in enumerate(self.rooms.values()):
+            self.scheduler.call_at(self.now + stagger * i / len(self.rooms), self.start_game, room)
+
+    def run(self, seconds):
+        """เดินนาฬิกาจำลองไป `seconds` วินาที คืนค่าจำนวน event ที่ทำงาน"""
+        end = self.now + seconds
+        events = 0
+        while True:
+            deadline = self.scheduler.next_deadline()
+            if deadline is None or deadline > end:
+                break
+            self.now = max(self.now, deadline)
+            events += self.scheduler.run_due(self.now)
+        self.now = end
+        return events
+
+    def close(self):
+        """ปิดทุกห้อง (เขียน event log ที่ค้างอยู่ลงไฟล์)"""
+        for room in self.rooms.values():
+            room.close()
+
+    def total_score(self):
+        return sum(room.game_state.total_score + room.game_state.score for room in self.rooms.values() if room.game_state)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--event-log', metavar='DIR', help='บันทึก event log ของทุกห้องลงโฟลเดอร์นี้')
+    args = parser.parse_args()
+
+    if args.event_log:
+        os.makedirs(args.event_log, exist_ok=True)
+    sim = Simulation(args.rooms, args.players, seed=args.seed, event_log_dir=args.event_log)
+    sim.start()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # ไม่แสดง log ของห้อง
+        cpu_start = time.process_time()
+        events = sim.run(args.seconds)
+        cpu = time.process_time() - cpu_start
+        score = sim.total_score()
+        if args.event_log:
+            sim.close()
+
+    print(f'{args.rooms} ห้อง x {args.players} บอท, จำลอง {args.seconds:g} วินาที ใช้ CPU {cpu:.2f} วินาที (seed {args.seed})')
+    print(f'  ห้องต่อ 1 core : {args.rooms * args.seconds / cpu:,.0f} ห้อง (ถ้าเล่นแบบ real-time)')
+    print(f'  scheduler event: {events:,}')
+    print(f'  action         : {dict(sim.actions)}')
+    print(f'  ข้อความขาออก    : {sum(sim.messages.values()):,} ข้อความ ใน {sim.packets:,} packet')
+    print(f'  คะแนนรวมทุกห้อง : {score:,} (seed เดิมต้องได้ค่าเดิม)')
+
+
+if __name__ == '__main__':
+    main()
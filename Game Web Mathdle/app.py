@@ -1,10 +1,15 @@
 # app.py
 # A single-file Mathdle game implementation using Flask and Object-Oriented Programming.
-# This version includes difficulty levels, robust session management, and flexible equation validation.
+# This version includes difficulty levels, server-side session management, and flexible equation validation.
+# The precomputed solutions live in equation_table.py, guesses are checked by expression.py and game state is
+# kept on the server by session_store.py; production runs through wsgi.py and gunicorn.conf.py.
 
-import random
-import re
-from flask import Flask, jsonify, request, render_template_string, session, redirect, url_for
+import os
+from flask import Flask, jsonify, request, render_template_string, redirect, url_for
+
+from equation_table import DIFFICULTY_LEVELS, EquationPool, load_equation_pools, table_path_from_env
+from expression import is_valid_equation
+from session_store import new_session_id, session_store_from_env
 
 # -----------------------------------------------------------------------------
 # 1. Game Logic (OOP Approach)
@@ -15,115 +20,44 @@ class MathdleGame:
     Encapsulates the core logic for the Mathdle game.
     This class is responsible for generating valid mathematical equations
     and checking user guesses against the correct solution.
-    It does not hold any state itself, making it reusable.
+    The only state it holds is the read-only pool of equations for each length.
     """
-    def __init__(self):
+    def __init__(self, table_path=None):
         """
-        Initializes the game logic constants.
+        Initializes the difficulty levels and loads the equation pool of every difficulty,
+        mapped from the shared table at `table_path` (or enumerated in memory without one).
         """
-        self.operators = ['+', '-', '*', '/']
-        self.digits = '0123456789'
         # Define difficulty levels with their corresponding equation lengths.
-        self.difficulty_levels = {
-            'easy': 6,
-            'medium': 8,
-            'hard': 10
-        }
+        self.difficulty_levels = dict(DIFFICULTY_LEVELS)
+        self.pools = load_equation_pools(table_path, self.difficulty_levels.values())
 
-    def generate_equation(self, length):
+    def equation_pool(self, length):
         """
-        Generates a random, valid mathematical equation of a specific length.
-        The equation can be in the format 'A+B=C' or 'C=A+B'.
+        Returns the pool for `length`, building it on first use for lengths outside the difficulty levels.
         """
-        attempts = 0
-        while attempts < 5000: # Add a safeguard to prevent infinite loops
-            attempts += 1
-            try:
-                op = random.choice(self.operators)
-                
-                max_num = 10 ** (length // 2) - 1
-
-                if op in ['+', '-']:
-                    num1 = random.randint(1, max_num)
-                    num2 = random.randint(1, num1)
-                elif op == '*':
-                    num1 = random.randint(1, int(max_num**0.5))
-                    num2 = random.randint(1, int(max_num**0.5))
-                elif op == '/':
-                    divisor = random.randint(1, int(max_num**0.5))
-                    result_val = random.randint(1, int(max_num**0.5))
-                    num1 = divisor * result_val
-                    num2 = divisor
-
-                if op == '+': result = num1 + num2
-                elif op == '-': result = num1 - num2
-                elif op == '*': result = num1 * num2
-                else: result = num1 // num2
-
-                # Randomly decide the equation format
-                if random.random() < 0.5:
-                    equation = f"{num1}{op}{num2}={result}"
-                else:
-                    equation = f"{result}={num1}{op}{num2}"
-
-                if len(equation) == length and self._is_valid(equation):
-                    print(f"Generated Solution (len={length}): {equation}")
-                    return equation
-            except (ValueError, SyntaxError, ZeroDivisionError, TypeError):
-                continue
-        
-        print(f"Warning: Could not generate an equation of length {length}. Falling back.")
-        if length == 6: return '10+5=15'
-        if length == 8: return '25*4=100'
-        if length == 10: return '100/10=10'
-        return '1+1=2'
+        pool = self.pools.get(length)
+        if pool is None:
+            pool = self.pools[length] = EquationPool.build(length)
+        return pool
 
-    def _is_valid(self, equation_str):
+    def generate_equation(self, length):
         """
-        A helper function to validate an equation string.
-        It now supports formats like 'A+B=C' and 'C=A+B'.
+        Picks a random, valid mathematical equation of a specific length.
+        The equation can be in the format 'A+B=C' or 'C=A+B'; every possible equation is equally likely.
         """
-        if equation_str.count('=') != 1:
-            return False
-        
-        left, right = equation_str.split('=')
-        if not left or not right:
-            return False
-
-        all_numbers = re.findall(r'\d+', equation_str)
-        for num in all_numbers:
-            if len(num) > 1 and num.startswith('0'):
-                return False
-
-        try:
-            left_val = self._safe_eval(left)
-            right_val_int = int(right)
-            if left_val is not None and left_val == right_val_int:
-                return True
-        except (ValueError, TypeError):
-            pass
-
-        try:
-            right_val = self._safe_eval(right)
-            left_val_int = int(left)
-            if right_val is not None and right_val == left_val_int:
-                return True
-        except (ValueError, TypeError):
-            pass
-        
-        return False
+        pool = self.equation_pool(length)
+        if not pool:
+            raise ValueError(f"No equation has length {length}")
+        equation = pool.choice()
+        print(f"Generated Solution (len={length}): {equation}")
+        return equation
 
-    def _safe_eval(self, expr_str):
+    def _is_valid(self, equation_str):
         """
-        Safely evaluates a simple mathematical expression string.
+        A helper function to validate an equation string.
+        It supports formats like 'A+B=C' and 'C=A+B', evaluated exactly by expression.py (no eval).
         """
-        if not all(c in self.digits + ''.join(self.operators) for c in expr_str):
-            return None
-        try:
-            # Using eval() is safe here because we've restricted the character set.
-            return eval(expr_str)
-        except (SyntaxError, ZeroDivisionError, NameError, TypeError):
-            return None
+        return is_valid_equation(equation_str)
 
     def check_guess(self, guess, solution):
         """
@@ -157,8 +91,10 @@ class MathdleGame:
 # -----------------------------------------------------------------------------
 
 app = Flask(__name__)
-app.secret_key = 'a-very-secure-and-unique-secret-key'
-mathdle_game = MathdleGame()
+mathdle_game = MathdleGame(table_path_from_env(os.environ))
+# Game state lives on the server; the browser only gets an opaque session ID in this cookie (see session_store.py).
+SESSION_COOKIE = 'mathdle_session'
+game_sessions = session_store_from_env(os.environ)
 
 # --- HTML Templates ---
 
@@ -417,6 +353,13 @@ def index():
     """
     return render_template_string(MENU_TEMPLATE)
 
+def _current_game():
+    """
+    Returns (session ID, game state) for the request's session cookie; the state is None without a live game.
+    """
+    session_id = request.cookies.get(SESSION_COOKIE)
+    return session_id, game_sessions.get(session_id) if session_id else None
+
 @app.route('/start')
 def start_game():
     """
@@ -426,39 +369,47 @@ def start_game():
     if difficulty not in mathdle_game.difficulty_levels:
         difficulty = 'medium'
 
-    session.clear()
-    session['difficulty'] = difficulty
+    old_session_id = request.cookies.get(SESSION_COOKIE)
+    if old_session_id:
+        game_sessions.delete(old_session_id)
+    session_id = new_session_id()
     length = mathdle_game.difficulty_levels[difficulty]
-    session['length'] = length
-    session['solution'] = mathdle_game.generate_equation(length)
-    session['guesses'] = []
-    
-    return redirect(url_for('play'))
+    game_sessions.save(session_id, {
+        'difficulty': difficulty,
+        'length': length,
+        'solution': mathdle_game.generate_equation(length),
+        'guesses': [],
+    })
+
+    response = redirect(url_for('play'))
+    # No max_age: the server expires idle games, so the cookie never needs to be sent again during a game.
+    response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite='Lax')
+    return response
 
 @app.route('/play')
 def play():
     """
     Renders the main game board.
     """
-    if 'solution' not in session:
+    _, game = _current_game()
+    if game is None:
         return redirect(url_for('index'))
     
-    length = session['length']
-    difficulty = session.get('difficulty', 'medium')
-    return render_template_string(GAME_TEMPLATE, length=length, difficulty=difficulty)
+    return render_template_string(GAME_TEMPLATE, length=game['length'], difficulty=game['difficulty'])
 
 @app.route('/guess', methods=['POST'])
 def process_guess():
     """
     Handles the user's guess submission.
     """
-    if 'solution' not in session:
+    session_id, game = _current_game()
+    if game is None:
         return jsonify({'error': 'ไม่มีเกมในระบบ'}), 400
 
     data = request.get_json()
     guess = data.get('guess')
-    solution = session['solution']
-    length = session['length']
+    solution = game['solution']
+    length = game['length']
 
     if not guess or len(guess) != length:
         return jsonify({'error': f'ต้องมี {length} ตัวอักษร'}), 400
@@ -470,13 +421,13 @@ def process_guess():
     results = mathdle_game.check_guess(guess, solution)
     is_correct = all(r == 'correct' for r in results)
     
-    session['guesses'].append({'guess': guess, 'results': results})
-    session.modified = True
+    game['guesses'].append({'guess': guess, 'results': results})
+    game_sessions.save(session_id, game)
 
     return jsonify({
         'results': results,
         'is_correct': is_correct,
-        'solution': solution if is_correct or len(session['guesses']) >= 6 else None
+        'solution': solution if is_correct or len(game['guesses']) >= 6 else None
     })
 
 # -----------------------------------------------------------------------------
@@ -484,5 +435,6 @@ def process_guess():
 # -----------------------------------------------------------------------------
 
 if __name__ == '__main__':
-    app.run(host="0.0.0.0",debug=True, port=5002)
+    # Development server only. In production: gunicorn -c gunicorn.conf.py (see wsgi.py)
+    app.run(host="0.0.0.0", debug=os.environ.get('MATHDLE_DEBUG') == '1', port=5002)
 
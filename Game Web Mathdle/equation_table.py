@@ -0,0 +1,208 @@
+# equation_table.py
+# Every possible Mathdle solution, per equation length, and the binary table file that holds them.
+#
+# The table is built once (by the gunicorn master before it forks, or by the first process that finds it
+# missing) and every worker maps it read-only with mmap. Workers therefore share a single copy through the
+# page cache and do no enumeration when they start.
+#
+# File layout (little-endian):
+#   header     MAGIC, format version (u16), RULES_VERSION (u16), number of lengths (u16), reserved (u16)
+#   directory  one entry per length: length (u16), reserved (u16), equation count (u32), data offset (u64)
+#   data       the equations of each length back to back, `length` ASCII bytes each
+
+import mmap
+import os
+import random
+import struct
+
+MAGIC = b'MTHQ'
+TABLE_VERSION = 1
+RULES_VERSION = 1 # bump whenever enumerate_equations changes its output, so old tables are rebuilt
+HEADER = struct.Struct('<4sHHHH')
+ENTRY = struct.Struct('<HHIQ')
+DIFFICULTY_LEVELS = {'easy': 6, 'medium': 8, 'hard': 10} # difficulty -> equation length
+DEFAULT_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'equations.bin')
+
+
+class EquationTableError(ValueError):
+    """
+    The table file is not an equation table, or was written by another format or rules version.
+    """
+
+
+def _digit_range(digits):
+    """
+    Returns the (smallest, largest) positive integer with exactly `digits` digits.
+    """
+    return (1 if digits == 1 else 10 ** (digits - 1)), 10 ** digits - 1
+
+
+def enumerate_equations(length):
+    """
+    Yields every equation of exactly `length` characters that the puzzle generator can produce,
+    in a fixed order. Operands follow the same rules the generator has always used:
+    '+' and '-' take 1 <= num2 <= num1 <= max_num, '*' takes two factors up to sqrt(max_num),
+    and '/' divides a product of two such factors by one of them, so the quotient is exact.
+    Each equation appears in both the 'A+B=C' and the 'C=A+B' form.
+    """
+    max_num = 10 ** (length // 2) - 1
+    max_factor = int(max_num ** 0.5)
+    # Every character that is not a digit is one operator and one '=', so the three numbers
+    # share length - 2 digits. Walking the digit counts keeps the work proportional to the output.
+    for len1 in range(1, min(len(str(max_num)), length - 4) + 1):
+        low1, high1 = _digit_range(len1)
+        for num1 in range(low1, min(high1, max_num) + 1):
+            for len2 in range(1, len1 + 1):
+                result_len = length - 2 - len1 - len2
+                if result_len < 1:
+                    break
+                low2, high2 = _digit_range(len2)
+                high2 = min(high2, num1)
+                low_result, high_result = _digit_range(result_len)
+                for num2 in range(max(low2, low_result - num1), min(high2, high_result - num1) + 1):
+                    yield f"{num1}+{num2}={num1 + num2}"
+                    yield f"{num1 + num2}={num1}+{num2}"
+                if result_len == 1:
+                    low_result = 0 # num1 - num2 may be zero
+                for num2 in range(max(low2, num1 - high_result), min(high2, num1 - low_result) + 1):
+                    yield f"{num1}-{num2}={num1 - num2}"
+                    yield f"{num1 - num2}={num1}-{num2}"
+    for num1 in range(1, max_factor + 1):
+        for num2 in range(1, max_factor + 1):
+            product = num1 * num2
+            equation = f"{num1}*{num2}={product}"
+            if len(equation) == length:
+                yield equation
+                yield f"{product}={num1}*{num2}"
+            equation = f"{product}/{num1}={num2}"
+            if len(equation) == length:
+                yield equation
+                yield f"{num2}={product}/{num1}"
+
+
+class EquationPool:
+    """
+    Every possible solution of one length, packed back to back into a single buffer
+    (bytes when built in this process, a read-only view of the mapped table file otherwise).
+    Equation i is data[i * length:(i + 1) * length], so picking one is a random index and a slice.
+    """
+    def __init__(self, length, data):
+        self.length = length
+        self.data = data
+
+    @classmethod
+    def build(cls, length):
+        return cls(length, ''.join(enumerate_equations(length)).encode('ascii'))
+
+    def __len__(self):
+        return len(self.data) // self.length
+
+    def __getitem__(self, index):
+        start = index * self.length
+        return str(self.data[start:start + self.length], 'ascii')
+
+    def choice(self, rng=random):
+        """
+        Returns a uniformly random equation from the pool.
+        """
+        return self[rng.randrange(len(self))]
+
+
+def table_path_from_env(environ):
+    """
+    The table path from EQUATION_TABLE (default: equations.bin next to this file). An empty value means no table:
+    every process enumerates its own pools in memory.
+    """
+    return environ.get('EQUATION_TABLE', DEFAULT_TABLE) or None
+
+
+def write_equation_table(path, pools):
+    """
+    Writes `pools` ({length: EquationPool}) to `path` atomically and returns the file size.
+    """
+    lengths = sorted(pools)
+    offset = HEADER.size + ENTRY.size * len(lengths)
+    parts = [HEADER.pack(MAGIC, TABLE_VERSION, RULES_VERSION, len(lengths), 0)]
+    for length in lengths:
+        parts.append(ENTRY.pack(length, 0, len(pools[length]), offset))
+        offset += len(pools[length].data)
+    parts.extend(bytes(pools[length].data) for length in lengths)
+    tmp_path = f'{path}.{os.getpid()}.tmp' # workers that rebuild at the same time never share a temporary file
+    with open(tmp_path, 'wb') as f:
+        for part in parts:
+            f.write(part)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return offset
+
+
+def _read_directory(header, file_size):
+    """
+    Parses the header and directory at the start of a table; returns {length: (count, offset)}.
+    """
+    if len(header) < HEADER.size:
+        raise EquationTableError('file is too short')
+    magic, version, rules, count, _ = HEADER.unpack_from(header)
+    if magic != MAGIC:
+        raise EquationTableError('not an equation table')
+    if version != TABLE_VERSION or rules != RULES_VERSION:
+        raise EquationTableError(f'format {version}/rules {rules}, expected {TABLE_VERSION}/{RULES_VERSION}')
+    if len(header) < HEADER.size + ENTRY.size * count:
+        raise EquationTableError('directory is truncated')
+    directory = {}
+    for i in range(count):
+        length, _, equations, offset = ENTRY.unpack_from(header, HEADER.size + ENTRY.size * i)
+        if offset + equations * length > file_size:
+            raise EquationTableError(f'data for length {length} is truncated')
+        directory[length] = (equations, offset)
+    return directory
+
+
+def read_table_directory(path):
+    with open(path, 'rb') as f:
+        return _read_directory(f.read(HEADER.size + ENTRY.size * 256), os.fstat(f.fileno()).st_size)
+
+
+def open_equation_table(path):
+    """
+    Maps the table read-only and returns {length: EquationPool} backed by the mapping (nothing is copied).
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    directory = _read_directory(mapped[:HEADER.size + ENTRY.size * 256], len(mapped))
+    view = memoryview(mapped)
+    return {length: EquationPool(length, view[offset:offset + count * length])
+            for length, (count, offset) in directory.items()}
+
+
+def ensure_equation_table(path, lengths):
+    """
+    Builds and writes the table unless `path` already holds a current one with every length in `lengths`.
+    Returns True when it had to build.
+    """
+    try:
+        if set(lengths) <= set(read_table_directory(path)):
+            return False
+        reason = 'lengths are missing'
+    except FileNotFoundError:
+        reason = 'not built yet'
+    except EquationTableError as e:
+        reason = str(e)
+    print(f"Equation table {path}: {reason}, building it.")
+    write_equation_table(path, {length: EquationPool.build(length) for length in lengths})
+    return True
+
+
+def load_equation_pools(path, lengths):
+    """
+    Returns {length: EquationPool} for `lengths`: mapped from the table at `path` (built first if needed),
+    or enumerated in memory when `path` is None or the table cannot be written.
+    """
+    if path:
+        try:
+            ensure_equation_table(path, lengths)
+            return open_equation_table(path)
+        except (OSError, EquationTableError) as e:
+            print(f"Warning: equation table {path} is unusable ({e}). Enumerating equations in memory.")
+    return {length: EquationPool.build(length) for length in lengths}
@@ -0,0 +1,127 @@
+# expression.py
+# Evaluator for the Mathdle equation grammar, used to validate guesses without eval().
+#
+#   equation   := side '=' side            (one side must be an integer literal)
+#   side       := term (('+' | '-') term)*
+#   term       := factor (('*' | '/') factor)*
+#   factor     := ('+' | '-')* number       (unary signs, as Python allows them)
+#   number     := '0' | [1-9][0-9]*         (no leading zeros)
+#
+# The parser reads the characters once with precedence climbing and computes the value as it goes.
+# Arithmetic is exact: '/' stays an int when the division is exact (the only kind generate_equation builds)
+# and becomes a Fraction otherwise, so '7/2*2=7' is true and no float rounding can make an equation true or false.
+# Anything else ('**', '//', spaces, other characters) is not part of the grammar and is rejected.
+
+from fractions import Fraction
+
+PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2}
+
+
+class ExpressionError(ValueError):
+    """
+    The text is not an expression of the grammar, or it divides by zero.
+    """
+
+
+def _divide(left, right):
+    if right == 0:
+        raise ExpressionError('division by zero')
+    if type(left) is int and type(right) is int:
+        quotient, remainder = divmod(left, right)
+        if remainder == 0:
+            return quotient
+    return Fraction(left) / right
+
+
+def _apply(op, left, right):
+    if op == '+':
+        return left + right
+    if op == '-':
+        return left - right
+    if op == '*':
+        return left * right
+    return _divide(left, right)
+
+
+class _Parser:
+    __slots__ = ('text', 'pos')
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def number(self):
+        text, start = self.text, self.pos
+        end = start
+        while end < len(text) and '0' <= text[end] <= '9':
+            end += 1
+        if end == start:
+            raise ExpressionError(f'expected a number at {start}')
+        if text[start] == '0' and end - start > 1:
+            raise ExpressionError(f'number with a leading zero at {start}')
+        self.pos = end
+        return int(text[start:end])
+
+    def factor(self):
+        negative = False
+        while self.pos < len(self.text) and self.text[self.pos] in '+-':
+            negative ^= self.text[self.pos] == '-'
+            self.pos += 1
+        value = self.number()
+        return -value if negative else value
+
+    def expression(self, min_precedence):
+        value = self.factor()
+        text = self.text
+        while self.pos < len(text):
+            op = text[self.pos]
+            precedence = PRECEDENCE.get(op)
+            if precedence is None:
+                raise ExpressionError(f'unexpected {op!r} at {self.pos}')
+            if precedence < min_precedence:
+                break
+            self.pos += 1
+            value = _apply(op, value, self.expression(precedence + 1))
+        return value
+
+
+def evaluate(text):
+    """
+    Returns the exact value (int or Fraction) of `text`; raises ExpressionError if it is not in the grammar.
+    """
+    parser = _Parser(text)
+    value = parser.expression(1)
+    if parser.pos != len(text):
+        raise ExpressionError(f'unexpected {text[parser.pos]!r} at {parser.pos}')
+    return value
+
+
+def integer_literal(text):
+    """
+    Returns the value of `text` if it is a single number with at most one sign ('12', '-3', '+0'), else None.
+    """
+    digits = text[1:] if text[:1] in ('+', '-') else text
+    if not digits or not digits.isascii() or not digits.isdigit() or (digits[0] == '0' and len(digits) > 1):
+        return None
+    return -int(digits) if text[0] == '-' else int(digits)
+
+
+def is_valid_equation(equation):
+    """
+    True if `equation` is 'expression=integer' or 'integer=expression' and both sides are equal.
+    """
+    if equation.count('=') != 1:
+        return False
+    left, right = equation.split('=')
+    if not left or not right:
+        return False
+    for literal, expression in ((right, left), (left, right)):
+        value = integer_literal(literal)
+        if value is None:
+            continue
+        try:
+            if evaluate(expression) == value:
+                return True
+        except ExpressionError:
+            continue
+    return False
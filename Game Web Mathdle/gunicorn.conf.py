@@ -0,0 +1,45 @@
+# gunicorn.conf.py
+# Production server settings for Mathdle.  Usage:  gunicorn -c gunicorn.conf.py
+#
+# - The master builds the equation table (equation_table.py) once before forking, so no worker ever enumerates
+#   equations. Each worker imports app.py on its own (preload_app off, so `kill -HUP` reloads code) and maps the
+#   table read-only; every worker shares the same pages through the page cache.
+# - Worker cold start (fork until the app is loaded) is logged for every worker.
+# - Game sessions must be visible to every worker: keep SESSION_STORE=sqlite (the default) with more than one worker.
+# - Settings come from the environment: BIND, WEB_CONCURRENCY, EQUATION_TABLE, SESSION_STORE, SESSION_DB.
+
+import multiprocessing
+import os
+import time
+
+from equation_table import DIFFICULTY_LEVELS, ensure_equation_table, table_path_from_env
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('BIND', '0.0.0.0:5002')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'sync' # every request is short CPU work; no long-lived connections
+preload_app = False
+timeout = 30
+errorlog = '-'
+
+
+def on_starting(server):
+    if os.environ.get('SESSION_STORE') == 'memory' and server.cfg.workers > 1:
+        server.log.warning('SESSION_STORE=memory with %d workers: a guess that reaches another worker finds no game',
+                           server.cfg.workers)
+    path = table_path_from_env(os.environ)
+    if path is None:
+        server.log.info('EQUATION_TABLE is empty: every worker enumerates its own equations')
+        return
+    started = time.perf_counter()
+    built = ensure_equation_table(path, DIFFICULTY_LEVELS.values())
+    server.log.info('Equation table %s %s in %.0f ms', path, 'built' if built else 'is current',
+                    (time.perf_counter() - started) * 1000)
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+
+
+def post_worker_init(worker):
+    worker.log.info('Worker %s ready in %.0f ms', worker.pid, (time.perf_counter() - worker.forked_at) * 1000)
@@ -0,0 +1,147 @@
+# session_store.py
+# Server-side storage for the state of each Mathdle game (difficulty, length, solution, guesses).
+#
+# The browser only holds an opaque, random session ID in a cookie; the solution never leaves the server and the
+# cookie stays the same size however many guesses are made. Every store expires a game `ttl` seconds after it was
+# last saved.
+#
+# - MemorySessionStore: an LRU dict inside one process. Fastest, but every process has its own, so it only works
+#   with a single worker.
+# - SQLiteSessionStore: one SQLite file (WAL mode) shared by every worker on the machine.
+#
+# Choose with SESSION_STORE=sqlite (default) or memory; SESSION_DB is the SQLite file, SESSION_TTL the expiry.
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 3600 # seconds a game survives without a guess
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sessions.db')
+PURGE_INTERVAL = 60 # seconds between deletions of expired rows in SQLite
+
+
+def new_session_id():
+    """
+    Returns a random, unguessable session ID (128 bits, URL-safe).
+    """
+    return secrets.token_urlsafe(16)
+
+
+class SessionStore:
+    """
+    Interface of every store. Data is a JSON-compatible dict; get returns None for unknown or expired IDs.
+    """
+    def __init__(self, ttl=DEFAULT_TTL, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+
+    def get(self, session_id):
+        raise NotImplementedError
+
+    def save(self, session_id, data):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Games in an OrderedDict ordered by last use; the least recently used game is dropped beyond `max_sessions`.
+    """
+    def __init__(self, max_sessions=100000, ttl=DEFAULT_TTL, clock=time.time):
+        super().__init__(ttl, clock)
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict() # session_id -> (expires, data)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return entry[1]
+
+    def save(self, session_id, data):
+        now = self.clock()
+        with self._lock:
+            self._sessions[session_id] = (now + self.ttl, data)
+            self._sessions.move_to_end(session_id)
+            while self._sessions:
+                oldest_id, (expires, _) = next(iter(self._sessions.items()))
+                if len(self._sessions) <= self.max_sessions and expires > now:
+                    break
+                del self._sessions[oldest_id]
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Games as JSON rows of one SQLite table. Each thread keeps its own connection; expired rows are deleted
+    at most once every PURGE_INTERVAL seconds.
+    """
+    def __init__(self, path=DEFAULT_DB, ttl=DEFAULT_TTL, clock=time.time):
+        super().__init__(ttl, clock)
+        self.path = path
+        self._local = threading.local()
+        self._next_purge = 0.0
+        connection = self._connection()
+        connection.execute('CREATE TABLE IF NOT EXISTS sessions '
+                           '(id TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None) # autocommit: one statement per request
+            connection.execute('PRAGMA journal_mode=WAL') # readers never wait for the writer
+            connection.execute('PRAGMA synchronous=NORMAL') # fsync at checkpoints, not on every commit
+            self._local.connection = connection
+        return connection
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM sessions WHERE expires > ?', (self.clock(),)).fetchone()[0]
+
+    def get(self, session_id):
+        row = self._connection().execute('SELECT data FROM sessions WHERE id = ? AND expires > ?',
+                                         (session_id, self.clock())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id, data):
+        now = self.clock()
+        connection = self._connection()
+        connection.execute('INSERT OR REPLACE INTO sessions (id, data, expires) VALUES (?, ?, ?)',
+                           (session_id, json.dumps(data, separators=(',', ':')), now + self.ttl))
+        if now >= self._next_purge:
+            self._next_purge = now + PURGE_INTERVAL
+            connection.execute('DELETE FROM sessions WHERE expires <= ?', (now,))
+
+    def delete(self, session_id):
+        self._connection().execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+
+
+def session_store_from_env(environ):
+    """
+    Builds the store selected by SESSION_STORE ('sqlite' or 'memory'), SESSION_DB and SESSION_TTL.
+    """
+    ttl = int(environ.get('SESSION_TTL', DEFAULT_TTL))
+    kind = environ.get('SESSION_STORE', 'sqlite')
+    if kind == 'memory':
+        return MemorySessionStore(ttl=ttl)
+    if kind == 'sqlite':
+        return SQLiteSessionStore(environ.get('SESSION_DB') or DEFAULT_DB, ttl=ttl)
+    raise ValueError(f"SESSION_STORE must be 'sqlite' or 'memory', not {kind!r}")
@@ -0,0 +1,129 @@
+# bench_equations.py
+# Compares the equation pool (EquationPool in app.py) with the rejection sampler that generate_equation used before it.
+#
+# - /start latency: GET /start through Flask's test client for every difficulty, once with the pool and once with the
+#   old sampler patched in, reported as p50/p99/max.
+# - Solution distribution: draws --samples solutions per length from each and reports the operator mix, how many
+#   distinct equations came up (against what uniform draws over every possible equation would give), and how
+#   concentrated the draws are on the ten most common ones.
+#
+# Usage:  python tools/bench_equations.py [--samples 100000] [--requests 2000] [--seed 1]
+
+import argparse
+import collections
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+LEGACY_OPERATORS = ['+', '-', '*', '/'] # MathdleGame.operators, which only the old sampler used
+
+
+def legacy_generate_equation(game, length, rng=random):
+    """
+    The rejection sampler generate_equation used before the equation pool (same draws, without the prints).
+    Returns (equation, fell_back) where fell_back is True when all 5000 attempts missed the length.
+    """
+    for _ in range(5000):
+        try:
+            op = rng.choice(LEGACY_OPERATORS)
+            max_num = 10 ** (length // 2) - 1
+            if op in ['+', '-']:
+                num1 = rng.randint(1, max_num)
+                num2 = rng.randint(1, num1)
+            elif op == '*':
+                num1 = rng.randint(1, int(max_num**0.5))
+                num2 = rng.randint(1, int(max_num**0.5))
+            else:
+                divisor = rng.randint(1, int(max_num**0.5))
+                result_val = rng.randint(1, int(max_num**0.5))
+                num1 = divisor * result_val
+                num2 = divisor
+            if op == '+': result = num1 + num2
+            elif op == '-': result = num1 - num2
+            elif op == '*': result = num1 * num2
+            else: result = num1 // num2
+            if rng.random() < 0.5:
+                equation = f"{num1}{op}{num2}={result}"
+            else:
+                equation = f"{result}={num1}{op}{num2}"
+            if len(equation) == length and game._is_valid(equation):
+                return equation, False
+        except (ValueError, SyntaxError, ZeroDivisionError, TypeError):
+            continue
+    return {6: '10+5=15', 8: '25*4=100', 10: '100/10=10'}.get(length, '1+1=2'), True
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def start_latency(client, difficulty, count):
+    timings = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # generate_equation prints the solution
+        for _ in range(count):
+            started = time.perf_counter()
+            client.get(f'/start?difficulty={difficulty}').close()
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def operator_of(equation):
+    return next(c for c in equation if c in '+-*/')
+
+
+def describe(draws, support):
+    counts = collections.Counter(draws)
+    ops = collections.Counter(operator_of(e) for e in draws)
+    top = sum(n for _, n in counts.most_common(10))
+    uniform = support * (1 - (1 - 1 / support) ** len(draws)) # distinct equations expected from uniform draws
+    mix = ' '.join(f"{op}{ops[op] / len(draws):4.0%}" for op in '+-*/')
+    return (f"{mix} | distinct {len(counts):7,} (uniform expects {uniform:7,.0f})"
+            f" | top-10 share {top / len(draws):6.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--samples', type=int, default=100000, help='solutions drawn per length for the distribution')
+    parser.add_argument('--requests', type=int, default=2000, help='/start requests per difficulty and sampler')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    game = app.mathdle_game
+    client = app.app.test_client()
+    pool_generate = game.generate_equation
+    print(f'/start latency over {args.requests:,} requests (Flask test client)')
+    for difficulty, length in game.difficulty_levels.items():
+        for label, generate in (('pool', pool_generate), ('rejection', lambda n: legacy_generate_equation(game, n)[0])):
+            game.generate_equation = generate
+            timings = start_latency(client, difficulty, args.requests)
+            print(f"  {difficulty:6s} ({length:2d}) {label:9s} p50 {percentile(timings, 0.5) * 1e6:8.0f} µs"
+                  f" | p99 {percentile(timings, 0.99) * 1e6:8.0f} µs | max {max(timings) * 1e6:8.0f} µs")
+    game.generate_equation = pool_generate
+
+    print(f'\nsolution distribution over {args.samples:,} draws per length')
+    for length in game.difficulty_levels.values():
+        pool = game.equation_pool(length)
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        pooled = [pool.choice(rng) for _ in range(args.samples)]
+        pool_s = time.perf_counter() - started
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        legacy = [legacy_generate_equation(game, length, rng) for _ in range(args.samples)]
+        legacy_s = time.perf_counter() - started
+        fallbacks = sum(1 for _, fell_back in legacy if fell_back)
+        print(f"  length {length:2d}: {len(pool):,} possible equations, pool {len(pool.data) / 1024:,.1f} KB")
+        print(f"    pool      {pool_s / args.samples * 1e6:7.1f} µs/draw | {describe(pooled, len(pool))}")
+        print(f"    rejection {legacy_s / args.samples * 1e6:7.1f} µs/draw | {describe([e for e, _ in legacy], len(pool))}"
+              f" | fallbacks {fallbacks:,}")
+
+
+if __name__ == '__main__':
+    main()
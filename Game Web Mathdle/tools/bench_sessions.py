@@ -0,0 +1,146 @@
+# bench_sessions.py
+# Compares the server-side session stores (session_store.py) with the signed-cookie sessions app.py used before.
+#
+# Plays --games full games (/start, then six wrong but valid guesses) through Flask's test client for each backend:
+# - cookie: the previous /start and /guess routes, rebuilt here on Flask's default session (state in the cookie),
+# - memory and sqlite: the real app.py routes with each store.
+# Reports the Cookie header the browser sends with each /guess, the Set-Cookie bytes the server answers with,
+# /guess latency, and whether the solution can be read from the cookie without knowing the secret key.
+#
+# Usage:  python tools/bench_sessions.py [--games 300] [--seed 1]
+
+import argparse
+import base64
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify, redirect, request, session  # noqa: E402
+
+import app  # noqa: E402
+from session_store import MemorySessionStore, SQLiteSessionStore  # noqa: E402
+
+GUESSES = 6
+LEGACY_SECRET_KEY = 'a-very-secure-and-unique-secret-key' # app.secret_key before session_store.py
+
+
+def cookie_app():
+    """
+    The cookie-session routes of app.py before session_store.py (only what /start and /guess did).
+    """
+    legacy = Flask(__name__)
+    legacy.secret_key = LEGACY_SECRET_KEY
+    game = app.mathdle_game
+
+    @legacy.route('/start')
+    def start_game():
+        difficulty = request.args.get('difficulty', 'medium')
+        session.clear()
+        session['difficulty'] = difficulty
+        length = game.difficulty_levels[difficulty]
+        session['length'] = length
+        session['solution'] = game.generate_equation(length)
+        session['guesses'] = []
+        return redirect('/play')
+
+    @legacy.route('/guess', methods=['POST'])
+    def process_guess():
+        guess = request.get_json().get('guess')
+        solution = session['solution']
+        if not guess or len(guess) != session['length'] or not game._is_valid(guess):
+            return jsonify({'error': 'invalid'}), 400
+        results = game.check_guess(guess, solution)
+        is_correct = all(r == 'correct' for r in results)
+        session['guesses'].append({'guess': guess, 'results': results})
+        session.modified = True
+        return jsonify({'results': results, 'is_correct': is_correct,
+                        'solution': solution if is_correct or len(session['guesses']) >= 6 else None})
+
+    return legacy
+
+
+def unsigned_payload(cookie_value):
+    """
+    What anyone holding the cookie can read without the secret key (None if it is not a Flask session cookie).
+    """
+    compressed = cookie_value.startswith('.')
+    payload = cookie_value.lstrip('.').split('.')[0]
+    try:
+        data = base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4))
+        return json.loads(zlib.decompress(data) if compressed else data)
+    except ValueError:
+        return None
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def play(flask_app, difficulty, games, rng):
+    """
+    Returns per guess number: Cookie header bytes sent, Set-Cookie bytes received, latencies; plus a sample cookie.
+    """
+    length = app.mathdle_game.difficulty_levels[difficulty]
+    pool = app.mathdle_game.equation_pool(length)
+    sent = [[] for _ in range(GUESSES)]
+    received = [[] for _ in range(GUESSES)]
+    latency = [[] for _ in range(GUESSES)]
+    sample_cookie = None
+    for _ in range(games):
+        client = flask_app.test_client()
+        client.get(f'/start?difficulty={difficulty}')
+        for turn in range(GUESSES):
+            guess = pool.choice(rng)
+            started = time.perf_counter()
+            response = client.post('/guess', json={'guess': guess})
+            latency[turn].append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise SystemExit(f'/guess failed: {response.get_json()}')
+            sent[turn].append(len(response.request.headers.get('Cookie', '')))
+            received[turn].append(sum(len(c) for c in response.headers.getlist('Set-Cookie')))
+            if response.get_json()['is_correct']:
+                break
+        cookie = client.get_cookie('session') or client.get_cookie(app.SESSION_COOKIE)
+        sample_cookie = cookie.value if cookie else None
+    return sent, received, latency, sample_cookie
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=300)
+    parser.add_argument('--difficulty', default='hard', choices=sorted(app.mathdle_game.difficulty_levels))
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = (
+            ('cookie', cookie_app, None),
+            ('memory', lambda: app.app, MemorySessionStore()),
+            ('sqlite', lambda: app.app, SQLiteSessionStore(os.path.join(tmp, 'sessions.db'))),
+        )
+        print(f'{args.games} games x {GUESSES} guesses, difficulty {args.difficulty} (Flask test client)')
+        for label, make_app, store in backends:
+            if store is not None:
+                app.game_sessions = store
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # generate_equation prints
+                sent, received, latency, cookie = play(make_app(), args.difficulty, args.games, random.Random(args.seed))
+            all_latency = [t for turn in latency for t in turn]
+            exposed = unsigned_payload(cookie) if cookie else None
+            print(f'  {label:6s} /guess p50 {percentile(all_latency, 0.5) * 1e6:5.0f} µs | p99 {percentile(all_latency, 0.99) * 1e6:5.0f} µs'
+                  f" | solution readable from cookie: {'yes' if exposed and 'solution' in exposed else 'no'}")
+            print('         Cookie sent on guess 1..6 (bytes): '
+                  + ' '.join(f'{sum(turn) / max(len(turn), 1):4.0f}' for turn in sent)
+                  + ' | Set-Cookie per /guess (bytes): '
+                  + ' '.join(f'{sum(turn) / max(len(turn), 1):4.0f}' for turn in received))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+# bench_validator.py
+# Differential test and benchmark of guess validation: expression.py against the regex + eval() validator it replaced.
+#
+# Inputs, per difficulty:
+# - every equation in the equation pool (all must be valid for both),
+# - near misses: pool equations with one or two characters replaced (what a player actually submits),
+# - random strings over the keyboard (digits, + - * / and one '=').
+# Every answer from expression.py is also checked against an exact oracle: Python's own parser with every number
+# wrapped in Fraction. Where the old validator disagrees, the difference is classified; anything unexplained fails
+# the run (exit code 1). Strings with '**' are never given to the old validator: eval('9**9**9') does not finish.
+# A short list of hand-picked edge cases shows where the two differ on purpose.
+#
+# Usage:  python tools/bench_validator.py [--samples 100000] [--seed 1]
+
+import argparse
+import collections
+import os
+import random
+import re
+import sys
+import time
+from fractions import Fraction
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from expression import is_valid_equation  # noqa: E402
+
+KEYS = '0123456789+-*/'
+# Hand-picked guesses where the two validators are expected to differ (or where the reason is worth showing)
+EDGE_CASES = ('1/49*49=1', '1/3*3=1', '7/2*2=7', '9//2=4', '2**3=8', '-5+10=5', '2*-3=-6', '05+1=6', '4/0=1', '1_000=1000')
+
+
+def legacy_safe_eval(expr_str):
+    if not all(c in '0123456789+-*/' for c in expr_str):
+        return None
+    try:
+        return eval(expr_str)
+    except (SyntaxError, ZeroDivisionError, NameError, TypeError):
+        return None
+
+
+def legacy_is_valid(equation_str):
+    """
+    The validator app.py used before expression.py (regex for leading zeros, then eval() of each side).
+    """
+    if equation_str.count('=') != 1:
+        return False
+    left, right = equation_str.split('=')
+    if not left or not right:
+        return False
+    for num in re.findall(r'\d+', equation_str):
+        if len(num) > 1 and num.startswith('0'):
+            return False
+    try:
+        left_val = legacy_safe_eval(left)
+        if left_val is not None and left_val == int(right):
+            return True
+    except (ValueError, TypeError):
+        pass
+    try:
+        right_val = legacy_safe_eval(right)
+        if right_val is not None and right_val == int(left):
+            return True
+    except (ValueError, TypeError):
+        pass
+    return False
+
+
+def oracle_is_valid(equation_str):
+    """
+    The old rules with exact arithmetic: every number becomes a Fraction before Python evaluates the side.
+    Only used on strings without '**' and '//', which are outside the grammar.
+    """
+    if equation_str.count('=') != 1 or re.search(r'\b0\d', equation_str):
+        return False
+    left, right = equation_str.split('=')
+    for literal, expression in ((right, left), (left, right)):
+        if not re.fullmatch(r'[+-]?\d+', literal) or not expression:
+            continue
+        try:
+            value = eval(re.sub(r'\d+', lambda m: f'Fraction({m.group()})', expression), {'Fraction': Fraction})
+        except (SyntaxError, ZeroDivisionError):
+            continue
+        if value == int(literal):
+            return True
+    return False
+
+
+def near_misses(pool, count, rng):
+    for _ in range(count):
+        chars = list(pool.choice(rng))
+        for _ in range(rng.choice((1, 2))):
+            chars[rng.randrange(len(chars))] = rng.choice(KEYS + '=')
+        yield ''.join(chars)
+
+
+def random_guesses(length, count, rng):
+    for _ in range(count):
+        chars = [rng.choice(KEYS) for _ in range(length - 1)]
+        chars.insert(rng.randrange(1, length - 1), '=')
+        yield ''.join(chars)
+
+
+def classify(guess):
+    if '//' in guess:
+        return 'floor division // (outside the grammar)'
+    if '/' in guess:
+        return 'float rounding in / (eval) vs exact division'
+    return None
+
+
+def timed(validate, guesses):
+    started = time.perf_counter()
+    results = [validate(guess) for guess in guesses]
+    return results, (time.perf_counter() - started) / max(len(guesses), 1) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--samples', type=int, default=100000, help='near misses and random strings per difficulty')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    unexplained = 0
+    for difficulty, length in app.mathdle_game.difficulty_levels.items():
+        pool = app.mathdle_game.equation_pool(length)
+        inputs = {
+            'pool equations': [pool[i] for i in range(len(pool))],
+            'near misses': list(near_misses(pool, args.samples, rng)),
+            'random keyboard': list(random_guesses(length, args.samples, rng)),
+        }
+        print(f'{difficulty} (length {length})')
+        for label, guesses in inputs.items():
+            powers = [g for g in guesses if '**' in g]
+            compared = [g for g in guesses if '**' not in g]
+            new, new_us = timed(is_valid_equation, compared)
+            old, old_us = timed(legacy_is_valid, compared)
+            differences = collections.Counter()
+            for guess, new_valid, old_valid in zip(compared, new, old):
+                if '//' not in guess and new_valid != oracle_is_valid(guess):
+                    unexplained += 1
+                    print(f'  ✗ {guess!r}: expression.py says {new_valid}, the exact oracle disagrees')
+                if new_valid != old_valid:
+                    reason = classify(guess)
+                    if reason is None:
+                        unexplained += 1
+                        print(f'  ✗ {guess!r}: expression.py says {new_valid}, eval() says {old_valid}')
+                    differences[f'{reason} (eval {old_valid}, now {new_valid})'] += 1
+            powers_valid = sum(map(is_valid_equation, powers))
+            print(f'  {label:15s} {len(compared):8,} compared | valid {sum(new):7,} | expression.py {new_us:5.2f} µs'
+                  f' | eval {old_us:5.2f} µs ({old_us / max(new_us, 1e-9):4.1f}x) | {len(powers):,} with ** rejected'
+                  + (f' ({powers_valid} accepted!)' if powers_valid else ''))
+            for reason, count in differences.most_common():
+                print(f'    differs: {count:,} {reason}')
+    print('edge cases (eval -> expression.py):')
+    for guess in EDGE_CASES:
+        old = legacy_is_valid(guess)
+        new = is_valid_equation(guess)
+        print(f'  {guess:12s} {old!s:5s} -> {new!s:5s}' + ('' if old == new else '  (differs)'))
+    if unexplained:
+        print(f'{unexplained} unexplained difference(s)')
+        sys.exit(1)
+    print('expression.py matches the exact oracle everywhere; every difference from eval() is explained')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# bench_workers.py
+# Starts gunicorn (gunicorn.conf.py) with several workers and reports each worker's memory and cold-start time,
+# once with the shared equation table (mmap) and once with EQUATION_TABLE empty (every worker enumerates in memory).
+#
+# - Cold start is the time from fork until the worker has imported app.py (logged by gunicorn.conf.py).
+# - Memory comes from /proc/<pid>/smaps_rollup after warming every worker with /start requests (Linux only):
+#   RSS counts shared pages in every worker, PSS splits them between the processes that share them, and
+#   USS (private pages) is what each extra worker really costs. "table RSS" is the part of RSS that is the mapped table.
+#
+# Usage:  python tools/bench_workers.py [--workers 4] [--requests 200]
+
+import argparse
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY = re.compile(r'Worker (\d+) ready in (\d+) ms')
+TABLE = re.compile(r'Equation table .* (built|is current) in (\d+) ms')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def smaps(pid, table_path):
+    """(RSS, PSS, USS, RSS of the table mapping) of a process in KB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if rest.strip().endswith('kB'):
+                values[key] = int(rest.split()[0])
+    table_rss = 0
+    if table_path:
+        with open(f'/proc/{pid}/smaps') as f:
+            in_table = False
+            for line in f:
+                if re.match(r'^[0-9a-f]+-[0-9a-f]+ ', line):
+                    in_table = line.rstrip().endswith(table_path)
+                elif in_table and line.startswith('Rss:'):
+                    table_rss += int(line.split()[1])
+    return values['Rss'], values['Pss'], values['Private_Clean'] + values['Private_Dirty'], table_rss
+
+
+def run(workers, requests, table_path):
+    port = free_port()
+    env = dict(os.environ, EQUATION_TABLE=table_path or '', WEB_CONCURRENCY=str(workers), BIND=f'127.0.0.1:{port}')
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=ROOT, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    ready = {}
+    table_ms = None
+    try:
+        while len(ready) < workers:
+            line = server.stdout.readline()
+            if not line:
+                raise SystemExit('gunicorn exited before every worker was ready')
+            match = READY.search(line)
+            if match:
+                ready[int(match.group(1))] = int(match.group(2))
+            match = TABLE.search(line)
+            if match:
+                table_ms = int(match.group(2))
+        all_ready_s = time.perf_counter() - started
+        for _ in range(requests):
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/start?difficulty=hard').read()
+        memory = {pid: smaps(pid, table_path) for pid in ready}
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.communicate(timeout=30)
+    return ready, memory, table_ms, all_ready_s
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200, help='/start requests sent before measuring memory')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, table_path in (('mmap table', os.path.join(tmp, 'equations.bin')), ('in-memory', None)):
+            ready, memory, table_ms, all_ready_s = run(args.workers, args.requests, table_path)
+            build = f'master built the table in {table_ms} ms, ' if table_ms is not None else ''
+            print(f'{label}: {args.workers} workers, {build}all workers ready {all_ready_s:.2f} s after launch')
+            for pid, ms in sorted(ready.items()):
+                rss, pss, uss, table_rss = memory[pid]
+                print(f'  worker {pid}: cold start {ms:5d} ms | RSS {rss / 1024:5.1f} MB | PSS {pss / 1024:5.1f} MB'
+                      f' | USS {uss / 1024:5.1f} MB | table RSS {table_rss / 1024:4.1f} MB')
+            total_pss = sum(m[1] for m in memory.values()) / 1024
+            total_uss = sum(m[2] for m in memory.values()) / 1024
+            print(f'  total PSS {total_pss:.1f} MB, total USS {total_uss:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+# wsgi.py
+# Production entry point: gunicorn -c gunicorn.conf.py (or any WSGI server pointed at wsgi:app).
+
+from app import app  # noqa: F401